@@ -0,0 +1,24 @@
+-- Deduplicates 'sin_subsystems_reports' and adds the constraints defined on
+-- 'schema.sql' to databases created before them. Only the latest inserted
+-- entry (highest 'id') of every (`subsystem_id`, `instant_record`) is kept.
+
+USE `sisbin`;
+
+CREATE TEMPORARY TABLE `sin_subsystems_reports_latest` (
+	`id` INT NOT NULL,
+	PRIMARY KEY (`id`)
+) Engine=InnoDB
+	SELECT MAX(`id`) AS `id`
+	FROM `sin_subsystems_reports`
+	GROUP BY `subsystem_id`, `instant_record`;
+
+DELETE `reports` FROM `sin_subsystems_reports` AS `reports`
+	LEFT JOIN `sin_subsystems_reports_latest` AS `latest`
+	ON `reports`.`id` = `latest`.`id`
+	WHERE `latest`.`id` IS NULL;
+
+DROP TEMPORARY TABLE `sin_subsystems_reports_latest`;
+
+ALTER TABLE `sin_subsystems_reports`
+	ADD UNIQUE KEY `uq_sin_subsystems_reports_subsystem_instant` (`subsystem_id`, `instant_record`),
+	ADD KEY `idx_sin_subsystems_reports_instant_record` (`instant_record`);
@@ -0,0 +1,50 @@
+-- Creates 'sin_subsystems_reports_rollups' as defined on 'schema.sql' and
+-- backfills it from all stored reports, afterwards it's kept up to date by
+-- every reports synchronization. Weeks start on mondays.
+
+USE `sisbin`;
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports_rollups` (
+	`id` INT AUTO_INCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL,
+	`granularity` VARCHAR(8) NOT NULL,
+	`bucket_start` DATETIME NOT NULL,
+	`load_min` DOUBLE NOT NULL,
+	`load_max` DOUBLE NOT NULL,
+	`load_mean` DOUBLE NOT NULL,
+	`load_sum` DOUBLE NOT NULL,
+	`load_count` INT NOT NULL,
+	PRIMARY KEY (`id`),
+	UNIQUE KEY `uq_sin_subsystems_reports_rollups_bucket` (`granularity`, `bucket_start`, `subsystem_id`)
+) Engine=InnoDB;
+
+ALTER TABLE `sin_subsystems_reports_rollups`
+	ADD CONSTRAINT `sin_subsystems_reports_rollups`
+	FOREIGN KEY (`subsystem_id`)
+	REFERENCES `sin_subsystems` (`id`)
+	ON DELETE CASCADE;
+
+REPLACE INTO `sin_subsystems_reports_rollups` (
+	`subsystem_id`, `granularity`, `bucket_start`, `load_min`, `load_max`,
+	`load_mean`, `load_sum`, `load_count`
+)
+	SELECT `subsystem_id`, 'week',
+		DATE_SUB(DATE(`instant_record`), INTERVAL WEEKDAY(`instant_record`) DAY) AS `bucket_start`,
+		MIN(`instant_load_following`), MAX(`instant_load_following`),
+		AVG(`instant_load_following`), SUM(`instant_load_following`), COUNT(*)
+	FROM `sin_subsystems_reports`
+	GROUP BY `subsystem_id`, `bucket_start`
+	UNION ALL
+	SELECT `subsystem_id`, 'month',
+		DATE_FORMAT(`instant_record`, '%Y-%m-01') AS `bucket_start`,
+		MIN(`instant_load_following`), MAX(`instant_load_following`),
+		AVG(`instant_load_following`), SUM(`instant_load_following`), COUNT(*)
+	FROM `sin_subsystems_reports`
+	GROUP BY `subsystem_id`, `bucket_start`
+	UNION ALL
+	SELECT `subsystem_id`, 'year',
+		MAKEDATE(YEAR(`instant_record`), 1) AS `bucket_start`,
+		MIN(`instant_load_following`), MAX(`instant_load_following`),
+		AVG(`instant_load_following`), SUM(`instant_load_following`), COUNT(*)
+	FROM `sin_subsystems_reports`
+	GROUP BY `subsystem_id`, `bucket_start`;
@@ -0,0 +1,24 @@
+-- Creates 'sin_subsystems_forecasts' as defined on 'schema.sql' on databases
+-- created before it. It's filled by the next reports synchronization, once
+-- materialized forecasts are enabled.
+
+USE `sisbin`;
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_forecasts` (
+	`id` INT AUTO_INCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL,
+	`ds` DATETIME NOT NULL,
+	`yhat` FLOAT NOT NULL,
+	`yhat_lower` FLOAT NOT NULL,
+	`yhat_upper` FLOAT NOT NULL,
+	`model_version` VARCHAR(64) NOT NULL,
+	`generated_at` DATETIME NOT NULL,
+	PRIMARY KEY (`id`),
+	UNIQUE KEY `uq_sin_subsystems_forecasts_subsystem_ds` (`subsystem_id`, `ds`)
+) Engine=InnoDB;
+
+ALTER TABLE `sin_subsystems_forecasts`
+	ADD CONSTRAINT `sin_subsystems_forecasts`
+	FOREIGN KEY (`subsystem_id`)
+	REFERENCES `sin_subsystems` (`id`)
+	ON DELETE CASCADE;
@@ -0,0 +1,12 @@
+-- Creates 'sin_subsystems_reports_revision' as defined on 'schema.sql'. Its
+-- single entry is bumped along every committed load of reports, and is first
+-- created by the next one.
+
+USE `sisbin`;
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports_revision` (
+	`id` INT NOT NULL,
+	`revision` INT NOT NULL,
+	`revised_at` DATETIME NOT NULL,
+	PRIMARY KEY (`id`)
+) Engine=InnoDB;
@@ -15,7 +15,9 @@ CREATE TABLE IF NOT EXISTS `sin_subsystems_reports` (
 	`subsystem_id` VARCHAR(2) NOT NULL,
 	`instant_record` DATETIME NOT NULL,
 	`instant_load_following` FLOAT NOT NULL,
-	PRIMARY KEY (`id`)
+	PRIMARY KEY (`id`),
+	UNIQUE KEY `uq_sin_subsystems_reports_subsystem_instant` (`subsystem_id`, `instant_record`),
+	KEY `idx_sin_subsystems_reports_instant_record` (`instant_record`)
 ) Engine=InnoDB;
 
 ALTER TABLE `sin_subsystems_reports`
@@ -24,6 +26,52 @@ ALTER TABLE `sin_subsystems_reports`
 	REFERENCES `sin_subsystems` (`id`)
 	ON DELETE CASCADE;
 
+CREATE TABLE IF NOT EXISTS `sin_subsystems_forecasts` (
+	`id` INT AUTO_INCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL,
+	`ds` DATETIME NOT NULL,
+	`yhat` FLOAT NOT NULL,
+	`yhat_lower` FLOAT NOT NULL,
+	`yhat_upper` FLOAT NOT NULL,
+	`model_version` VARCHAR(64) NOT NULL,
+	`generated_at` DATETIME NOT NULL,
+	PRIMARY KEY (`id`),
+	UNIQUE KEY `uq_sin_subsystems_forecasts_subsystem_ds` (`subsystem_id`, `ds`)
+) Engine=InnoDB;
+
+ALTER TABLE `sin_subsystems_forecasts`
+	ADD CONSTRAINT `sin_subsystems_forecasts`
+	FOREIGN KEY (`subsystem_id`)
+	REFERENCES `sin_subsystems` (`id`)
+	ON DELETE CASCADE;
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports_rollups` (
+	`id` INT AUTO_INCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL,
+	`granularity` VARCHAR(8) NOT NULL,
+	`bucket_start` DATETIME NOT NULL,
+	`load_min` DOUBLE NOT NULL,
+	`load_max` DOUBLE NOT NULL,
+	`load_mean` DOUBLE NOT NULL,
+	`load_sum` DOUBLE NOT NULL,
+	`load_count` INT NOT NULL,
+	PRIMARY KEY (`id`),
+	UNIQUE KEY `uq_sin_subsystems_reports_rollups_bucket` (`granularity`, `bucket_start`, `subsystem_id`)
+) Engine=InnoDB;
+
+ALTER TABLE `sin_subsystems_reports_rollups`
+	ADD CONSTRAINT `sin_subsystems_reports_rollups`
+	FOREIGN KEY (`subsystem_id`)
+	REFERENCES `sin_subsystems` (`id`)
+	ON DELETE CASCADE;
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports_revision` (
+	`id` INT NOT NULL,
+	`revision` INT NOT NULL,
+	`revised_at` DATETIME NOT NULL,
+	PRIMARY KEY (`id`)
+) Engine=InnoDB;
+
 INSERT INTO `sin_subsystems` VALUES ("N", "Norte");
 INSERT INTO `sin_subsystems` VALUES ("NE", "Nordeste");
 INSERT INTO `sin_subsystems` VALUES ("S", "Sul");
@@ -0,0 +1,54 @@
+PRAGMA journal_mode=WAL;
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems` (
+	`id` VARCHAR(2) NOT NULL,
+	`name` VARCHAR(64) NOT NULL,
+	PRIMARY KEY (`id`)
+);
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports` (
+	`id` INTEGER PRIMARY KEY AUTOINCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL REFERENCES `sin_subsystems` (`id`) ON DELETE CASCADE,
+	`instant_record` DATETIME NOT NULL,
+	`instant_load_following` FLOAT NOT NULL,
+	UNIQUE (`subsystem_id`, `instant_record`)
+);
+
+CREATE INDEX IF NOT EXISTS `idx_sin_subsystems_reports_instant_record`
+	ON `sin_subsystems_reports` (`instant_record`);
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_forecasts` (
+	`id` INTEGER PRIMARY KEY AUTOINCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL REFERENCES `sin_subsystems` (`id`) ON DELETE CASCADE,
+	`ds` DATETIME NOT NULL,
+	`yhat` FLOAT NOT NULL,
+	`yhat_lower` FLOAT NOT NULL,
+	`yhat_upper` FLOAT NOT NULL,
+	`model_version` VARCHAR(64) NOT NULL,
+	`generated_at` DATETIME NOT NULL,
+	UNIQUE (`subsystem_id`, `ds`)
+);
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports_rollups` (
+	`id` INTEGER PRIMARY KEY AUTOINCREMENT,
+	`subsystem_id` VARCHAR(2) NOT NULL REFERENCES `sin_subsystems` (`id`) ON DELETE CASCADE,
+	`granularity` VARCHAR(8) NOT NULL,
+	`bucket_start` DATETIME NOT NULL,
+	`load_min` DOUBLE NOT NULL,
+	`load_max` DOUBLE NOT NULL,
+	`load_mean` DOUBLE NOT NULL,
+	`load_sum` DOUBLE NOT NULL,
+	`load_count` INTEGER NOT NULL,
+	UNIQUE (`granularity`, `bucket_start`, `subsystem_id`)
+);
+
+CREATE TABLE IF NOT EXISTS `sin_subsystems_reports_revision` (
+	`id` INTEGER PRIMARY KEY,
+	`revision` INTEGER NOT NULL,
+	`revised_at` DATETIME NOT NULL
+);
+
+INSERT OR IGNORE INTO `sin_subsystems` VALUES ("N", "Norte");
+INSERT OR IGNORE INTO `sin_subsystems` VALUES ("NE", "Nordeste");
+INSERT OR IGNORE INTO `sin_subsystems` VALUES ("S", "Sul");
+INSERT OR IGNORE INTO `sin_subsystems` VALUES ("SE", "Sudeste/Centro-Oeste");
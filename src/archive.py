@@ -0,0 +1,269 @@
+from datetime import datetime
+from hashlib import sha256
+from logging import warning
+from threading import Lock
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from pandas import DataFrame, concat
+from settings import Settings
+from utils import DATETIME_FORMAT, brt_now
+
+import json
+import os
+
+ARCHIVE_COLUMNS: List[str] = [
+    "id_subsistema",
+    "din_instante",
+    "val_cargaenergiamwmed",
+]
+
+
+class OpenDataArchiveError(Exception):
+    def __init__(self, year: int) -> None:
+        super().__init__(
+            f'Archived year "{year}" doesn\'t match its checksum, it was discarded.'
+        )
+
+
+# Local copy of closed years, as normalized Arrow IPC files plus a manifest of
+# their source URL, checksum and row count. Closed years never change, so once
+# archived they can be re-ingested without any network access.
+class OpenDataArchive(object):
+    __MANIFEST: Dict[str, Dict[str, Any]] | None = None
+    __VERIFIED: Dict[str, Tuple[int, int]] = {}
+    __LOCK: Lock = Lock()
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return OpenDataArchive.__settings().get("enabled", False)
+
+    @staticmethod
+    def years() -> List[int]:
+        with OpenDataArchive.__LOCK:
+            return sorted(
+                int(year)
+                for year, archive_entry in OpenDataArchive.__manifest().items()
+                if os.path.exists(OpenDataArchive.__path(archive_entry["file"]))
+            )
+
+    @staticmethod
+    def store(
+        year: int,
+        source_url: str | None,
+        load_record_chunks: Iterable[DataFrame],
+    ) -> int:
+        # Chunks are written as record batches as they're read, so memory
+        # usage doesn't depend on file size.
+        archive_filename: str = f"{year}.arrow"
+        archive_path: str = OpenDataArchive.__path(archive_filename)
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        pyarrow: ModuleType = OpenDataArchive.__pyarrow()
+        archive_schema: Any = OpenDataArchive.__schema()
+        rows: int = 0
+        with pyarrow.OSFile(f"{archive_path}.tmp", "wb") as archive_file:
+            with pyarrow.ipc.new_file(archive_file, archive_schema) as archive_writer:
+                for load_records in load_record_chunks:
+                    archive_writer.write_table(
+                        pyarrow.Table.from_pandas(
+                            load_records[ARCHIVE_COLUMNS],
+                            schema=archive_schema,
+                            preserve_index=False,
+                        )
+                    )
+                    rows += load_records.__len__()
+        checksum: str = OpenDataArchive.__checksum(f"{archive_path}.tmp")
+        os.replace(f"{archive_path}.tmp", archive_path)
+
+        with OpenDataArchive.__LOCK:
+            OpenDataArchive.__manifest()[str(year)] = {
+                "file": archive_filename,
+                "url": source_url,
+                "sha256": checksum,
+                "rows": rows,
+                "archived_at": brt_now().strftime(DATETIME_FORMAT),
+            }
+            OpenDataArchive.__save_manifest()
+        return rows
+
+    @staticmethod
+    def read_chunks(year: int) -> Iterable[DataFrame]:
+        # Memory mapped, so record batches are paged in from disk on demand
+        # instead of being read upfront.
+        pyarrow: ModuleType = OpenDataArchive.__pyarrow()
+        archive_entry: Dict[str, Any] = OpenDataArchive.__verified_entry(year)
+        with pyarrow.memory_map(
+            OpenDataArchive.__path(archive_entry["file"]), "r"
+        ) as archive_file:
+            archive_reader: Any = pyarrow.ipc.open_file(archive_file)
+            rows: int = 0
+            for batch_index in range(archive_reader.num_record_batches):
+                load_records: DataFrame = archive_reader.get_batch(
+                    batch_index
+                ).to_pandas()
+                rows += load_records.__len__()
+                yield load_records
+
+        if rows != archive_entry["rows"]:
+            warning(
+                f'Archived year "{year}" has {rows} rows, '
+                + f"but {archive_entry['rows']} were expected."
+            )
+
+    @staticmethod
+    def fetch_load_series(
+        subsystem_id: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+    ) -> DataFrame:
+        # Same columns as 'Storage.fetch_load_series', so archived years can
+        # feed forecasts and backtests without a database.
+        pyarrow: ModuleType = OpenDataArchive.__pyarrow()
+        load_series: List[DataFrame] = []
+        for year in OpenDataArchive.years():
+            if (start_period and year < start_period.year) or (
+                final_period and year > final_period.year
+            ):
+                continue
+
+            archive_entry: Dict[str, Any] = OpenDataArchive.__verified_entry(year)
+            with pyarrow.memory_map(
+                OpenDataArchive.__path(archive_entry["file"]), "r"
+            ) as archive_file:
+                archive_table: Any = pyarrow.ipc.open_file(archive_file).read_all()
+                load_series.append(
+                    archive_table.filter(
+                        pyarrow.compute.equal(
+                            archive_table["id_subsistema"], subsystem_id
+                        )
+                    )
+                    .select(["din_instante", "val_cargaenergiamwmed"])
+                    .to_pandas()
+                )
+
+        subsystem_load_series: DataFrame = (
+            concat(load_series, ignore_index=True)
+            if load_series
+            else OpenDataArchive.__schema()
+            .empty_table()
+            .select(["din_instante", "val_cargaenergiamwmed"])
+            .to_pandas()
+        ).rename(
+            columns={
+                "din_instante": "instant_record",
+                "val_cargaenergiamwmed": "instant_load_following",
+            }
+        )
+        if start_period:
+            subsystem_load_series = subsystem_load_series[
+                subsystem_load_series["instant_record"] >= start_period
+            ]
+        if final_period:
+            subsystem_load_series = subsystem_load_series[
+                subsystem_load_series["instant_record"] <= final_period
+            ]
+        return subsystem_load_series.sort_values("instant_record", ignore_index=True)
+
+    @staticmethod
+    def fetch_subsystem_ids() -> List[str]:
+        # Subsystems found in archived years, so backtests don't need a
+        # database either.
+        pyarrow: ModuleType = OpenDataArchive.__pyarrow()
+        subsystem_ids: Set[str] = set()
+        for year in OpenDataArchive.years():
+            archive_entry: Dict[str, Any] = OpenDataArchive.__verified_entry(year)
+            with pyarrow.memory_map(
+                OpenDataArchive.__path(archive_entry["file"]), "r"
+            ) as archive_file:
+                subsystem_ids.update(
+                    pyarrow.compute.unique(
+                        pyarrow.ipc.open_file(archive_file).read_all()["id_subsistema"]
+                    ).to_pylist()
+                )
+        return sorted(subsystem_ids)
+
+    @staticmethod
+    def __pyarrow() -> ModuleType:
+        # Imported once the archive is actually used rather than along with
+        # this module, so neither the API nor ingestion need pyarrow while
+        # the archive is disabled.
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+
+        return pyarrow
+
+    @staticmethod
+    def __schema() -> Any:
+        pyarrow: ModuleType = OpenDataArchive.__pyarrow()
+        return pyarrow.schema(
+            [
+                ("id_subsistema", pyarrow.string()),
+                ("din_instante", pyarrow.timestamp("us")),
+                ("val_cargaenergiamwmed", pyarrow.float64()),
+            ]
+        )
+
+    @staticmethod
+    def __settings() -> Dict[str, Any]:
+        return Settings.CONFIG["open_data_ons"].get("archive", {})
+
+    @staticmethod
+    def __path(filename: str) -> str:
+        return os.path.join(
+            OpenDataArchive.__settings().get("dir", "../.cache/open_data"), filename
+        )
+
+    @staticmethod
+    def __verified_entry(year: int) -> Dict[str, Any]:
+        # Archives are hashed once per process, and once more whenever their
+        # file changes. Those not matching their checksum are discarded, so
+        # their year is downloaded again by upcoming syncs.
+        with OpenDataArchive.__LOCK:
+            archive_entry: Dict[str, Any] = OpenDataArchive.__manifest()[str(year)]
+            archive_path: str = OpenDataArchive.__path(archive_entry["file"])
+            archive_stat: os.stat_result = os.stat(archive_path)
+            file_version: Tuple[int, int] = (
+                archive_stat.st_size,
+                archive_stat.st_mtime_ns,
+            )
+            if OpenDataArchive.__VERIFIED.get(archive_path) == file_version:
+                return archive_entry
+
+            if OpenDataArchive.__checksum(archive_path) != archive_entry.get("sha256"):
+                del OpenDataArchive.__manifest()[str(year)]
+                OpenDataArchive.__save_manifest()
+                os.remove(archive_path)
+                raise OpenDataArchiveError(year)
+
+            OpenDataArchive.__VERIFIED[archive_path] = file_version
+            return archive_entry
+
+    @staticmethod
+    def __checksum(file_path: str) -> str:
+        file_hash = sha256()
+        with open(file_path, "rb") as source_file:
+            while chunk := source_file.read(1048576):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def __manifest() -> Dict[str, Dict[str, Any]]:
+        # Must be called holding '__LOCK'.
+        if OpenDataArchive.__MANIFEST is None:
+            manifest_path: str = OpenDataArchive.__path("manifest.json")
+            OpenDataArchive.__MANIFEST = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as manifest_file:
+                    OpenDataArchive.__MANIFEST = json.load(manifest_file)
+        return OpenDataArchive.__MANIFEST
+
+    @staticmethod
+    def __save_manifest() -> None:
+        # Must be called holding '__LOCK'.
+        manifest_path: str = OpenDataArchive.__path("manifest.json")
+        with open(f"{manifest_path}.tmp", "w") as manifest_file:
+            json.dump(OpenDataArchive.__manifest(), manifest_file, indent=True)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
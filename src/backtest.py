@@ -0,0 +1,218 @@
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import info
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Any, Dict, List, Tuple
+from numpy import ndarray, sqrt
+from pandas import DataFrame, Timedelta, Timestamp
+from archive import OpenDataArchive
+from db.storage import Storage
+from forecast import fetch_subsystem_history
+from forecast.model import ForecastModel
+from settings import Settings
+from utils import configure_logging
+from warnings import simplefilter
+
+import csv
+
+
+def backtest_cutoff(
+    engine: str,
+    model_args: Dict[str, Any],
+    interval_settings: Dict[str, Any],
+    history: DataFrame,
+    cutoff: Timestamp,
+    horizon: Timedelta,
+) -> Dict[str, float]:
+    # Module level function, so it can be pickled and executed by worker
+    # processes. Peak memory only accounts for Python allocations, thus it
+    # doesn't include the Stan optimizer subprocess spawned by Prophet.
+    train_data: DataFrame = history[history["ds"] <= cutoff]
+    test_data: DataFrame = history[
+        (history["ds"] > cutoff) & (history["ds"] <= cutoff + horizon)
+    ]
+
+    # Engines are imported on demand, do it before tracing memory.
+    ForecastModel.engine_class(engine)
+
+    start()
+    try:
+        model: ForecastModel = ForecastModel.create(
+            engine, model_args, interval_settings
+        )
+        fit_time: float = perf_counter()
+        model.fit(train_data)
+        fit_time = perf_counter() - fit_time
+
+        predict_time: float = perf_counter()
+        forecast: DataFrame = model.predict(test_data[["ds"]].copy())
+        predict_time = perf_counter() - predict_time
+        _, peak_memory = get_traced_memory()
+    finally:
+        stop()
+
+    y: ndarray = test_data["y"].to_numpy()
+    yhat: ndarray = forecast["yhat"].to_numpy()
+    return {
+        "points": float(y.shape[0]),
+        "absolute_percentage_error": float((abs(y - yhat) / abs(y)).sum()),
+        "squared_error": float(((y - yhat) ** 2).sum()),
+        "covered": float(
+            (
+                (y >= forecast["yhat_lower"].to_numpy())
+                & (y <= forecast["yhat_upper"].to_numpy())
+            ).sum()
+        ),
+        "fit_time": fit_time,
+        "predict_time": predict_time,
+        "peak_memory": float(peak_memory),
+    }
+
+
+def __parse_configuration(configuration: str) -> Tuple[str, Dict[str, Any]]:
+    # Configurations are written as 'engine[:interval strategy]',
+    # e.g. 'prophet:residual_quantile' or 'numpy'.
+    engine, _, strategy = configuration.partition(":")
+    interval_settings: Dict[str, Any] = {
+        **Settings.CONFIG["forecast"].get("intervals", {})
+    }
+    if strategy:
+        interval_settings["strategy"] = strategy
+    return engine, interval_settings
+
+
+def __cutoffs(history: DataFrame, args: Namespace) -> List[Timestamp]:
+    # Same rolling origin layout as 'prophet.diagnostics.cross_validation':
+    # cutoffs are walked backwards from the latest one every 'period' days,
+    # as long as at least 'initial' days are available for training.
+    first_ds: Timestamp = history["ds"].min()
+    cutoff: Timestamp = history["ds"].max() - Timedelta(days=args.horizon)
+    cutoffs: List[Timestamp] = []
+    while cutoff - first_ds >= Timedelta(days=args.initial):
+        cutoffs.append(cutoff)
+        cutoff -= Timedelta(days=args.period)
+    return list(reversed(cutoffs))
+
+
+def __summarize(results: List[Dict[str, float]]) -> Dict[str, float]:
+    points: float = sum(result["points"] for result in results)
+    return {
+        "cutoffs": len(results),
+        "mape": sum(result["absolute_percentage_error"] for result in results)
+        / points,
+        "rmse": float(
+            sqrt(sum(result["squared_error"] for result in results) / points)
+        ),
+        "coverage": sum(result["covered"] for result in results) / points,
+        "fit_time": sum(result["fit_time"] for result in results) / len(results),
+        "predict_time": sum(result["predict_time"] for result in results)
+        / len(results),
+        "peak_memory_mb": max(result["peak_memory"] for result in results) / 2**20,
+    }
+
+
+def __backtest(args: Namespace) -> None:
+    # Archived backtests need no database at all.
+    subsystem_ids: List[str] = (
+        OpenDataArchive.fetch_subsystem_ids()
+        if args.source == "archive"
+        else [subsystem.subsystem_id for subsystem in Storage.get().fetch_subsystems()]
+    )
+    histories: Dict[str, DataFrame] = {
+        subsystem_id: (
+            OpenDataArchive.fetch_load_series(subsystem_id).rename(
+                columns={"instant_record": "ds", "instant_load_following": "y"}
+            )
+            if args.source == "archive"
+            else fetch_subsystem_history(subsystem_id)
+        ).sort_values("ds")
+        for subsystem_id in subsystem_ids
+    }
+
+    futures: Dict[Tuple[str, str], List[Future]] = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as process_pool:
+        for configuration in args.configurations:
+            engine, interval_settings = __parse_configuration(configuration)
+            for subsystem_id in subsystem_ids:
+                history: DataFrame = histories[subsystem_id]
+                futures[(configuration, subsystem_id)] = [
+                    process_pool.submit(
+                        backtest_cutoff,
+                        engine,
+                        Settings.CONFIG["forecast"].get(engine, {}),
+                        interval_settings,
+                        history,
+                        cutoff,
+                        Timedelta(days=args.horizon),
+                    )
+                    for cutoff in __cutoffs(history, args)
+                ]
+
+        summaries: List[Dict[str, Any]] = []
+        for (configuration, subsystem_id), cutoff_futures in futures.items():
+            if not cutoff_futures:
+                info(f"[{configuration} - {subsystem_id}] Not enough history.")
+                continue
+
+            summary: Dict[str, Any] = {
+                "configuration": configuration,
+                "subsystem_id": subsystem_id,
+                **__summarize([future.result() for future in cutoff_futures]),
+            }
+            summaries.append(summary)
+            info(
+                f"[{configuration:<26} - {subsystem_id:<2}] "
+                + f"cutoffs: {summary['cutoffs']:3d} | "
+                + f"MAPE: {summary['mape']:7.2%} | "
+                + f"RMSE: {summary['rmse']:10.2f} | "
+                + f"coverage: {summary['coverage']:6.1%} | "
+                + f"fit: {summary['fit_time']:7.3f}s | "
+                + f"predict: {summary['predict_time']:7.3f}s | "
+                + f"peak memory: {summary['peak_memory_mb']:8.1f} MB"
+            )
+
+    if args.output and summaries:
+        with open(args.output, "w", newline="") as output_file:
+            writer: csv.DictWriter = csv.DictWriter(
+                output_file, fieldnames=list(summaries[0].keys())
+            )
+            writer.writeheader()
+            writer.writerows(summaries)
+
+        info(f'Successfully created file: "{args.output}"')
+
+
+if __name__ == "__main__":
+    configure_logging()
+
+    # Same as 'program.py', silences 'DatetimeProperties.to_pydatetime'
+    # deprecation warnings.
+    simplefilter("ignore", FutureWarning)
+
+    parser: ArgumentParser = ArgumentParser(
+        description="Rolling origin backtests of forecasting engines over stored "
+        + "ONS reports."
+    )
+    parser.add_argument("--settings", default="../settings.yaml")
+    parser.add_argument(
+        "--configurations",
+        nargs="+",
+        default=["prophet:sampling", "prophet:residual_quantile", "numpy"],
+        help="Engines to evaluate, as 'engine[:interval strategy]'.",
+    )
+    parser.add_argument("--initial", type=int, default=3 * 365, help="Days.")
+    parser.add_argument("--period", type=int, default=180, help="Days.")
+    parser.add_argument("--horizon", type=int, default=30, help="Days.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="CSV summary file path.")
+    parser.add_argument(
+        "--source",
+        choices=["storage", "archive"],
+        default="storage",
+        help="Reports source, 'archive' reads closed years from local archive.",
+    )
+
+    args: Namespace = parser.parse_args()
+    Settings.load(args.settings)
+    __backtest(args)
@@ -0,0 +1,332 @@
+from argparse import ArgumentParser, Namespace
+from logging import info, warning
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Any, Callable, Dict, List, Tuple
+from pandas import DataFrame, Timedelta, Timestamp, isna, read_csv
+from db import Report, Subsystem
+from db.storage import STORAGE_MARIADB, STORAGE_SQLITE, Storage
+from forecast import fetch_subsystem_history
+from forecast.model import (
+    ENGINE_PROPHET,
+    INTERVAL_STRATEGY_REDUCED_SAMPLING,
+    INTERVAL_STRATEGY_RESIDUAL_QUANTILE,
+    INTERVAL_STRATEGY_SAMPLING,
+    ForecastModel,
+)
+from ons_data_mining import normalize_open_data_report
+from settings import Settings
+from utils import configure_logging
+from warnings import simplefilter
+
+
+def __benchmark_intervals(args: Namespace) -> None:
+    interval_strategies: List[Dict[str, Any]] = [
+        {"strategy": INTERVAL_STRATEGY_SAMPLING},
+        {
+            "strategy": INTERVAL_STRATEGY_REDUCED_SAMPLING,
+            "uncertainty_samples": args.uncertainty_samples,
+        },
+        {"strategy": INTERVAL_STRATEGY_RESIDUAL_QUANTILE},
+    ]
+    subsystems: List[Subsystem] = list(Storage.get().fetch_subsystems())
+    for subsystem in subsystems:
+        history: DataFrame = fetch_subsystem_history(
+            subsystem.subsystem_id
+        ).sort_values("ds")
+        cutoff: Timestamp = history["ds"].max() - Timedelta(days=args.horizon)
+        train_data: DataFrame = history[history["ds"] <= cutoff]
+        test_data: DataFrame = history[history["ds"] > cutoff]
+
+        info(
+            f"[{subsystem.subsystem_name}] Train: {train_data.__len__()} entries, "
+            + f"test: {test_data.__len__()} entries"
+        )
+
+        baseline_width: float | None = None
+        for interval_settings in interval_strategies:
+            model: ForecastModel = ForecastModel.create(
+                ENGINE_PROPHET,
+                Settings.CONFIG["forecast"][ENGINE_PROPHET],
+                interval_settings,
+            )
+            fit_time: float = perf_counter()
+            model.fit(train_data)
+            fit_time = perf_counter() - fit_time
+
+            predict_times: List[float] = []
+            for _ in range(args.repeat):
+                predict_time: float = perf_counter()
+                forecast: DataFrame = model.predict(test_data[["ds"]].copy())
+                predict_times.append(perf_counter() - predict_time)
+
+            interval_width: float = float(
+                (forecast["yhat_upper"] - forecast["yhat_lower"]).mean()
+            )
+            if baseline_width is None:
+                baseline_width = interval_width
+            coverage: float = float(
+                (
+                    (test_data["y"].to_numpy() >= forecast["yhat_lower"].to_numpy())
+                    & (test_data["y"].to_numpy() <= forecast["yhat_upper"].to_numpy())
+                ).mean()
+            )
+            info(
+                f"\t* {interval_settings['strategy']:<18} "
+                + f"fit: {fit_time:8.3f}s | "
+                + f"predict (best of {args.repeat}): {min(predict_times):8.3f}s | "
+                + f"width: {interval_width:10.2f} "
+                + f"({interval_width / baseline_width:6.1%} of sampling) | "
+                + f"coverage: {coverage:6.1%}"
+            )
+
+
+def __fetch_reports_dataframe(subsystem_id: str) -> DataFrame:
+    # Former 'fetch_subsystem_history' path, one 'Report' per row.
+    subsystem_reports: List[Report] = list(
+        Storage.get().fetch_reports_by_subsystem_id(subsystem_id)
+    )
+    return DataFrame(
+        [
+            subsystem_report.serialize_data()[1:]
+            for subsystem_report in subsystem_reports
+        ],
+        columns=["ds", "y"],
+    )
+
+
+def __benchmark_fetch(args: Namespace) -> None:
+    fetch_paths: List[Tuple[str, Callable[[str], DataFrame]]] = [
+        ("reports", __fetch_reports_dataframe),
+        (
+            "load_series",
+            lambda subsystem_id: Storage.get().fetch_load_series(
+                subsystem_id, batch_size=args.batch_size
+            ),
+        ),
+    ]
+    subsystems: List[Subsystem] = list(Storage.get().fetch_subsystems())
+    for subsystem in subsystems:
+        info(f"[{subsystem.subsystem_name}]")
+        for fetch_name, fetch_path in fetch_paths:
+            fetch_times: List[float] = []
+            peak_memories: List[int] = []
+            for _ in range(args.repeat):
+                start()
+                try:
+                    fetch_time: float = perf_counter()
+                    history: DataFrame = fetch_path(subsystem.subsystem_id)
+                    fetch_times.append(perf_counter() - fetch_time)
+                    _, peak_memory = get_traced_memory()
+                    peak_memories.append(peak_memory)
+                finally:
+                    stop()
+
+            info(
+                f"\t* {fetch_name:<12} "
+                + f"entries: {history.__len__():8d} | "
+                + f"fetch (best of {args.repeat}): {min(fetch_times):8.3f}s | "
+                + f"peak memory: {min(peak_memories) / 2**20:8.1f} MB | "
+                + f"result: {history.memory_usage(deep=True).sum() / 2**20:8.1f} MB"
+            )
+
+
+def __best_time(callback: Callable[[], Any], repeat: int) -> float:
+    fetch_times: List[float] = []
+    for _ in range(repeat):
+        fetch_time: float = perf_counter()
+        callback()
+        fetch_times.append(perf_counter() - fetch_time)
+    return min(fetch_times)
+
+
+def __benchmark_storage(args: Namespace) -> None:
+    # Source reports are read from the configured backend, and optionally
+    # loaded into every benchmarked one beforehand (upserts, so it's harmless
+    # to load them into the source itself).
+    subsystems: List[Subsystem] = list(Storage.get().fetch_subsystems())
+    reports: List[Report] = []
+    if args.load:
+        for subsystem in subsystems:
+            history: DataFrame = Storage.get().fetch_load_series(subsystem.subsystem_id)
+            reports += [
+                Report(subsystem.subsystem_id, instant_record, instant_load_following)
+                for instant_record, instant_load_following in zip(
+                    history["instant_record"].dt.to_pydatetime(),
+                    history["instant_load_following"].tolist(),
+                )
+            ]
+
+    for backend in args.backends:
+        storage: Storage = Storage.create(backend)
+        info(f"[{backend}]")
+
+        if args.load:
+            load_time: float = perf_counter()
+            if not storage.bulk_add_reports(reports, batch_size=args.batch_size):
+                warning("\t* Unable to load reports, skipping backend.")
+                continue
+
+            load_time = perf_counter() - load_time
+            info(
+                f"\t* {'bulk_add_reports':<36} {load_time:8.3f}s "
+                + f"({reports.__len__() / max(load_time, 1e-9):,.0f} rows/s)"
+            )
+
+        operations: List[Tuple[str, Callable[[], Any]]] = [
+            ("fetch_latest_instant_record", storage.fetch_latest_instant_record),
+            (
+                "fetch_distinct_instant_record_years",
+                lambda: list(storage.fetch_distinct_instant_record_years()),
+            ),
+            (
+                "fetch_reports_by_subsystem_id",
+                lambda: [
+                    list(storage.fetch_reports_by_subsystem_id(subsystem.subsystem_id))
+                    for subsystem in subsystems
+                ],
+            ),
+            (
+                "fetch_load_series",
+                lambda: [
+                    storage.fetch_load_series(subsystem.subsystem_id)
+                    for subsystem in subsystems
+                ],
+            ),
+        ]
+        for operation_name, operation in operations:
+            info(
+                f"\t* {operation_name:<36} {__best_time(operation, args.repeat):8.3f}s "
+                + f"(best of {args.repeat})"
+            )
+
+
+def __legacy_transform_open_data_report(
+    load_dataframe: DataFrame,
+) -> List[Dict[str, str | str | List[Dict[str, str | float]]]]:
+    # Former 'fetch_open_data_reports' loop, masking the whole report once per
+    # instant and then once per subsystem, to build JSON reports.
+    load_entries: List[Dict[str, str | str | List[Dict[str, str | float]]]] = [
+        {"id": load_subsystem_id, "nome": load_subsystem_name, "registros": []}
+        for load_subsystem_id, load_subsystem_name in zip(
+            load_dataframe["id_subsistema"].unique(),
+            load_dataframe["nom_subsistema"].unique(),
+        )
+    ]
+    for load_instant_record in load_dataframe["din_instante"].unique():
+        instant_dataframe: DataFrame = load_dataframe.loc[
+            load_dataframe["din_instante"] == load_instant_record
+        ]
+        for load_entry in load_entries:
+            load_value_datafield: DataFrame = instant_dataframe.loc[
+                instant_dataframe["id_subsistema"] == load_entry["id"]
+            ]["val_cargaenergiamwmed"]
+            if len(load_value_datafield) > 0:
+                load_value: float = float(load_value_datafield.iloc[0])
+                if isna(load_value):
+                    continue
+
+                load_entry["registros"].append(
+                    {"data": load_instant_record, "energia": load_value}
+                )
+    return load_entries
+
+
+def __to_load_records(
+    load_entries: List[Dict[str, str | str | List[Dict[str, str | float]]]],
+) -> List[Tuple[str, Timestamp, float]]:
+    return sorted(
+        (load_entry["id"], Timestamp(load_record["data"]), load_record["energia"])
+        for load_entry in load_entries
+        for load_record in load_entry["registros"]
+    )
+
+
+def __benchmark_transform(args: Namespace) -> None:
+    load_dataframe: DataFrame = read_csv(args.file, sep=";")
+    info(f"[{args.file}] Entries: {load_dataframe.__len__()}")
+
+    transformations: List[Tuple[str, Callable[[DataFrame], Any]]] = [
+        ("legacy", __legacy_transform_open_data_report),
+        ("vectorized", normalize_open_data_report),
+    ]
+    baseline: Tuple[Any, float] | None = None
+    for transformation_name, transformation in transformations:
+        transformed_data: Any = transformation(load_dataframe)
+        transform_time: float = __best_time(
+            lambda: transformation(load_dataframe), args.repeat
+        )
+        load_entries: List[Tuple[str, Timestamp, float]] = (
+            sorted(transformed_data.itertuples(index=False, name=None))
+            if isinstance(transformed_data, DataFrame)
+            else __to_load_records(transformed_data)
+        )
+        if baseline is None:
+            baseline = (load_entries, transform_time)
+
+        baseline_entries, baseline_time = baseline
+        info(
+            f"\t* {transformation_name:<12} "
+            + f"transform (best of {args.repeat}): {transform_time:8.3f}s | "
+            + f"speedup: {baseline_time / max(transform_time, 1e-9):8.1f}x | "
+            + f"same output: {load_entries == baseline_entries}"
+        )
+
+
+if __name__ == "__main__":
+    configure_logging()
+
+    # Same as 'program.py', silences 'DatetimeProperties.to_pydatetime'
+    # deprecation warnings.
+    simplefilter("ignore", FutureWarning)
+
+    parser: ArgumentParser = ArgumentParser(
+        description="Performance benchmarks over stored ONS reports."
+    )
+    parser.add_argument("--settings", default="../settings.yaml")
+    benchmark_parsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    intervals_parser: ArgumentParser = benchmark_parsers.add_parser(
+        "intervals",
+        help="Compares uncertainty interval strategies against full sampling.",
+    )
+    intervals_parser.add_argument("--horizon", type=int, default=365)
+    intervals_parser.add_argument("--repeat", type=int, default=3)
+    intervals_parser.add_argument("--uncertainty-samples", type=int, default=100)
+    intervals_parser.set_defaults(callback=__benchmark_intervals)
+
+    fetch_parser: ArgumentParser = benchmark_parsers.add_parser(
+        "fetch",
+        help="Compares per row 'Report' fetches against columnar load series fetches.",
+    )
+    fetch_parser.add_argument("--repeat", type=int, default=3)
+    fetch_parser.add_argument("--batch-size", type=int, default=50000)
+    fetch_parser.set_defaults(callback=__benchmark_fetch)
+
+    storage_parser: ArgumentParser = benchmark_parsers.add_parser(
+        "storage",
+        help="Compares storage backends on the same reports.",
+    )
+    storage_parser.add_argument(
+        "--backends", nargs="+", default=[STORAGE_MARIADB, STORAGE_SQLITE]
+    )
+    storage_parser.add_argument(
+        "--load",
+        action="store_true",
+        help="Loads reports of the configured backend into every backend first.",
+    )
+    storage_parser.add_argument("--repeat", type=int, default=3)
+    storage_parser.add_argument("--batch-size", type=int, default=1000)
+    storage_parser.set_defaults(callback=__benchmark_storage)
+
+    transform_parser: ArgumentParser = benchmark_parsers.add_parser(
+        "transform",
+        help="Compares CSV to reports transformations on an Open Data CSV file.",
+    )
+    transform_parser.add_argument("--file", required=True, help="CSV file path.")
+    transform_parser.add_argument("--repeat", type=int, default=3)
+    transform_parser.set_defaults(callback=__benchmark_transform)
+
+    args: Namespace = parser.parse_args()
+    Settings.load(args.settings)
+    args.callback(args)
@@ -1,15 +1,13 @@
 from datetime import datetime
-from logging import warning
-from typing import Any, Dict, Iterable, List, Sequence, Tuple
-from mariadb import Connection, Cursor
+from typing import Any, Dict, List, Tuple
+from numpy import array, concatenate, float64, ndarray
 from pandas import DataFrame
-from settings import Settings
-from utils import DATETIME_FORMAT, brt_now
-
-import re
+from utils import DATETIME_FORMAT
 
 
 class Report(object):
+    __slots__ = ("__subsystem_id", "__instant_record", "__instant_load_following")
+
     def __init__(
         self,
         subsystem_id: str,
@@ -73,6 +71,8 @@ class Report(object):
 
 
 class Subsystem(object):
+    __slots__ = ("__subsystem_id", "__subsystem_name")
+
     def __init__(self, subsystem_id: str, subsystem_name: str):
         self.__subsystem_id: str = subsystem_id
         self.__subsystem_name: str = subsystem_name
@@ -105,133 +105,27 @@ class ReportUtils(object):
             columns=["instant_record", "instant_load_following"],
         )
 
-
-class MariaDbUtils(object):
-    def __init__(self, *args: Tuple[Any, ...]):
-        raise SyntaxError("This is an utility class.")
-
-    @staticmethod
-    def add_reports(reports: List[Report]) -> bool:
-        with MariaDb() as mariadb:
-            return mariadb.executemany(
-                query="""
-                INSERT INTO `sin_subsystems_reports` (
-                    `subsystem_id`, `instant_record`,
-                    `instant_load_following`
-                ) VALUES (?, ?, ?)
-                """,
-                data=[report.serialize_data() for report in reports],
-            )
-
-    @staticmethod
-    def is_empty_reports() -> bool:
-        with MariaDb() as mariadb:
-            cursor: Cursor = mariadb.execute(
-                query="SELECT COUNT(`id`) FROM `sin_subsystems_reports`"
-            )
-            cursor_results: Tuple[int, ...] = cursor.fetchone()
-            (count_reports,) = cursor_results
-            return count_reports == 0
-
-    @staticmethod
-    def fetch_subsystems() -> Iterable[Subsystem]:
-        with MariaDb() as mariadb:
-            cursor: Cursor = mariadb.execute(query="SELECT * FROM `sin_subsystems`")
-            for args in cursor:
-                yield Subsystem(*args)
-
     @staticmethod
-    def fetch_subsystem_name_by_id(subsystem_id: str) -> str:
-        with MariaDb() as mariadb:
-            cursor: Cursor = mariadb.execute(
-                query="SELECT `name` FROM `sin_subsystems` WHERE `id`=?",
-                data=(subsystem_id,),
+    def to_load_series(cursor: Any, batch_size: int) -> DataFrame:
+        # Rows of ('instant_record', 'instant_load_following') are fetched on
+        # large batches straight into NumPy arrays, without any intermediate
+        # 'Report'.
+        instant_records: List[ndarray] = []
+        instant_load_followings: List[ndarray] = []
+        while rows := cursor.fetchmany(batch_size):
+            batch_instant_records, batch_instant_load_followings = zip(*rows)
+            instant_records.append(array(batch_instant_records, dtype="datetime64[us]"))
+            instant_load_followings.append(
+                array(batch_instant_load_followings, dtype=float64)
             )
-            cursor_results: Tuple[str, ...] = cursor.fetchone()
-            if cursor_results.__len__() == 0:
-                return None
 
-            (subsystem_name,) = cursor_results
-            return subsystem_name
-
-    @staticmethod
-    def fetch_reports_by_subsystem_id(subsystem_id: str) -> Iterable[Report]:
-        with MariaDb() as mariadb:
-            cursor: Cursor = mariadb.execute(
-                query="SELECT * FROM `sin_subsystems_reports` WHERE `subsystem_id`=?",
-                data=(subsystem_id,),
-            )
-            for args in cursor:
-                yield Report(*args[1:])
-
-    @staticmethod
-    def fetch_distinct_instant_record_years() -> Iterable[int]:
-        if MariaDbUtils.is_empty_reports():
-            yield None
-
-        with MariaDb() as mariadb:
-            current_year: int = brt_now().year
-            cursor: Cursor = mariadb.execute(
-                query="SELECT DISTINCT YEAR(`instant_record`) FROM `sin_subsystems_reports`"
-            )
-            for (year,) in cursor:
-                if year < current_year:
-                    yield year
-
-    @staticmethod
-    def fetch_latest_instant_record() -> datetime:
-        if MariaDbUtils.is_empty_reports():
-            return datetime.min
-
-        with MariaDb() as mariadb:
-            cursor: Cursor = mariadb.execute(
-                query="SELECT MAX(`instant_record`) FROM `sin_subsystems_reports`"
-            )
-            cursor_results: Tuple[datetime, ...] = cursor.fetchone()
-            if cursor_results.__len__() == 0:
-                return datetime.min
-
-            (instant_record,) = cursor_results
-            return instant_record
-
-
-class MariaDb(object):
-    def __init__(self):
-        self.__db_connection: Connection = None
-
-    def __enter__(self):
-        try:
-            self.__db_connection: Connection = Connection(**Settings.CONFIG["database"])
-        except Exception as err:
-            warning(f"Error connecting to MariaDB Platform: {err}", RuntimeWarning)
-        return self
-
-    def __exit__(self, *args: Tuple[Any, ...]) -> None:
-        self.__db_connection.close()
-
-    def execute(self, query: str, data: Sequence = ()) -> Cursor | bool:
-        is_select_statement: bool = bool(re.match(r"^(select).*", query.lower()))
-        db_cursor: Cursor = self.__db_connection.cursor()
-        try:
-            db_cursor.execute(query.strip(), data)
-            if is_select_statement:
-                return db_cursor
-            else:
-                return True
-        except Exception as err:
-            warning(
-                f"Error while committing changes to database: {err}", RuntimeWarning
-            )
-            return False
-
-    def executemany(self, query: str, data: List[Sequence]) -> bool:
-        db_cursor: Cursor = self.__db_connection.cursor()
-        try:
-            db_cursor.executemany(query.strip(), data)
-            return True
-        except Exception as err:
-            warning(
-                f"Error while committing massive changes to database: {err}",
-                RuntimeWarning,
-            )
-            return False
+        return DataFrame(
+            {
+                "instant_record": concatenate(instant_records)
+                if instant_records
+                else array([], dtype="datetime64[us]"),
+                "instant_load_following": concatenate(instant_load_followings)
+                if instant_load_followings
+                else array([], dtype=float64),
+            }
+        )
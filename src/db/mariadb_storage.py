@@ -0,0 +1,634 @@
+from datetime import datetime
+from itertools import islice
+from logging import warning
+from threading import Lock
+from time import sleep
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+from mariadb import Connection, ConnectionPool, Cursor, PoolError
+from pandas import DataFrame
+from db import Report, ReportUtils, Subsystem
+from db.storage import Storage
+from settings import Settings
+from utils import brt_now
+
+import os
+import re
+
+
+class MariaDbUtils(object):
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def add_reports(reports: List[Report]) -> bool:
+        with MariaDb() as mariadb:
+            mariadb.begin()
+            if not mariadb.executemany(
+                query="""
+                INSERT INTO `sin_subsystems_reports` (
+                    `subsystem_id`, `instant_record`,
+                    `instant_load_following`
+                ) VALUES (?, ?, ?)
+                ON DUPLICATE KEY UPDATE
+                    `instant_load_following`=VALUES(`instant_load_following`)
+                """,
+                data=[report.serialize_data() for report in reports],
+            ):
+                mariadb.rollback()
+                return False
+
+            if reports and not MariaDbUtils.__revise_reports(mariadb):
+                mariadb.rollback()
+                return False
+            return mariadb.commit()
+
+    @staticmethod
+    def bulk_add_reports(reports: Iterable[Report], batch_size: int = 1000) -> bool:
+        # Multi-row upserts of up to 'batch_size' reports each, all of them
+        # within a single transaction: reports are either fully loaded or not
+        # loaded at all. Reports are consumed lazily, one batch at a time.
+        reports_iterator: Iterator[Report] = iter(reports)
+        is_revised: bool = False
+        with MariaDb() as mariadb:
+            mariadb.begin()
+            while batch_reports := list(islice(reports_iterator, batch_size)):
+                if not mariadb.execute(
+                    query=f"""
+                    INSERT INTO `sin_subsystems_reports` (
+                        `subsystem_id`, `instant_record`,
+                        `instant_load_following`
+                    ) VALUES {", ".join(["(?, ?, ?)"] * batch_reports.__len__())}
+                    ON DUPLICATE KEY UPDATE
+                        `instant_load_following`=VALUES(`instant_load_following`)
+                    """,
+                    data=[
+                        value
+                        for report in batch_reports
+                        for value in report.serialize_data()
+                    ],
+                ):
+                    mariadb.rollback()
+                    return False
+                is_revised = True
+
+            if is_revised and not MariaDbUtils.__revise_reports(mariadb):
+                mariadb.rollback()
+                return False
+            return mariadb.commit()
+
+    @staticmethod
+    def __revise_reports(mariadb: "MariaDb") -> bool:
+        # Bumped within the same transaction as loaded reports.
+        return mariadb.execute(
+            query="""
+            INSERT INTO `sin_subsystems_reports_revision` (
+                `id`, `revision`, `revised_at`
+            ) VALUES (1, 1, ?)
+            ON DUPLICATE KEY UPDATE
+                `revision`=`revision` + 1,
+                `revised_at`=VALUES(`revised_at`)
+            """,
+            data=(brt_now(),),
+        )
+
+    @staticmethod
+    def is_empty_reports() -> bool:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(
+                query="SELECT COUNT(`id`) FROM `sin_subsystems_reports`"
+            )
+            cursor_results: Tuple[int, ...] = cursor.fetchone()
+            (count_reports,) = cursor_results
+            return count_reports == 0
+
+    @staticmethod
+    def fetch_subsystems() -> Iterable[Subsystem]:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(query="SELECT * FROM `sin_subsystems`")
+            for args in cursor:
+                yield Subsystem(*args)
+
+    @staticmethod
+    def fetch_subsystem_name_by_id(subsystem_id: str) -> str:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(
+                query="SELECT `name` FROM `sin_subsystems` WHERE `id`=?",
+                data=(subsystem_id,),
+            )
+            cursor_results: Tuple[str, ...] | None = cursor.fetchone()
+            if not cursor_results:
+                return None
+
+            (subsystem_name,) = cursor_results
+            return subsystem_name
+
+    @staticmethod
+    def fetch_reports_by_subsystem_id(subsystem_id: str) -> Iterable[Report]:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(
+                query="SELECT * FROM `sin_subsystems_reports` WHERE `subsystem_id`=?",
+                data=(subsystem_id,),
+            )
+            for args in cursor:
+                yield Report(*args[1:])
+
+    @staticmethod
+    def fetch_load_series(
+        subsystem_id: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 50000,
+    ) -> DataFrame:
+        # Columnar alternative to 'fetch_reports_by_subsystem_id': only both
+        # needed columns are read, streamed from an unbuffered cursor.
+        query: str = """
+            SELECT `instant_record`, `instant_load_following`
+            FROM `sin_subsystems_reports`
+            WHERE `subsystem_id`=?
+            """
+        data: List[Any] = [subsystem_id]
+        if start_period:
+            query += " AND `instant_record`>=?"
+            data.append(start_period)
+        if final_period:
+            query += " AND `instant_record`<=?"
+            data.append(final_period)
+        query += " ORDER BY `instant_record`"
+
+        with MariaDb() as mariadb:
+            return ReportUtils.to_load_series(
+                mariadb.execute(query=query, data=data, buffered=False), batch_size
+            )
+
+    @staticmethod
+    def stream_reports(
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float]]]:
+        yield from MariaDbUtils.__stream(
+            """
+            SELECT `subsystem_id`, `instant_record`, `instant_load_following`
+            FROM `sin_subsystems_reports`
+            """,
+            "instant_record",
+            subsystem_id,
+            start_period,
+            final_period,
+            batch_size,
+        )
+
+    @staticmethod
+    def fetch_distinct_instant_record_years() -> Iterable[int]:
+        with MariaDb() as mariadb:
+            current_year: int = brt_now().year
+            cursor: Cursor = mariadb.execute(
+                query="SELECT DISTINCT YEAR(`instant_record`) FROM `sin_subsystems_reports`"
+            )
+            for (year,) in cursor:
+                if year < current_year:
+                    yield year
+
+    @staticmethod
+    def fetch_latest_instant_record() -> datetime:
+        with MariaDb() as mariadb:
+            # 'MAX' yields NULL on an empty table, so there is no need to count
+            # reports on a separate connection beforehand.
+            cursor: Cursor = mariadb.execute(
+                query="SELECT MAX(`instant_record`) FROM `sin_subsystems_reports`"
+            )
+            cursor_results: Tuple[datetime, ...] = cursor.fetchone()
+            if cursor_results.__len__() == 0 or cursor_results[0] is None:
+                return datetime.min
+
+            (instant_record,) = cursor_results
+            return instant_record
+
+    @staticmethod
+    def fetch_reports_revision() -> Tuple[int, datetime]:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(
+                query="""
+                SELECT `revision`, `revised_at`
+                FROM `sin_subsystems_reports_revision`
+                WHERE `id`=1
+                """
+            )
+            cursor_results: Tuple[int, datetime] | None = cursor.fetchone()
+            if not cursor_results:
+                return 0, datetime.min
+
+            revision, revised_at = cursor_results
+            return revision, revised_at
+
+    @staticmethod
+    def replace_forecasts(
+        subsystem_id: str,
+        forecasts: List[Tuple[datetime, float, float, float]],
+        model_version: str,
+        generated_at: datetime,
+    ) -> bool:
+        with MariaDb() as mariadb:
+            # Upsert and drop outdated entries within a single transaction, so
+            # readers never see a partially replaced forecast for this
+            # subsystem, nor a mix of model versions once either one fails.
+            mariadb.begin()
+            if not mariadb.executemany(
+                query="""
+                INSERT INTO `sin_subsystems_forecasts` (
+                    `subsystem_id`, `ds`, `yhat`, `yhat_lower`, `yhat_upper`,
+                    `model_version`, `generated_at`
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON DUPLICATE KEY UPDATE
+                    `yhat`=VALUES(`yhat`),
+                    `yhat_lower`=VALUES(`yhat_lower`),
+                    `yhat_upper`=VALUES(`yhat_upper`),
+                    `model_version`=VALUES(`model_version`),
+                    `generated_at`=VALUES(`generated_at`)
+                """,
+                data=[
+                    (subsystem_id, *forecast, model_version, generated_at)
+                    for forecast in forecasts
+                ],
+            ) or not mariadb.execute(
+                query="""
+                DELETE FROM `sin_subsystems_forecasts`
+                WHERE `subsystem_id`=? AND `model_version`<>?
+                """,
+                data=(subsystem_id, model_version),
+            ):
+                mariadb.rollback()
+                return False
+
+            return mariadb.commit()
+
+    @staticmethod
+    def fetch_forecasts_coverage() -> Dict[str, Tuple[str, datetime, datetime]]:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(
+                query="""
+                SELECT `subsystem_id`, MIN(`model_version`), MIN(`ds`), MAX(`ds`)
+                FROM `sin_subsystems_forecasts`
+                GROUP BY `subsystem_id`
+                HAVING COUNT(DISTINCT `model_version`)=1
+                """
+            )
+            return {
+                subsystem_id: (model_version, min_ds, max_ds)
+                for subsystem_id, model_version, min_ds, max_ds in cursor
+            }
+
+    @staticmethod
+    def fetch_forecasts_by_period(
+        subsystem_id: str, start_period: datetime, final_period: datetime
+    ) -> Iterable[Tuple[datetime, float, float, float]]:
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(
+                query="""
+                SELECT `ds`, `yhat`, `yhat_lower`, `yhat_upper`
+                FROM `sin_subsystems_forecasts`
+                WHERE `subsystem_id`=? AND `ds` BETWEEN ? AND ?
+                ORDER BY `ds`
+                """,
+                data=(subsystem_id, start_period, final_period),
+            )
+            for args in cursor:
+                yield args
+
+    @staticmethod
+    def stream_forecasts(
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float, float, float]]]:
+        yield from MariaDbUtils.__stream(
+            """
+            SELECT `subsystem_id`, `ds`, `yhat`, `yhat_lower`, `yhat_upper`
+            FROM `sin_subsystems_forecasts`
+            """,
+            "ds",
+            subsystem_id,
+            start_period,
+            final_period,
+            batch_size,
+        )
+
+    @staticmethod
+    def __stream(
+        query: str,
+        period_column: str,
+        subsystem_id: str | None,
+        start_period: datetime | None,
+        final_period: datetime | None,
+        batch_size: int,
+    ) -> Iterable[List[Tuple[Any, ...]]]:
+        # Unbuffered, so rows are only transferred as batches are consumed.
+        conditions: List[str] = []
+        data: List[Any] = []
+        if subsystem_id:
+            conditions.append("`subsystem_id`=?")
+            data.append(subsystem_id)
+        if start_period:
+            conditions.append(f"`{period_column}`>=?")
+            data.append(start_period)
+        if final_period:
+            conditions.append(f"`{period_column}`<=?")
+            data.append(final_period)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY `subsystem_id`, `{period_column}`"
+
+        with MariaDb() as mariadb:
+            cursor: Cursor | bool = mariadb.execute(
+                query=query, data=data, buffered=False
+            )
+            if not cursor:
+                return
+
+            # Streams stopped midway (e.g. once clients disconnect) leave rows
+            # unread, which are discarded before the connection is pooled.
+            try:
+                while rows := cursor.fetchmany(batch_size):
+                    yield rows
+            finally:
+                mariadb.discard(cursor)
+
+    @staticmethod
+    def replace_load_rollups(
+        rollups: List[Tuple[str, str, datetime, float, float, float, float, int]]
+    ) -> bool:
+        with MariaDb() as mariadb:
+            return mariadb.executemany(
+                query="""
+                INSERT INTO `sin_subsystems_reports_rollups` (
+                    `subsystem_id`, `granularity`, `bucket_start`, `load_min`,
+                    `load_max`, `load_mean`, `load_sum`, `load_count`
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON DUPLICATE KEY UPDATE
+                    `load_min`=VALUES(`load_min`),
+                    `load_max`=VALUES(`load_max`),
+                    `load_mean`=VALUES(`load_mean`),
+                    `load_sum`=VALUES(`load_sum`),
+                    `load_count`=VALUES(`load_count`)
+                """,
+                data=rollups,
+            )
+
+    @staticmethod
+    def fetch_load_rollups(
+        granularity: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+    ) -> Iterable[Tuple[str, datetime, float, float, float, float, int]]:
+        query: str = """
+            SELECT `subsystem_id`, `bucket_start`, `load_min`, `load_max`,
+                `load_mean`, `load_sum`, `load_count`
+            FROM `sin_subsystems_reports_rollups`
+            WHERE `granularity`=?
+            """
+        data: List[Any] = [granularity]
+        if start_period:
+            query += " AND `bucket_start`>=?"
+            data.append(start_period)
+        if final_period:
+            query += " AND `bucket_start`<=?"
+            data.append(final_period)
+        query += " ORDER BY `subsystem_id`, `bucket_start`"
+
+        with MariaDb() as mariadb:
+            cursor: Cursor = mariadb.execute(query=query, data=data)
+            for args in cursor:
+                yield args
+
+
+class MariaDbPool(object):
+    __POOL: ConnectionPool | None = None
+    __POOL_PID: int | None = None
+    __LOCK: Lock = Lock()
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def get_connection() -> Connection:
+        pool_settings: Dict[str, Any] = Settings.CONFIG["database"].get("pool", {})
+        pool_timeout: float = pool_settings.get("timeout", 10)
+        elapsed_time: float = 0
+        while True:
+            with MariaDbPool.__LOCK:
+                try:
+                    db_connection: Connection = MariaDbPool.__pool().get_connection()
+                    break
+                except PoolError:
+                    # Pool exhausted, wait for another thread to release one.
+                    if elapsed_time >= pool_timeout:
+                        raise
+
+            sleep(0.05)
+            elapsed_time += 0.05
+
+        return db_connection
+
+    @staticmethod
+    def __pool() -> ConnectionPool:
+        # Pools can't be shared across processes, thus forked processes (e.g.
+        # uvicorn workers) lazily create their own.
+        if not MariaDbPool.__POOL or MariaDbPool.__POOL_PID != os.getpid():
+            database_settings: Dict[str, Any] = {**Settings.CONFIG["database"]}
+            pool_settings: Dict[str, Any] = database_settings.pop("pool", {})
+            # Connections are validated by the pool itself on checkout, once
+            # idle for longer than 'validation_interval' milliseconds.
+            MariaDbPool.__POOL = ConnectionPool(
+                pool_name=f"sisbin-{os.getpid()}",
+                pool_size=pool_settings.get("size", 8),
+                pool_validation_interval=pool_settings.get(
+                    "validation_interval", 500
+                ),
+                **database_settings,
+            )
+            MariaDbPool.__POOL_PID = os.getpid()
+        return MariaDbPool.__POOL
+
+
+class MariaDb(object):
+    def __init__(self):
+        self.__db_connection: Connection = None
+        self.__in_transaction: bool = False
+
+    def __enter__(self):
+        try:
+            self.__db_connection: Connection = MariaDbPool.get_connection()
+        except Exception as err:
+            warning(f"Error connecting to MariaDB Platform: {err}")
+        return self
+
+    def __exit__(self, *args: Tuple[Any, ...]) -> None:
+        # Transactions left open (e.g. due to an exception) are rolled back,
+        # otherwise they would leak into the next use of this connection.
+        if self.__in_transaction:
+            self.rollback()
+
+        # Pooled connections are given back to the pool instead of closed.
+        self.__db_connection.close()
+
+    def begin(self) -> None:
+        # Explicit transactions suspend 'autocommit' until either 'commit' or
+        # 'rollback' is called.
+        self.__db_connection.begin()
+        self.__in_transaction = True
+
+    def commit(self) -> bool:
+        try:
+            self.__db_connection.commit()
+            return True
+        except Exception as err:
+            warning(f"Error while committing transaction: {err}")
+            self.rollback()
+            return False
+        finally:
+            self.__in_transaction = False
+
+    def rollback(self) -> None:
+        try:
+            self.__db_connection.rollback()
+        except Exception as err:
+            warning(f"Error while rolling back transaction: {err}")
+        finally:
+            self.__in_transaction = False
+
+    def discard(self, db_cursor: Cursor) -> None:
+        # Pending results of unbuffered cursors would otherwise be read by
+        # the next use of this connection, hence its session is reset too.
+        try:
+            db_cursor.close()
+            self.__db_connection.reset()
+        except Exception as err:
+            warning(f"Error while discarding unread rows: {err}")
+
+    def execute(
+        self, query: str, data: Sequence = (), buffered: bool = True
+    ) -> Cursor | bool:
+        is_select_statement: bool = bool(
+            re.match(r"^(select).*", query.strip().lower())
+        )
+        # Unbuffered cursors stream results from the server as they're
+        # fetched, instead of loading the whole result set into memory.
+        db_cursor: Cursor = self.__db_connection.cursor(buffered=buffered)
+        try:
+            db_cursor.execute(query.strip(), data)
+            if is_select_statement:
+                return db_cursor
+            else:
+                return True
+        except Exception as err:
+            warning(f"Error while committing changes to database: {err}")
+            return False
+
+    def executemany(self, query: str, data: List[Sequence]) -> bool:
+        db_cursor: Cursor = self.__db_connection.cursor()
+        try:
+            db_cursor.executemany(query.strip(), data)
+            return True
+        except Exception as err:
+            warning(f"Error while committing massive changes to database: {err}")
+            return False
+
+
+class MariaDbStorage(Storage):
+    def add_reports(self, reports: List[Report]) -> bool:
+        return MariaDbUtils.add_reports(reports)
+
+    def bulk_add_reports(
+        self, reports: Iterable[Report], batch_size: int = 1000
+    ) -> bool:
+        return MariaDbUtils.bulk_add_reports(reports, batch_size=batch_size)
+
+    def is_empty_reports(self) -> bool:
+        return MariaDbUtils.is_empty_reports()
+
+    def fetch_subsystems(self) -> Iterable[Subsystem]:
+        return MariaDbUtils.fetch_subsystems()
+
+    def fetch_subsystem_name_by_id(self, subsystem_id: str) -> str:
+        return MariaDbUtils.fetch_subsystem_name_by_id(subsystem_id)
+
+    def fetch_reports_by_subsystem_id(self, subsystem_id: str) -> Iterable[Report]:
+        return MariaDbUtils.fetch_reports_by_subsystem_id(subsystem_id)
+
+    def fetch_load_series(
+        self,
+        subsystem_id: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 50000,
+    ) -> DataFrame:
+        return MariaDbUtils.fetch_load_series(
+            subsystem_id, start_period, final_period, batch_size
+        )
+
+    def stream_reports(
+        self,
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float]]]:
+        return MariaDbUtils.stream_reports(
+            subsystem_id, start_period, final_period, batch_size
+        )
+
+    def fetch_distinct_instant_record_years(self) -> Iterable[int]:
+        return MariaDbUtils.fetch_distinct_instant_record_years()
+
+    def fetch_latest_instant_record(self) -> datetime:
+        return MariaDbUtils.fetch_latest_instant_record()
+
+    def fetch_reports_revision(self) -> Tuple[int, datetime]:
+        return MariaDbUtils.fetch_reports_revision()
+
+    def replace_forecasts(
+        self,
+        subsystem_id: str,
+        forecasts: List[Tuple[datetime, float, float, float]],
+        model_version: str,
+        generated_at: datetime,
+    ) -> bool:
+        return MariaDbUtils.replace_forecasts(
+            subsystem_id, forecasts, model_version, generated_at
+        )
+
+    def fetch_forecasts_coverage(self) -> Dict[str, Tuple[str, datetime, datetime]]:
+        return MariaDbUtils.fetch_forecasts_coverage()
+
+    def fetch_forecasts_by_period(
+        self, subsystem_id: str, start_period: datetime, final_period: datetime
+    ) -> Iterable[Tuple[datetime, float, float, float]]:
+        return MariaDbUtils.fetch_forecasts_by_period(
+            subsystem_id, start_period, final_period
+        )
+
+    def stream_forecasts(
+        self,
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float, float, float]]]:
+        return MariaDbUtils.stream_forecasts(
+            subsystem_id, start_period, final_period, batch_size
+        )
+
+    def replace_load_rollups(
+        self, rollups: List[Tuple[str, str, datetime, float, float, float, float, int]]
+    ) -> bool:
+        return MariaDbUtils.replace_load_rollups(rollups)
+
+    def fetch_load_rollups(
+        self,
+        granularity: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+    ) -> Iterable[Tuple[str, datetime, float, float, float, float, int]]:
+        return MariaDbUtils.fetch_load_rollups(granularity, start_period, final_period)
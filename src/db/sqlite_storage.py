@@ -0,0 +1,425 @@
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from logging import warning
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+from pandas import DataFrame
+from db import Report, ReportUtils, Subsystem
+from db.storage import Storage
+from settings import Settings
+from utils import DATETIME_FORMAT, brt_now
+
+import os
+import sqlite3
+
+
+# Embedded backend, so the application and its benchmarks can run without a
+# database server. Datetimes are stored as 'DATETIME_FORMAT' text, which sorts
+# and compares the same way as the datetimes themselves.
+class SqliteStorage(Storage):
+    def __init__(self) -> None:
+        sqlite_settings: Dict[str, Any] = Settings.CONFIG.get("storage", {}).get(
+            "sqlite", {}
+        )
+        self.__path: str = sqlite_settings.get("path", "../.data/sisbin.sqlite3")
+        self.__timeout: float = sqlite_settings.get("timeout", 10)
+        os.makedirs(os.path.dirname(self.__path) or ".", exist_ok=True)
+        with open(
+            sqlite_settings.get("schema", "../schema.sqlite.sql"), "r"
+        ) as schema_file, self.__connect() as connection:
+            connection.executescript(schema_file.read())
+
+    def add_reports(self, reports: List[Report]) -> bool:
+        return self.bulk_add_reports(reports, batch_size=max(reports.__len__(), 1))
+
+    def bulk_add_reports(
+        self, reports: Iterable[Report], batch_size: int = 1000
+    ) -> bool:
+        reports_iterator: Iterator[Report] = iter(reports)
+        is_revised: bool = False
+        try:
+            with self.__connect() as connection:
+                while batch_reports := list(islice(reports_iterator, batch_size)):
+                    connection.executemany(
+                        """
+                        INSERT INTO `sin_subsystems_reports` (
+                            `subsystem_id`, `instant_record`,
+                            `instant_load_following`
+                        ) VALUES (?, ?, ?)
+                        ON CONFLICT (`subsystem_id`, `instant_record`) DO UPDATE SET
+                            `instant_load_following`=excluded.`instant_load_following`
+                        """,
+                        [
+                            (
+                                report.subsystem_id,
+                                SqliteStorage.__to_text(report.instant_record),
+                                report.instant_load_following,
+                            )
+                            for report in batch_reports
+                        ],
+                    )
+                    is_revised = True
+                if is_revised:
+                    connection.execute(
+                        """
+                        INSERT INTO `sin_subsystems_reports_revision` (
+                            `id`, `revision`, `revised_at`
+                        ) VALUES (1, 1, ?)
+                        ON CONFLICT (`id`) DO UPDATE SET
+                            `revision`=`revision` + 1,
+                            `revised_at`=excluded.`revised_at`
+                        """,
+                        (SqliteStorage.__to_text(brt_now()),),
+                    )
+            return True
+        except sqlite3.Error as err:
+            warning(f"Error while committing massive changes to database: {err}")
+            return False
+
+    def is_empty_reports(self) -> bool:
+        (count_reports,) = self.__fetchone(
+            "SELECT COUNT(`id`) FROM `sin_subsystems_reports`"
+        )
+        return count_reports == 0
+
+    def fetch_subsystems(self) -> Iterable[Subsystem]:
+        with self.__connect() as connection:
+            for args in connection.execute("SELECT * FROM `sin_subsystems`"):
+                yield Subsystem(*args)
+
+    def fetch_subsystem_name_by_id(self, subsystem_id: str) -> str:
+        cursor_results: Tuple[str, ...] | None = self.__fetchone(
+            "SELECT `name` FROM `sin_subsystems` WHERE `id`=?", (subsystem_id,)
+        )
+        if not cursor_results:
+            return None
+
+        (subsystem_name,) = cursor_results
+        return subsystem_name
+
+    def fetch_reports_by_subsystem_id(self, subsystem_id: str) -> Iterable[Report]:
+        with self.__connect() as connection:
+            for args in connection.execute(
+                "SELECT * FROM `sin_subsystems_reports` WHERE `subsystem_id`=?",
+                (subsystem_id,),
+            ):
+                yield Report(*args[1:])
+
+    def fetch_load_series(
+        self,
+        subsystem_id: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 50000,
+    ) -> DataFrame:
+        query: str = """
+            SELECT `instant_record`, `instant_load_following`
+            FROM `sin_subsystems_reports`
+            WHERE `subsystem_id`=?
+            """
+        data: List[Any] = [subsystem_id]
+        if start_period:
+            query += " AND `instant_record`>=?"
+            data.append(SqliteStorage.__to_text(start_period))
+        if final_period:
+            query += " AND `instant_record`<=?"
+            data.append(SqliteStorage.__to_text(final_period))
+        query += " ORDER BY `instant_record`"
+
+        with self.__connect() as connection:
+            return ReportUtils.to_load_series(
+                connection.execute(query, data), batch_size
+            )
+
+    def stream_reports(
+        self,
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float]]]:
+        yield from self.__stream(
+            """
+            SELECT `subsystem_id`, `instant_record`, `instant_load_following`
+            FROM `sin_subsystems_reports`
+            """,
+            "instant_record",
+            subsystem_id,
+            start_period,
+            final_period,
+            batch_size,
+        )
+
+    def fetch_distinct_instant_record_years(self) -> Iterable[int]:
+        current_year: int = brt_now().year
+        with self.__connect() as connection:
+            for (year,) in connection.execute(
+                """
+                SELECT DISTINCT CAST(strftime('%Y', `instant_record`) AS INTEGER)
+                FROM `sin_subsystems_reports`
+                """
+            ):
+                if year < current_year:
+                    yield year
+
+    def fetch_latest_instant_record(self) -> datetime:
+        (instant_record,) = self.__fetchone(
+            "SELECT MAX(`instant_record`) FROM `sin_subsystems_reports`"
+        )
+        if instant_record is None:
+            return datetime.min
+
+        return datetime.strptime(instant_record, DATETIME_FORMAT)
+
+    def fetch_reports_revision(self) -> Tuple[int, datetime]:
+        cursor_results: Tuple[int, str] | None = self.__fetchone(
+            """
+            SELECT `revision`, `revised_at` FROM `sin_subsystems_reports_revision`
+            WHERE `id`=1
+            """
+        )
+        if not cursor_results:
+            return 0, datetime.min
+
+        revision, revised_at = cursor_results
+        return revision, datetime.strptime(revised_at, DATETIME_FORMAT)
+
+    def replace_forecasts(
+        self,
+        subsystem_id: str,
+        forecasts: List[Tuple[datetime, float, float, float]],
+        model_version: str,
+        generated_at: datetime,
+    ) -> bool:
+        # Single transaction, so readers never see a partially replaced
+        # forecast for this subsystem.
+        try:
+            with self.__connect() as connection:
+                connection.executemany(
+                    """
+                    INSERT INTO `sin_subsystems_forecasts` (
+                        `subsystem_id`, `ds`, `yhat`, `yhat_lower`, `yhat_upper`,
+                        `model_version`, `generated_at`
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (`subsystem_id`, `ds`) DO UPDATE SET
+                        `yhat`=excluded.`yhat`,
+                        `yhat_lower`=excluded.`yhat_lower`,
+                        `yhat_upper`=excluded.`yhat_upper`,
+                        `model_version`=excluded.`model_version`,
+                        `generated_at`=excluded.`generated_at`
+                    """,
+                    [
+                        (
+                            subsystem_id,
+                            SqliteStorage.__to_text(ds),
+                            float(yhat),
+                            float(yhat_lower),
+                            float(yhat_upper),
+                            model_version,
+                            SqliteStorage.__to_text(generated_at),
+                        )
+                        for ds, yhat, yhat_lower, yhat_upper in forecasts
+                    ],
+                )
+                connection.execute(
+                    """
+                    DELETE FROM `sin_subsystems_forecasts`
+                    WHERE `subsystem_id`=? AND `model_version`<>?
+                    """,
+                    (subsystem_id, model_version),
+                )
+            return True
+        except sqlite3.Error as err:
+            warning(f"Error while committing changes to database: {err}")
+            return False
+
+    def fetch_forecasts_coverage(self) -> Dict[str, Tuple[str, datetime, datetime]]:
+        with self.__connect() as connection:
+            return {
+                subsystem_id: (
+                    model_version,
+                    datetime.strptime(min_ds, DATETIME_FORMAT),
+                    datetime.strptime(max_ds, DATETIME_FORMAT),
+                )
+                for subsystem_id, model_version, min_ds, max_ds in connection.execute(
+                    """
+                    SELECT `subsystem_id`, MIN(`model_version`), MIN(`ds`), MAX(`ds`)
+                    FROM `sin_subsystems_forecasts`
+                    GROUP BY `subsystem_id`
+                    HAVING COUNT(DISTINCT `model_version`)=1
+                    """
+                )
+            }
+
+    def fetch_forecasts_by_period(
+        self, subsystem_id: str, start_period: datetime, final_period: datetime
+    ) -> Iterable[Tuple[datetime, float, float, float]]:
+        with self.__connect() as connection:
+            for ds, yhat, yhat_lower, yhat_upper in connection.execute(
+                """
+                SELECT `ds`, `yhat`, `yhat_lower`, `yhat_upper`
+                FROM `sin_subsystems_forecasts`
+                WHERE `subsystem_id`=? AND `ds` BETWEEN ? AND ?
+                ORDER BY `ds`
+                """,
+                (
+                    subsystem_id,
+                    SqliteStorage.__to_text(start_period),
+                    SqliteStorage.__to_text(final_period),
+                ),
+            ):
+                yield (
+                    datetime.strptime(ds, DATETIME_FORMAT),
+                    yhat,
+                    yhat_lower,
+                    yhat_upper,
+                )
+
+    def stream_forecasts(
+        self,
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float, float, float]]]:
+        yield from self.__stream(
+            """
+            SELECT `subsystem_id`, `ds`, `yhat`, `yhat_lower`, `yhat_upper`
+            FROM `sin_subsystems_forecasts`
+            """,
+            "ds",
+            subsystem_id,
+            start_period,
+            final_period,
+            batch_size,
+        )
+
+    def replace_load_rollups(
+        self, rollups: List[Tuple[str, str, datetime, float, float, float, float, int]]
+    ) -> bool:
+        try:
+            with self.__connect() as connection:
+                connection.executemany(
+                    """
+                    INSERT INTO `sin_subsystems_reports_rollups` (
+                        `subsystem_id`, `granularity`, `bucket_start`, `load_min`,
+                        `load_max`, `load_mean`, `load_sum`, `load_count`
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (`granularity`, `bucket_start`, `subsystem_id`)
+                    DO UPDATE SET
+                        `load_min`=excluded.`load_min`,
+                        `load_max`=excluded.`load_max`,
+                        `load_mean`=excluded.`load_mean`,
+                        `load_sum`=excluded.`load_sum`,
+                        `load_count`=excluded.`load_count`
+                    """,
+                    [
+                        (
+                            subsystem_id,
+                            granularity,
+                            SqliteStorage.__to_text(bucket_start),
+                            *aggregates,
+                        )
+                        for (
+                            subsystem_id,
+                            granularity,
+                            bucket_start,
+                            *aggregates,
+                        ) in rollups
+                    ],
+                )
+            return True
+        except sqlite3.Error as err:
+            warning(f"Error while committing massive changes to database: {err}")
+            return False
+
+    def fetch_load_rollups(
+        self,
+        granularity: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+    ) -> Iterable[Tuple[str, datetime, float, float, float, float, int]]:
+        query: str = """
+            SELECT `subsystem_id`, `bucket_start`, `load_min`, `load_max`,
+                `load_mean`, `load_sum`, `load_count`
+            FROM `sin_subsystems_reports_rollups`
+            WHERE `granularity`=?
+            """
+        data: List[Any] = [granularity]
+        if start_period:
+            query += " AND `bucket_start`>=?"
+            data.append(SqliteStorage.__to_text(start_period))
+        if final_period:
+            query += " AND `bucket_start`<=?"
+            data.append(SqliteStorage.__to_text(final_period))
+        query += " ORDER BY `subsystem_id`, `bucket_start`"
+
+        with self.__connect() as connection:
+            for subsystem_id, bucket_start, *aggregates in connection.execute(
+                query, data
+            ):
+                yield (
+                    subsystem_id,
+                    datetime.strptime(bucket_start, DATETIME_FORMAT),
+                    *aggregates,
+                )
+
+    @contextmanager
+    def __connect(
+        self, check_same_thread: bool = True
+    ) -> Iterator[sqlite3.Connection]:
+        # Connections are cheap to open and can't be shared across threads,
+        # hence one per operation. Changes are committed on success and
+        # rolled back otherwise.
+        connection: sqlite3.Connection = sqlite3.connect(
+            self.__path, timeout=self.__timeout, check_same_thread=check_same_thread
+        )
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def __stream(
+        self,
+        query: str,
+        period_column: str,
+        subsystem_id: str | None,
+        start_period: datetime | None,
+        final_period: datetime | None,
+        batch_size: int,
+    ) -> Iterable[List[Tuple[Any, ...]]]:
+        # SQLite cursors step through results lazily, so rows are only read
+        # as batches are consumed. Consumers may resume it from any thread
+        # (e.g. streamed responses), though never concurrently.
+        conditions: List[str] = []
+        data: List[Any] = []
+        if subsystem_id:
+            conditions.append("`subsystem_id`=?")
+            data.append(subsystem_id)
+        if start_period:
+            conditions.append(f"`{period_column}`>=?")
+            data.append(SqliteStorage.__to_text(start_period))
+        if final_period:
+            conditions.append(f"`{period_column}`<=?")
+            data.append(SqliteStorage.__to_text(final_period))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY `subsystem_id`, `{period_column}`"
+
+        with self.__connect(check_same_thread=False) as connection:
+            cursor: sqlite3.Cursor = connection.execute(query, data)
+            while rows := cursor.fetchmany(batch_size):
+                # 'DATETIME_FORMAT' is ISO 8601, parsed far faster this way.
+                yield [
+                    (row_id, datetime.fromisoformat(instant), *values)
+                    for row_id, instant, *values in rows
+                ]
+
+    def __fetchone(self, query: str, data: Sequence = ()) -> Tuple[Any, ...] | None:
+        with self.__connect() as connection:
+            return connection.execute(query, data).fetchone()
+
+    @staticmethod
+    def __to_text(value: datetime) -> str:
+        return value.strftime(DATETIME_FORMAT)
@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
+from pandas import DataFrame
+from db import Report, Subsystem
+from settings import Settings
+
+STORAGE_MARIADB: str = "mariadb"
+STORAGE_SQLITE: str = "sqlite"
+
+
+class Storage(ABC):
+    __INSTANCE: "Storage | None" = None
+    __LOCK: Lock = Lock()
+
+    @abstractmethod
+    def add_reports(self, reports: List[Report]) -> bool:
+        pass
+
+    @abstractmethod
+    def bulk_add_reports(
+        self, reports: Iterable[Report], batch_size: int = 1000
+    ) -> bool:
+        # Reports must be either fully loaded or not loaded at all, and should
+        # be consumed lazily, so callers can stream them.
+        pass
+
+    @abstractmethod
+    def is_empty_reports(self) -> bool:
+        pass
+
+    @abstractmethod
+    def fetch_subsystems(self) -> Iterable[Subsystem]:
+        pass
+
+    @abstractmethod
+    def fetch_subsystem_name_by_id(self, subsystem_id: str) -> str:
+        pass
+
+    @abstractmethod
+    def fetch_reports_by_subsystem_id(self, subsystem_id: str) -> Iterable[Report]:
+        pass
+
+    @abstractmethod
+    def fetch_load_series(
+        self,
+        subsystem_id: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 50000,
+    ) -> DataFrame:
+        # Must return 'instant_record' (datetime64) and 'instant_load_following'
+        # (float64) columns, sorted by 'instant_record'.
+        pass
+
+    @abstractmethod
+    def stream_reports(
+        self,
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float]]]:
+        # Batches of up to 'batch_size' reports, sorted by subsystem and
+        # 'instant_record', read from a server-side cursor as they're consumed.
+        pass
+
+    @abstractmethod
+    def fetch_distinct_instant_record_years(self) -> Iterable[int]:
+        # Closed years only, i.e. prior to the current one.
+        pass
+
+    @abstractmethod
+    def fetch_latest_instant_record(self) -> datetime:
+        # 'datetime.min' whenever there are no reports at all.
+        pass
+
+    @abstractmethod
+    def fetch_reports_revision(self) -> Tuple[int, datetime]:
+        # (revision, revised_at) of reports, bumped along every committed load
+        # of reports, even if it didn't move the latest 'instant_record' (e.g.
+        # corrected reports). (0, 'datetime.min') until reports are loaded.
+        pass
+
+    @abstractmethod
+    def replace_forecasts(
+        self,
+        subsystem_id: str,
+        forecasts: List[Tuple[datetime, float, float, float]],
+        model_version: str,
+        generated_at: datetime,
+    ) -> bool:
+        pass
+
+    @abstractmethod
+    def fetch_forecasts_coverage(self) -> Dict[str, Tuple[str, datetime, datetime]]:
+        # (model_version, min 'ds', max 'ds') per subsystem. Subsystems whose
+        # forecasts mix model versions are left out, i.e. aren't covered.
+        pass
+
+    @abstractmethod
+    def fetch_forecasts_by_period(
+        self, subsystem_id: str, start_period: datetime, final_period: datetime
+    ) -> Iterable[Tuple[datetime, float, float, float]]:
+        pass
+
+    @abstractmethod
+    def stream_forecasts(
+        self,
+        subsystem_id: str | None = None,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+        batch_size: int = 10000,
+    ) -> Iterable[List[Tuple[str, datetime, float, float, float]]]:
+        # Same as 'stream_reports', for materialized forecasts.
+        pass
+
+    @abstractmethod
+    def replace_load_rollups(
+        self, rollups: List[Tuple[str, str, datetime, float, float, float, float, int]]
+    ) -> bool:
+        # Upserts (subsystem_id, granularity, bucket_start, min, max, mean, sum,
+        # count) entries.
+        pass
+
+    @abstractmethod
+    def fetch_load_rollups(
+        self,
+        granularity: str,
+        start_period: datetime | None = None,
+        final_period: datetime | None = None,
+    ) -> Iterable[Tuple[str, datetime, float, float, float, float, int]]:
+        # Sorted by 'subsystem_id' and 'bucket_start'.
+        pass
+
+    @staticmethod
+    def backend_class(backend: str) -> type["Storage"]:
+        # Backends are imported on demand, same as forecasting engines.
+        if backend == STORAGE_MARIADB:
+            from db.mariadb_storage import MariaDbStorage
+
+            return MariaDbStorage
+        elif backend == STORAGE_SQLITE:
+            from db.sqlite_storage import SqliteStorage
+
+            return SqliteStorage
+
+        raise ValueError(f'Unknown storage backend "{backend}".')
+
+    @staticmethod
+    def create(backend: str) -> "Storage":
+        return Storage.backend_class(backend)()
+
+    @staticmethod
+    def get() -> "Storage":
+        # Process-wide instance of the backend configured on 'settings.yaml'.
+        with Storage.__LOCK:
+            if not Storage.__INSTANCE:
+                Storage.__INSTANCE = Storage.create(
+                    Settings.CONFIG.get("storage", {}).get("backend", STORAGE_MARIADB)
+                )
+            return Storage.__INSTANCE
@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.client import responses
+from logging import info, warning
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from settings import Settings
+from urllib3.util.retry import Retry
+
+import json
+import os
+import requests
+
+
+class OpenDataDownloader(object):
+    __SESSION: requests.Session | None = None
+    __MANIFEST: Dict[str, Dict[str, str | None]] | None = None
+    __LOCK: Lock = Lock()
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def download_all(urls: List[str], target_dir: str) -> List[str]:
+        # Downloads run concurrently over a single pooled session, and only
+        # files changed since their latest download are written to
+        # 'target_dir', whose paths are returned.
+        download_settings: Dict[str, Any] = OpenDataDownloader.__settings()
+        with ThreadPoolExecutor(
+            max_workers=download_settings.get("max_workers", 4),
+            thread_name_prefix="download",
+        ) as download_executor:
+            file_paths: List[str | None] = list(
+                download_executor.map(
+                    lambda url: OpenDataDownloader.__download(url, target_dir), urls
+                )
+            )
+
+        OpenDataDownloader.__save_manifest()
+        return [file_path for file_path in file_paths if file_path]
+
+    @staticmethod
+    def discard(filename: str) -> None:
+        # Forgets validators of given file, so it's fully downloaded again on
+        # the next attempt (e.g. when it couldn't be ingested).
+        with OpenDataDownloader.__LOCK:
+            OpenDataDownloader.__manifest().pop(filename, None)
+        OpenDataDownloader.__save_manifest()
+
+    @staticmethod
+    def source_url(filename: str) -> str | None:
+        with OpenDataDownloader.__LOCK:
+            return OpenDataDownloader.__manifest().get(filename, {}).get("url")
+
+    @staticmethod
+    def __download(url: str, target_dir: str) -> str | None:
+        download_settings: Dict[str, Any] = OpenDataDownloader.__settings()
+        filename: str = os.path.basename(urlparse(url).path)
+        file_path: str = os.path.join(target_dir, filename)
+
+        # Conditional request, answered with 304 whenever the remote file
+        # didn't change since its latest download.
+        headers: Dict[str, str] = {}
+        with OpenDataDownloader.__LOCK:
+            validators: Dict[str, str | None] = OpenDataDownloader.__manifest().get(
+                filename, {}
+            )
+        if validators.get("url") == url:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            with OpenDataDownloader.session().get(
+                url,
+                headers=headers,
+                stream=True,
+                timeout=OpenDataDownloader.timeout(),
+            ) as response:
+                if response.status_code == HTTPStatus.NOT_MODIFIED:
+                    info(
+                        f"\t* [{response.status_code}] - "
+                        + f"{responses[response.status_code]} "
+                        + f'Skipping unchanged file: "{filename}"'
+                    )
+                    return None
+                elif response.status_code != HTTPStatus.OK:
+                    warning(
+                        f"\t* [{response.status_code}] - "
+                        + f"{responses.get(response.status_code, '')} "
+                        + f'Unable to download file: "{filename}"'
+                    )
+                    return None
+
+                # Streamed in chunks to a partial file, so the body is never
+                # fully held in memory nor left half written on 'target_dir'.
+                with open(f"{file_path}.part", "wb") as target_file:
+                    for chunk in response.iter_content(
+                        chunk_size=download_settings.get("chunk_size", 1048576)
+                    ):
+                        target_file.write(chunk)
+                os.replace(f"{file_path}.part", file_path)
+
+                with OpenDataDownloader.__LOCK:
+                    OpenDataDownloader.__manifest()[filename] = {
+                        "url": url,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+
+                info(
+                    f"\t* [{response.status_code}] - "
+                    + f"{responses[response.status_code]} "
+                    + f'Successfully downloaded file: "{filename}"'
+                )
+                return file_path
+        except (requests.RequestException, OSError) as err:
+            warning(f'\t* Unable to download file "{filename}": {err}')
+            # Interrupted halfway, so its partial file is useless.
+            if os.path.exists(f"{file_path}.part"):
+                os.remove(f"{file_path}.part")
+            return None
+
+    @staticmethod
+    def session() -> requests.Session:
+        # Shared by all downloads, thus keeping connections alive across
+        # files and sync cycles.
+        with OpenDataDownloader.__LOCK:
+            if not OpenDataDownloader.__SESSION:
+                download_settings: Dict[str, Any] = OpenDataDownloader.__settings()
+                http_adapter: HTTPAdapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=download_settings.get("max_workers", 4),
+                    max_retries=Retry(
+                        total=download_settings.get("retries", 3),
+                        backoff_factor=download_settings.get("backoff_factor", 0.5),
+                        status_forcelist=[
+                            HTTPStatus.TOO_MANY_REQUESTS,
+                            HTTPStatus.INTERNAL_SERVER_ERROR,
+                            HTTPStatus.BAD_GATEWAY,
+                            HTTPStatus.SERVICE_UNAVAILABLE,
+                            HTTPStatus.GATEWAY_TIMEOUT,
+                        ],
+                        allowed_methods=["HEAD", "GET"],
+                    ),
+                )
+                OpenDataDownloader.__SESSION = requests.Session()
+                OpenDataDownloader.__SESSION.mount("http://", http_adapter)
+                OpenDataDownloader.__SESSION.mount("https://", http_adapter)
+            return OpenDataDownloader.__SESSION
+
+    @staticmethod
+    def timeout() -> Tuple[float, float]:
+        download_settings: Dict[str, Any] = OpenDataDownloader.__settings()
+        return (
+            download_settings.get("connect_timeout", 10),
+            download_settings.get("read_timeout", 60),
+        )
+
+    @staticmethod
+    def __settings() -> Dict[str, Any]:
+        return Settings.CONFIG["open_data_ons"].get("downloads", {})
+
+    @staticmethod
+    def __manifest() -> Dict[str, Dict[str, str | None]]:
+        # Must be called holding '__LOCK'.
+        if OpenDataDownloader.__MANIFEST is None:
+            manifest_path: str = OpenDataDownloader.__settings().get(
+                "manifest", "../.cache/downloads.json"
+            )
+            OpenDataDownloader.__MANIFEST = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as manifest_file:
+                    OpenDataDownloader.__MANIFEST = json.load(manifest_file)
+        return OpenDataDownloader.__MANIFEST
+
+    @staticmethod
+    def __save_manifest() -> None:
+        manifest_path: str = OpenDataDownloader.__settings().get(
+            "manifest", "../.cache/downloads.json"
+        )
+        os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+        with OpenDataDownloader.__LOCK:
+            with open(f"{manifest_path}.tmp", "w") as manifest_file:
+                json.dump(OpenDataDownloader.__manifest(), manifest_file, indent=True)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
@@ -1,82 +1,537 @@
-from datetime import datetime
-from typing import Any, Dict, Iterable, List
-from prophet import Prophet
-from pandas import DataFrame
-from db import MariaDbUtils, Report, Subsystem
-from utils import DATETIME_FORMAT, number_of_days_between
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, time, timedelta
+from functools import reduce
+from logging import info, warning
+from pickle import PicklingError
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Tuple
+from pandas import (
+    DataFrame,
+    DatetimeIndex,
+    Series,
+    Timestamp,
+    date_range,
+    to_datetime,
+)
+from db import Subsystem
+from db.storage import Storage
+from forecast.cache import ForecastModelCache, ForecastWarmStart
+from forecast.model import ForecastModel
+from forecast.store import ForecastSnapshot, ForecastStore
+from settings import Settings
+from utils import DATETIME_FORMAT, brt_now, number_of_days_between
+
+
+def fetch_subsystem_history(subsystem_id: str) -> DataFrame:
+    return Storage.get().fetch_load_series(subsystem_id).rename(
+        columns={"instant_record": "ds", "instant_load_following": "y"}
+    )
+
+
+def fit_subsystem_forecast(
+    engine: str,
+    model_args: Dict[str, Any],
+    interval_settings: Dict[str, Any],
+    input_data: DataFrame,
+    forecast_period: DataFrame,
+    initial_params: Dict[str, Any] | None = None,
+) -> Tuple[str, DataFrame]:
+    # Module level function, so it can be pickled and executed by worker
+    # processes. The fitted model is returned as JSON for the same reason.
+    model: ForecastModel = ForecastModel.create(engine, model_args, interval_settings)
+    if not initial_params:
+        model.fit(input_data)
+    else:
+        try:
+            model.fit(input_data, initial_params)
+        except Exception as err:
+            warning(f"Unable to warm-start forecast model, cold fitting: {err}")
+            model = ForecastModel.create(engine, model_args, interval_settings)
+            model.fit(input_data)
+    forecast: DataFrame = model.predict(forecast_period)
+    return model.to_json(), forecast
+
+
+def refresh_materialized_forecasts(forecast_settings: Dict[str, Any]) -> None:
+    # Forecasts of the upcoming horizon are either stored on the database, or
+    # published on the forecasts store, or both. Each one is enabled apart.
+    materialized_settings: Dict[str, Any] = forecast_settings.get("materialized", {})
+    is_materialized: bool = materialized_settings.get("enabled", False)
+    if not is_materialized and not ForecastStore.is_enabled():
+        return
+
+    # The horizon is anchored to the latest report available, so materialized
+    # forecasts only become outdated once reports are synchronized, either new
+    # or corrected ones (i.e. a new reports revision).
+    watermark: datetime = Storage.get().fetch_latest_instant_record()
+    if watermark == datetime.min:
+        return
+
+    start_period: datetime = datetime.combine(watermark.date(), time.min)
+    final_period: datetime = start_period + timedelta(
+        **materialized_settings["horizon"]
+    )
+    incident_foresight: IncidentForesight = IncidentForesight(
+        start_period,
+        final_period,
+        forecast_settings["engine"],
+        **forecast_settings[forecast_settings["engine"]],
+    )
+    if incident_foresight.load_materialized(is_sync=True):
+        incident_foresight.publish()
+        info("All materialized forecasts are up to date.")
+        return
+
+    info("Refreshing materialized forecasts...")
+
+    incident_foresight.predict()
+    if is_materialized:
+        incident_foresight.materialize()
+    incident_foresight.publish()
 
 
 class IncidentForesight(object):
+    __PROCESS_POOL: ProcessPoolExecutor | None = None
+    __PROCESS_POOL_LOCK: Lock = Lock()
+
     def __init__(
-        self, start_date: datetime, final_date: datetime, **prophet_args: Dict[str, Any]
+        self,
+        start_date: datetime,
+        final_date: datetime,
+        engine: str,
+        subsystem_ids: List[str] | None = None,
+        windows: List[Tuple[datetime, datetime]] | None = None,
+        **model_args: Dict[str, Any],
     ) -> None:
-        self.__model_args: Dict[str, Any] = prophet_args
-        self.__start_date: datetime = start_date
-        self.__final_date: datetime = final_date
+        # Any number of 'windows' may be requested at once, replacing the one
+        # between 'start_date' and 'final_date', and sliced from a single
+        # forecast per subsystem. Only 'subsystem_ids' are forecasted, unless
+        # not set.
+        self.__engine: str = engine
+        self.__model_args: Dict[str, Any] = model_args
+        self.__interval_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get(
+            "intervals", {}
+        )
+        self.__model_signature: Dict[str, Any] = {
+            "engine": self.__engine,
+            "model_args": self.__model_args,
+            "intervals": self.__interval_settings,
+        }
+        self.__windows: List[Tuple[datetime, datetime]] = [
+            (
+                Timestamp(window_start_date).to_pydatetime(),
+                Timestamp(window_final_date).to_pydatetime(),
+            )
+            for window_start_date, window_final_date in (
+                windows or [(start_date, final_date)]
+            )
+        ]
+        self.__start_date: datetime = min(
+            window_start_date for window_start_date, _ in self.__windows
+        )
+        self.__final_date: datetime = max(
+            window_final_date for _, window_final_date in self.__windows
+        )
+        self.__subsystem_ids: List[str] | None = subsystem_ids
         self.__subsystems_forecasts: List[
-            Dict[str, str | Prophet | DataFrame | int]
+            Dict[str, str | ForecastModel | DataFrame | int]
         ] = []
+        self.__model_version: str | None = None
+        self.__watermark: datetime | None = None
+        self.__revision: Tuple[int, datetime] | None = None
+
+    def load_materialized(self, is_sync: bool = False) -> bool:
+        # API workers trust whatever the sync published, while the sync only
+        # reuses it if computed from the latest revision of stored reports.
+        if ForecastStore.is_enabled() and self.__load_published(is_sync):
+            return True
+
+        materialized_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get(
+            "materialized", {}
+        )
+        if not materialized_settings.get("enabled", False):
+            return False
+
+        subsystems: List[Subsystem] = self.__selected_subsystems()
+        watermark: datetime = Storage.get().fetch_latest_instant_record()
+        revision: Tuple[int, datetime] = Storage.get().fetch_reports_revision()
+        model_version: str = ForecastModelCache.version(
+            self.__model_signature, watermark, revision[0]
+        )
+        forecasts_coverage: Dict[str, Tuple[str, datetime, datetime]] = (
+            Storage.get().fetch_forecasts_coverage()
+        )
+        for subsystem in subsystems:
+            if subsystem.subsystem_id not in forecasts_coverage:
+                return False
+
+            materialized_version, min_ds, max_ds = forecasts_coverage[
+                subsystem.subsystem_id
+            ]
+            if (
+                materialized_version != model_version
+                or self.__start_date < min_ds
+                or self.__final_date > max_ds
+            ):
+                return False
+
+        for subsystem in subsystems:
+            self.__subsystems_forecasts.append(
+                {
+                    "id": subsystem.subsystem_id,
+                    "name": subsystem.subsystem_name,
+                    "forecast": DataFrame(
+                        list(
+                            Storage.get().fetch_forecasts_by_period(
+                                subsystem.subsystem_id,
+                                self.__start_date,
+                                self.__final_date,
+                            )
+                        ),
+                        columns=["ds", "yhat", "yhat_lower", "yhat_upper"],
+                    ),
+                }
+            )
+        self.__model_version = model_version
+        self.__watermark = watermark
+        self.__revision = revision
+        return True
+
+    def version(self) -> Tuple[str, datetime]:
+        # Model version the forecasts would be served from, and when their
+        # reports were last revised, without computing them.
+        if ForecastStore.is_enabled():
+            snapshot: ForecastSnapshot | None = ForecastStore.current()
+            if snapshot and self.__is_covered_by(snapshot):
+                return snapshot.model_version, snapshot.revised_at
+
+        watermark: datetime = Storage.get().fetch_latest_instant_record()
+        revision: Tuple[int, datetime] = Storage.get().fetch_reports_revision()
+        return (
+            ForecastModelCache.version(self.__model_signature, watermark, revision[0]),
+            revision[1],
+        )
+
+    def unknown_subsystem_ids(self) -> List[str]:
+        if not self.__subsystem_ids:
+            return []
+
+        subsystem_ids: List[str] = [
+            subsystem.subsystem_id for subsystem in Storage.get().fetch_subsystems()
+        ]
+        return [
+            subsystem_id
+            for subsystem_id in self.__subsystem_ids
+            if subsystem_id not in subsystem_ids
+        ]
+
+    def __selected_subsystems(self) -> List[Subsystem]:
+        return [
+            subsystem
+            for subsystem in Storage.get().fetch_subsystems()
+            if not self.__subsystem_ids
+            or subsystem.subsystem_id in self.__subsystem_ids
+        ]
+
+    def __selected_subsystem_ids(self, snapshot: ForecastSnapshot) -> List[str]:
+        return [
+            subsystem_id
+            for subsystem_id in snapshot.subsystems
+            if not self.__subsystem_ids or subsystem_id in self.__subsystem_ids
+        ]
+
+    def __is_covered_by(self, snapshot: ForecastSnapshot) -> bool:
+        if snapshot.model_version != ForecastModelCache.version(
+            self.__model_signature, snapshot.watermark, snapshot.revision
+        ):
+            return False
+
+        if self.__subsystem_ids and any(
+            subsystem_id not in snapshot.subsystems
+            for subsystem_id in self.__subsystem_ids
+        ):
+            return False
+
+        for subsystem_id in self.__selected_subsystem_ids(snapshot):
+            coverage: Tuple[datetime, datetime] | None = snapshot.coverage(
+                subsystem_id
+            )
+            if (
+                not coverage
+                or self.__start_date < coverage[0]
+                or self.__final_date > coverage[1]
+            ):
+                return False
+        return True
+
+    def __load_published(self, is_sync: bool) -> bool:
+        # Neither storage nor models are touched, so API workers only read
+        # the memory mapped forecasts published by the sync.
+        snapshot: ForecastSnapshot | None = ForecastStore.current()
+        if not snapshot or not self.__is_covered_by(snapshot):
+            return False
+
+        if is_sync and (
+            snapshot.watermark != Storage.get().fetch_latest_instant_record()
+            or snapshot.revision != Storage.get().fetch_reports_revision()[0]
+        ):
+            return False
+
+        for subsystem_id in self.__selected_subsystem_ids(snapshot):
+            self.__subsystems_forecasts.append(
+                {
+                    "id": subsystem_id,
+                    "name": snapshot.subsystems[subsystem_id]["name"],
+                    "forecast": snapshot.window(
+                        subsystem_id, self.__start_date, self.__final_date
+                    ),
+                }
+            )
+        self.__model_version = snapshot.model_version
+        self.__watermark = snapshot.watermark
+        self.__revision = (snapshot.revision, snapshot.revised_at)
+        return True
+
+    def publish(self) -> None:
+        if not ForecastStore.is_enabled():
+            return
+
+        snapshot: ForecastSnapshot | None = ForecastStore.current()
+        if snapshot and snapshot.model_version == self.__model_version:
+            return
+
+        ForecastStore.publish(
+            self.__model_version,
+            self.__watermark,
+            self.__revision,
+            [
+                (
+                    subsystem_forecast["id"],
+                    subsystem_forecast["name"],
+                    subsystem_forecast["forecast"],
+                )
+                for subsystem_forecast in self.__subsystems_forecasts
+            ],
+        )
+
+    def materialize(self) -> None:
+        generated_at: datetime = brt_now()
+        for subsystem_forecast in self.__subsystems_forecasts:
+            forecast: DataFrame = subsystem_forecast["forecast"]
+            if Storage.get().replace_forecasts(
+                subsystem_forecast["id"],
+                [
+                    (instant_record.to_pydatetime(), *map(float, estimates))
+                    for instant_record, *estimates in forecast[
+                        ["ds", "yhat", "yhat_lower", "yhat_upper"]
+                    ].itertuples(index=False)
+                ],
+                self.__model_version,
+                generated_at,
+            ):
+                info(f'\t* [{subsystem_forecast["name"]}] Forecasts materialized.')
+            else:
+                warning(
+                    f'\t* [{subsystem_forecast["name"]}] '
+                    + "Unable to materialize forecasts!"
+                )
 
     def predict(self) -> None:
-        subsystems: List[Subsystem] = list(MariaDbUtils.fetch_subsystems())
+        subsystems: List[Subsystem] = self.__selected_subsystems()
+        watermark: datetime = Storage.get().fetch_latest_instant_record()
+        revision: Tuple[int, datetime] = Storage.get().fetch_reports_revision()
+        self.__model_version = ForecastModelCache.version(
+            self.__model_signature, watermark, revision[0]
+        )
+        self.__watermark = watermark
+        self.__revision = revision
+        forecast_period: DataFrame = self.__forecast_period()
+        pending_forecasts: List[Dict[str, str | ForecastModel | DataFrame | int]] = []
         for subsystem in subsystems:
-            subsystem_forecast: Dict[str, str | Prophet | DataFrame | int] = {
+            subsystem_forecast: Dict[str, str | ForecastModel | DataFrame | int] = {
                 "id": subsystem.subsystem_id,
                 "name": subsystem.subsystem_name,
-                "model": Prophet(**self.__model_args),
+                "forecast_period": forecast_period,
+                "model_key": ForecastModelCache.key(
+                    subsystem.subsystem_id,
+                    self.__model_signature,
+                    watermark,
+                    revision[0],
+                ),
             }
-            subsystem_reports: List[Report] = list(
-                MariaDbUtils.fetch_reports_by_subsystem_id(subsystem.subsystem_id)
-            )
-            subsystem_forecast["input_data"] = DataFrame(
-                [
-                    subsystem_report.serialize_data()[1:]
-                    for subsystem_report in subsystem_reports
-                ],
-                columns=["ds", "y"],
-            )
-            subsystem_forecast["model"].fit(subsystem_forecast["input_data"])
-            subsystem_forecast["elapsed_days"] = number_of_days_between(
-                self.__start_date, self.__final_date
-            )
-            foward_period: DataFrame = subsystem_forecast[
-                "model"
-            ].make_future_dataframe(subsystem_forecast["elapsed_days"])
-            subsystem_forecast["forecast"] = subsystem_forecast["model"].predict(
-                foward_period
+            subsystem_forecast["model"] = ForecastModelCache.get(
+                subsystem_forecast["model_key"]
             )
+            if subsystem_forecast["model"]:
+                subsystem_forecast["forecast"] = subsystem_forecast["model"].predict(
+                    forecast_period
+                )
+            else:
+                subsystem_forecast["input_data"] = fetch_subsystem_history(
+                    subsystem.subsystem_id
+                )
+                subsystem_forecast["warm_start_key"] = ForecastWarmStart.key(
+                    subsystem.subsystem_id,
+                    {"engine": self.__engine, "model_args": self.__model_args},
+                )
+                subsystem_forecast["initial_params"] = (
+                    ForecastWarmStart.initial_params(
+                        subsystem_forecast["warm_start_key"],
+                        subsystem_forecast["input_data"],
+                    )
+                    if self.__is_warm_start_enabled()
+                    else None
+                )
+                pending_forecasts.append(subsystem_forecast)
             self.__subsystems_forecasts.append(subsystem_forecast)
 
+        if pending_forecasts:
+            self.__fit_pending_forecasts(pending_forecasts)
+
+    def __forecast_period(self) -> DataFrame:
+        # Only days of requested windows are predicted, so its cost scales with
+        # their length instead of the whole history plus the horizon, or the
+        # gaps between them.
+        return DataFrame(
+            {
+                "ds": reduce(
+                    DatetimeIndex.union,
+                    [
+                        date_range(window_start_date, window_final_date, freq="D")
+                        for window_start_date, window_final_date in self.__windows
+                    ],
+                )
+            }
+        )
+
+    def __fit_pending_forecasts(
+        self, pending_forecasts: List[Dict[str, str | ForecastModel | DataFrame | int]]
+    ) -> None:
+        execution_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get(
+            "execution", {}
+        )
+        results: List[Tuple[str, DataFrame]] = []
+        if execution_settings.get("mode", "sequential") == "process":
+            try:
+                process_pool: ProcessPoolExecutor = IncidentForesight.__process_pool(
+                    execution_settings.get("max_workers")
+                )
+                futures: List[Future] = [
+                    process_pool.submit(
+                        fit_subsystem_forecast,
+                        self.__engine,
+                        self.__model_args,
+                        self.__interval_settings,
+                        subsystem_forecast["input_data"],
+                        subsystem_forecast["forecast_period"],
+                        subsystem_forecast["initial_params"],
+                    )
+                    for subsystem_forecast in pending_forecasts
+                ]
+                results = [future.result() for future in futures]
+            except (BrokenProcessPool, OSError, PicklingError) as err:
+                warning(
+                    "Unable to fit forecasts on process pool, "
+                    + f"falling back to sequential mode: {err}"
+                )
+                IncidentForesight.__shutdown_process_pool()
+                results = []
+
+        if not results:
+            results = [
+                fit_subsystem_forecast(
+                    self.__engine,
+                    self.__model_args,
+                    self.__interval_settings,
+                    subsystem_forecast["input_data"],
+                    subsystem_forecast["forecast_period"],
+                    subsystem_forecast["initial_params"],
+                )
+                for subsystem_forecast in pending_forecasts
+            ]
+
+        for subsystem_forecast, (serialized_model, forecast) in zip(
+            pending_forecasts, results
+        ):
+            subsystem_forecast["model"] = ForecastModel.from_json(serialized_model)
+            subsystem_forecast["forecast"] = forecast
+            ForecastModelCache.put(
+                subsystem_forecast["model_key"], subsystem_forecast["model"]
+            )
+            if (
+                self.__is_warm_start_enabled()
+                and subsystem_forecast["model"].params
+            ):
+                ForecastWarmStart.put(
+                    subsystem_forecast["warm_start_key"],
+                    subsystem_forecast["model"],
+                    subsystem_forecast["input_data"],
+                )
+
+    def __is_warm_start_enabled(self) -> bool:
+        cache_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get("cache", {})
+        return cache_settings.get("warm_start", False)
+
+    @staticmethod
+    def __process_pool(max_workers: int | None) -> ProcessPoolExecutor:
+        with IncidentForesight.__PROCESS_POOL_LOCK:
+            if not IncidentForesight.__PROCESS_POOL:
+                IncidentForesight.__PROCESS_POOL = ProcessPoolExecutor(
+                    max_workers=max_workers
+                )
+            return IncidentForesight.__PROCESS_POOL
+
+    @staticmethod
+    def __shutdown_process_pool() -> None:
+        with IncidentForesight.__PROCESS_POOL_LOCK:
+            if IncidentForesight.__PROCESS_POOL:
+                IncidentForesight.__PROCESS_POOL.shutdown(cancel_futures=True)
+                IncidentForesight.__PROCESS_POOL = None
+
     def serialize_forecasts(
         self,
     ) -> Iterable[Dict[str, str | int | List[Dict[str, str | float]]]]:
-        for subsystem_forecast in self.__subsystems_forecasts:
-            yield {
-                "id_subsistema": subsystem_forecast["id"],
-                "nom_subsistema": subsystem_forecast["name"],
-                "din_instante_inicio": self.__start_date.strftime(DATETIME_FORMAT),
-                "din_instante_final": self.__final_date.strftime(DATETIME_FORMAT),
-                "din_instante_periodo_dias": subsystem_forecast["elapsed_days"],
-                "previsoes": list(
-                    self.__serialize_subsystem_forecast(subsystem_forecast["forecast"])
-                ),
-            }
+        # One entry per window and subsystem, all windows of a subsystem
+        # sliced from its single forecast. Windows include both of their ends,
+        # while 'din_instante_periodo_dias' is the days elapsed between them.
+        interval_strategy: str = ForecastModel.resolve_interval_strategy(
+            self.__engine, self.__interval_settings
+        )
+        for window_start_date, window_final_date in self.__windows:
+            for subsystem_forecast in self.__subsystems_forecasts:
+                forecast: DataFrame = subsystem_forecast["forecast"]
+                forecast_ds: Series = to_datetime(forecast["ds"])
+                yield {
+                    "id_subsistema": subsystem_forecast["id"],
+                    "nom_subsistema": subsystem_forecast["name"],
+                    "din_instante_inicio": window_start_date.strftime(DATETIME_FORMAT),
+                    "din_instante_final": window_final_date.strftime(DATETIME_FORMAT),
+                    "din_instante_periodo_dias": number_of_days_between(
+                        window_start_date, window_final_date
+                    ),
+                    "estrategia_intervalo": interval_strategy,
+                    "previsoes": self.__serialize_subsystem_forecast(
+                        forecast[
+                            (forecast_ds >= window_start_date)
+                            & (forecast_ds <= window_final_date)
+                        ]
+                    ),
+                }
 
     def __serialize_subsystem_forecast(
         self, forecast: DataFrame
-    ) -> Iterable[Dict[str, str | float]]:
-        sliced_forecast: DataFrame = forecast[(forecast["ds"] >= self.__start_date)]
-        sliced_forecast = sliced_forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
-        for args in sliced_forecast.itertuples(index=False):
-            instant_record: datetime = args[0]
-            instant_load_following_estimated: float = args[1]
-            instant_load_following_min: float = args[2]
-            instant_load_following_max: float = args[3]
-            yield {
-                "din_instante": instant_record.strftime(DATETIME_FORMAT),
-                "val_cargaenergiamwmed_estimado": instant_load_following_estimated,
-                "val_cargaenergiamwmed_min": instant_load_following_min,
-                "val_cargaenergiamwmed_max": instant_load_following_max,
-                "val_cargaenergia_variacao": instant_load_following_max
-                - instant_load_following_min,
-            }
\ No newline at end of file
+    ) -> List[Dict[str, str | float]]:
+        # Column-wise, then split into records at once.
+        return DataFrame(
+            {
+                "din_instante": to_datetime(forecast["ds"]).dt.strftime(
+                    DATETIME_FORMAT
+                ),
+                "val_cargaenergiamwmed_estimado": forecast["yhat"],
+                "val_cargaenergiamwmed_min": forecast["yhat_lower"],
+                "val_cargaenergiamwmed_max": forecast["yhat_upper"],
+                "val_cargaenergia_variacao": forecast["yhat_upper"]
+                - forecast["yhat_lower"],
+            }
+        ).to_dict("records")
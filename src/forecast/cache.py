@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha1
+from logging import info, warning
+from math import isclose
+from threading import Lock
+from typing import Any, Dict, Tuple
+from pandas import DataFrame, Timestamp
+from forecast.model import ForecastModel
+from settings import Settings
+
+import glob
+import json
+import os
+
+
+class ForecastModelCache(object):
+    __MODELS: "OrderedDict[str, ForecastModel]" = OrderedDict()
+    __LOCK: Lock = Lock()
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def version(model_args: Dict[str, Any], watermark: datetime, revision: int) -> str:
+        # Reports revision is bumped by every load of reports, so corrected
+        # reports outdate models even if the watermark stays the same.
+        raw_version: str = json.dumps(
+            {"model_args": model_args, "watermark": watermark, "revision": revision},
+            sort_keys=True,
+            default=str,
+        )
+        return sha1(raw_version.encode("utf8")).hexdigest()
+
+    @staticmethod
+    def key(
+        subsystem_id: str,
+        model_args: Dict[str, Any],
+        watermark: datetime,
+        revision: int,
+    ) -> str:
+        return (
+            f"{subsystem_id}-"
+            + ForecastModelCache.version(model_args, watermark, revision)
+        )
+
+    @staticmethod
+    def get(key: str) -> ForecastModel | None:
+        if not ForecastModelCache.__is_enabled():
+            return None
+
+        with ForecastModelCache.__LOCK:
+            model: ForecastModel | None = ForecastModelCache.__MODELS.get(key)
+            if model:
+                ForecastModelCache.__MODELS.move_to_end(key)
+                return model
+
+            model_path: str = ForecastModelCache.__model_path(key)
+            if not os.path.exists(model_path):
+                return None
+
+            try:
+                with open(model_path, "r") as model_file:
+                    model = ForecastModel.from_json(model_file.read())
+            except Exception as err:
+                warning(f'Unable to load cached model "{key}": {err}')
+                return None
+
+            ForecastModelCache.__remember(key, model)
+            return model
+
+    @staticmethod
+    def put(key: str, model: ForecastModel) -> None:
+        if not ForecastModelCache.__is_enabled():
+            return
+
+        with ForecastModelCache.__LOCK:
+            ForecastModelCache.__remember(key, model)
+
+            cache_dir: str = ForecastModelCache.__cache_dir()
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+
+            # Write on a temporary file first, so a concurrent reader never
+            # sees a partially serialized model.
+            model_path: str = ForecastModelCache.__model_path(key)
+            with open(f"{model_path}.tmp", "w") as model_file:
+                model_file.write(model.to_json())
+            os.replace(f"{model_path}.tmp", model_path)
+
+    @staticmethod
+    def invalidate() -> None:
+        with ForecastModelCache.__LOCK:
+            ForecastModelCache.__MODELS.clear()
+
+            cache_dir: str = ForecastModelCache.__cache_dir()
+            info(f'Invalidating all cached forecast models from path "{cache_dir}"...')
+
+            for file in glob.glob(os.path.join(cache_dir, "*.json")):
+                os.remove(file)
+
+    @staticmethod
+    def __remember(key: str, model: ForecastModel) -> None:
+        # Must be called holding '__LOCK'. Bounded, since 'invalidate' only
+        # runs on the ingestion worker process, while API processes would
+        # otherwise keep models of every reports revision they've ever seen.
+        cache_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get("cache", {})
+        ForecastModelCache.__MODELS[key] = model
+        ForecastModelCache.__MODELS.move_to_end(key)
+        while ForecastModelCache.__MODELS.__len__() > cache_settings.get(
+            "max_models", 8
+        ):
+            ForecastModelCache.__MODELS.popitem(last=False)
+
+    @staticmethod
+    def __is_enabled() -> bool:
+        cache_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get("cache", {})
+        return cache_settings.get("enabled", False)
+
+    @staticmethod
+    def __cache_dir() -> str:
+        cache_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get("cache", {})
+        return os.path.join(os.getcwd(), cache_settings.get("dir", "../.cache"))
+
+    @staticmethod
+    def __model_path(key: str) -> str:
+        return os.path.join(ForecastModelCache.__cache_dir(), f"{key}.json")
+
+
+class ForecastWarmStart(object):
+    __STATES: Dict[str, Dict[str, Any]] = {}
+    __LOCK: Lock = Lock()
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def key(subsystem_id: str, model_args: Dict[str, Any]) -> str:
+        raw_key: str = json.dumps(model_args, sort_keys=True, default=str)
+        return f"{subsystem_id}-{sha1(raw_key.encode('utf8')).hexdigest()}"
+
+    @staticmethod
+    def initial_params(key: str, input_data: DataFrame) -> Dict[str, Any] | None:
+        with ForecastWarmStart.__LOCK:
+            state: Dict[str, Any] | None = ForecastWarmStart.__STATES.get(key)
+            if not state:
+                state = ForecastWarmStart.__load_state(key)
+            if not state:
+                return None
+
+        # Warm-start is only worth it when the previous history is a prefix of
+        # the current one (i.e. new days were appended). Anything else, like a
+        # historical backfill or a corrected report, requires a cold fit.
+        previous_data: DataFrame = input_data[
+            input_data["ds"] <= Timestamp(state["last_ds"])
+        ]
+        if (
+            input_data.empty
+            or Timestamp(state["first_ds"]) != input_data["ds"].min()
+            or previous_data.__len__() != state["rows"]
+            or not isclose(float(previous_data["y"].sum()), state["y_sum"])
+        ):
+            info(f'Data changed discontinuously for model "{key}", cold fitting...')
+            return None
+
+        return state["params"]
+
+    @staticmethod
+    def put(key: str, model: ForecastModel, input_data: DataFrame) -> None:
+        state: Dict[str, Any] = {
+            "params": model.params,
+            "first_ds": str(input_data["ds"].min()),
+            "last_ds": str(input_data["ds"].max()),
+            "rows": input_data.__len__(),
+            "y_sum": float(input_data["y"].sum()),
+        }
+        with ForecastWarmStart.__LOCK:
+            ForecastWarmStart.__STATES[key] = state
+
+            state_dir: str = ForecastWarmStart.__state_dir()
+            if not os.path.exists(state_dir):
+                os.makedirs(state_dir)
+
+            state_path: str = os.path.join(state_dir, f"{key}.json")
+            with open(f"{state_path}.tmp", "w") as state_file:
+                state_file.write(json.dumps(state))
+            os.replace(f"{state_path}.tmp", state_path)
+
+    @staticmethod
+    def __load_state(key: str) -> Dict[str, Any] | None:
+        state_path: str = os.path.join(ForecastWarmStart.__state_dir(), f"{key}.json")
+        if not os.path.exists(state_path):
+            return None
+
+        try:
+            with open(state_path, "r") as state_file:
+                state: Dict[str, Any] = json.loads(state_file.read())
+        except Exception as err:
+            warning(f'Unable to load warm-start state "{key}": {err}')
+            return None
+
+        ForecastWarmStart.__STATES[key] = state
+        return state
+
+    @staticmethod
+    def __state_dir() -> str:
+        # Kept apart from cached models, since warm-start states must survive
+        # the cache invalidation triggered by new reports.
+        cache_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get("cache", {})
+        return os.path.join(
+            os.getcwd(), cache_settings.get("dir", "../.cache"), "warm_start"
+        )
@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple
+from pandas import DataFrame
+
+import json
+
+ENGINE_PROPHET: str = "prophet"
+ENGINE_SEASONAL: str = "numpy"
+
+INTERVAL_STRATEGY_SAMPLING: str = "sampling"
+INTERVAL_STRATEGY_REDUCED_SAMPLING: str = "reduced_sampling"
+INTERVAL_STRATEGY_RESIDUAL_QUANTILE: str = "residual_quantile"
+
+
+class ForecastModel(ABC):
+    # Interval strategies supported by the engine, the first one is used
+    # whenever the configured strategy isn't supported.
+    INTERVAL_STRATEGIES: Tuple[str, ...] = ()
+
+    @property
+    @abstractmethod
+    def engine(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def interval_strategy(self) -> str:
+        pass
+
+    @property
+    def params(self) -> Dict[str, float | List[float]] | None:
+        # Fitted parameters used to warm-start refits, if supported.
+        return None
+
+    @abstractmethod
+    def fit(
+        self, input_data: DataFrame, initial_params: Dict[str, Any] | None = None
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def predict(self, forecast_period: DataFrame) -> DataFrame:
+        # Must return at least 'ds', 'yhat', 'yhat_lower' and 'yhat_upper'.
+        pass
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def from_dict(raw_model: Dict[str, Any]) -> "ForecastModel":
+        pass
+
+    def to_json(self) -> str:
+        return json.dumps({"engine": self.engine, "model": self.to_dict()})
+
+    @staticmethod
+    def engine_class(engine: str) -> type["ForecastModel"]:
+        # Engines are imported on demand, so deployments using the NumPy engine
+        # never pay for importing Prophet and cmdstan.
+        if engine == ENGINE_PROPHET:
+            from forecast.prophet_model import ProphetForecastModel
+
+            return ProphetForecastModel
+        elif engine == ENGINE_SEASONAL:
+            from forecast.seasonal_model import SeasonalForecastModel
+
+            return SeasonalForecastModel
+
+        raise ValueError(f'Unknown forecast engine "{engine}".')
+
+    @staticmethod
+    def create(
+        engine: str, model_args: Dict[str, Any], interval_settings: Dict[str, Any]
+    ) -> "ForecastModel":
+        return ForecastModel.engine_class(engine)(model_args, interval_settings)
+
+    @staticmethod
+    def from_json(serialized_model: str) -> "ForecastModel":
+        raw_model: Dict[str, Any] = json.loads(serialized_model)
+        return ForecastModel.engine_class(raw_model["engine"]).from_dict(
+            raw_model["model"]
+        )
+
+    @staticmethod
+    def resolve_interval_strategy(
+        engine: str, interval_settings: Dict[str, Any]
+    ) -> str:
+        strategies: Tuple[str, ...] = ForecastModel.engine_class(
+            engine
+        ).INTERVAL_STRATEGIES
+        strategy: str = interval_settings.get("strategy", strategies[0])
+        return strategy if strategy in strategies else strategies[0]
@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Tuple
+from numpy import array, ndarray, quantile
+from pandas import DataFrame
+from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
+from forecast.model import (
+    ENGINE_PROPHET,
+    INTERVAL_STRATEGY_REDUCED_SAMPLING,
+    INTERVAL_STRATEGY_RESIDUAL_QUANTILE,
+    INTERVAL_STRATEGY_SAMPLING,
+    ForecastModel,
+)
+
+
+class ProphetForecastModel(ForecastModel):
+    INTERVAL_STRATEGIES: Tuple[str, ...] = (
+        INTERVAL_STRATEGY_SAMPLING,
+        INTERVAL_STRATEGY_REDUCED_SAMPLING,
+        INTERVAL_STRATEGY_RESIDUAL_QUANTILE,
+    )
+
+    def __init__(
+        self, model_args: Dict[str, Any], interval_settings: Dict[str, Any]
+    ) -> None:
+        self.__model: Prophet = Prophet(**model_args)
+        self.__interval_settings: Dict[str, Any] = interval_settings
+        self.__residual_quantiles: Tuple[float, float] | None = None
+
+    @property
+    def engine(self) -> str:
+        return ENGINE_PROPHET
+
+    @property
+    def interval_strategy(self) -> str:
+        return ForecastModel.resolve_interval_strategy(
+            ENGINE_PROPHET, self.__interval_settings
+        )
+
+    @property
+    def params(self) -> Dict[str, float | List[float]]:
+        return {
+            **{
+                param: float(self.__model.params[param][0][0])
+                for param in ["k", "m", "sigma_obs"]
+            },
+            **{
+                param: self.__model.params[param][0].tolist()
+                for param in ["delta", "beta"]
+            },
+        }
+
+    def fit(
+        self, input_data: DataFrame, initial_params: Dict[str, Any] | None = None
+    ) -> None:
+        if initial_params:
+            self.__model.fit(
+                input_data,
+                init={
+                    param: array(value) if isinstance(value, list) else value
+                    for param, value in initial_params.items()
+                },
+            )
+        else:
+            self.__model.fit(input_data)
+
+        if self.interval_strategy == INTERVAL_STRATEGY_RESIDUAL_QUANTILE:
+            self.__residual_quantiles = self.__fit_residual_quantiles(input_data)
+
+    def predict(self, forecast_period: DataFrame) -> DataFrame:
+        uncertainty_samples: int = self.__model.uncertainty_samples
+        if self.interval_strategy == INTERVAL_STRATEGY_REDUCED_SAMPLING:
+            self.__model.uncertainty_samples = self.__interval_settings.get(
+                "uncertainty_samples", 100
+            )
+        elif self.interval_strategy == INTERVAL_STRATEGY_RESIDUAL_QUANTILE:
+            # Skips Prophet's trajectories simulation entirely, intervals are
+            # derived from the in-sample residuals quantiles computed on fit.
+            self.__model.uncertainty_samples = 0
+
+        try:
+            forecast: DataFrame = self.__model.predict(forecast_period)
+        finally:
+            self.__model.uncertainty_samples = uncertainty_samples
+
+        if self.interval_strategy == INTERVAL_STRATEGY_RESIDUAL_QUANTILE:
+            lower_quantile, upper_quantile = self.__residual_quantiles
+            forecast["yhat_lower"] = forecast["yhat"] + lower_quantile
+            forecast["yhat_upper"] = forecast["yhat"] + upper_quantile
+        return forecast
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": model_to_json(self.__model),
+            "interval_settings": self.__interval_settings,
+            "residual_quantiles": self.__residual_quantiles,
+        }
+
+    @staticmethod
+    def from_dict(raw_model: Dict[str, Any]) -> "ProphetForecastModel":
+        forecast_model: ProphetForecastModel = ProphetForecastModel(
+            {}, raw_model["interval_settings"]
+        )
+        forecast_model.__model = model_from_json(raw_model["model"])
+        if raw_model["residual_quantiles"]:
+            forecast_model.__residual_quantiles = tuple(
+                raw_model["residual_quantiles"]
+            )
+        return forecast_model
+
+    def __fit_residual_quantiles(self, input_data: DataFrame) -> Tuple[float, float]:
+        uncertainty_samples: int = self.__model.uncertainty_samples
+        self.__model.uncertainty_samples = 0
+        try:
+            fitted_data: DataFrame = self.__model.predict(input_data[["ds"]].copy())
+        finally:
+            self.__model.uncertainty_samples = uncertainty_samples
+
+        # Prophet sorts its input by 'ds', so do the same for the residuals.
+        sorted_data: DataFrame = input_data.sort_values("ds")
+        residuals: ndarray = (
+            sorted_data["y"].to_numpy() - fitted_data["yhat"].to_numpy()
+        )
+        interval_width: float = self.__model.interval_width
+        lower_quantile, upper_quantile = quantile(
+            residuals, [(1 - interval_width) / 2, (1 + interval_width) / 2]
+        )
+        return float(lower_quantile), float(upper_quantile)
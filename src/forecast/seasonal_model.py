@@ -0,0 +1,154 @@
+from typing import Any, Dict, List, Tuple
+from numpy import (
+    absolute,
+    arange,
+    array,
+    concatenate,
+    cos,
+    eye,
+    int64,
+    linspace,
+    maximum,
+    ndarray,
+    ones,
+    pi,
+    quantile,
+    sin,
+    sqrt,
+    vstack,
+    zeros,
+)
+from numpy.linalg import lstsq
+from pandas import DataFrame
+from forecast.model import (
+    ENGINE_SEASONAL,
+    INTERVAL_STRATEGY_RESIDUAL_QUANTILE,
+    ForecastModel,
+)
+
+DAYS_PER_WEEK: float = 7.0
+DAYS_PER_YEAR: float = 365.25
+
+
+# Lightweight alternative to Prophet for daily load series: a piecewise linear
+# trend plus weekly and yearly Fourier terms (same components evaluated by
+# 'seasonal_decompose' on 'notebooks/SERIES_TEMPORAIS_ANALISE.ipynb'), fitted
+# in closed form by ridge regularized least squares.
+class SeasonalForecastModel(ForecastModel):
+    INTERVAL_STRATEGIES: Tuple[str, ...] = (INTERVAL_STRATEGY_RESIDUAL_QUANTILE,)
+
+    def __init__(
+        self, model_args: Dict[str, Any], interval_settings: Dict[str, Any]
+    ) -> None:
+        self.__model_args: Dict[str, Any] = model_args
+        self.__interval_settings: Dict[str, Any] = interval_settings
+        self.__origin: int = 0
+        self.__scale: float = 1.0
+        self.__y_scale: float = 1.0
+        self.__changepoints: ndarray = zeros(0)
+        self.__coefficients: ndarray = zeros(0)
+        self.__residual_quantiles: Tuple[float, float] = (0.0, 0.0)
+
+    @property
+    def engine(self) -> str:
+        return ENGINE_SEASONAL
+
+    @property
+    def interval_strategy(self) -> str:
+        return INTERVAL_STRATEGY_RESIDUAL_QUANTILE
+
+    def fit(
+        self, input_data: DataFrame, initial_params: Dict[str, Any] | None = None
+    ) -> None:
+        # Closed form fit, there is nothing to warm-start from.
+        sorted_data: DataFrame = input_data.sort_values("ds")
+        days: ndarray = self.__to_days(sorted_data)
+        y: ndarray = sorted_data["y"].to_numpy(dtype=float)
+
+        self.__origin = int(days[0])
+        self.__scale = float(max(days[-1] - days[0], 1))
+        self.__y_scale = float(absolute(y).max()) or 1.0
+        n_changepoints: int = self.__model_args.get("n_changepoints", 25)
+        changepoint_range: float = self.__model_args.get("changepoint_range", 0.8)
+        self.__changepoints = linspace(0, changepoint_range, n_changepoints + 2)[1:-1]
+
+        features: ndarray = self.__features(days)
+        # Ridge penalty on changepoints and seasonalities only, so the
+        # intercept and base slope are left unconstrained.
+        regularization: float = self.__model_args.get("regularization", 1.0)
+        penalty: ndarray = sqrt(regularization) * eye(features.shape[1])[2:]
+        self.__coefficients, *_ = lstsq(
+            vstack([features, penalty]),
+            concatenate([y / self.__y_scale, zeros(penalty.shape[0])]),
+            rcond=None,
+        )
+
+        residuals: ndarray = y - (features @ self.__coefficients) * self.__y_scale
+        # Same default as Prophet, both read 0.95 from settings.
+        interval_width: float = self.__model_args.get("interval_width", 0.8)
+        lower_quantile, upper_quantile = quantile(
+            residuals, [(1 - interval_width) / 2, (1 + interval_width) / 2]
+        )
+        self.__residual_quantiles = (float(lower_quantile), float(upper_quantile))
+
+    def predict(self, forecast_period: DataFrame) -> DataFrame:
+        yhat: ndarray = (
+            self.__features(self.__to_days(forecast_period)) @ self.__coefficients
+        ) * self.__y_scale
+        lower_quantile, upper_quantile = self.__residual_quantiles
+        return DataFrame(
+            {
+                "ds": forecast_period["ds"].to_numpy(),
+                "yhat": yhat,
+                "yhat_lower": yhat + lower_quantile,
+                "yhat_upper": yhat + upper_quantile,
+            }
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model_args": self.__model_args,
+            "interval_settings": self.__interval_settings,
+            "origin": self.__origin,
+            "scale": self.__scale,
+            "y_scale": self.__y_scale,
+            "changepoints": self.__changepoints.tolist(),
+            "coefficients": self.__coefficients.tolist(),
+            "residual_quantiles": self.__residual_quantiles,
+        }
+
+    @staticmethod
+    def from_dict(raw_model: Dict[str, Any]) -> "SeasonalForecastModel":
+        forecast_model: SeasonalForecastModel = SeasonalForecastModel(
+            raw_model["model_args"], raw_model["interval_settings"]
+        )
+        forecast_model.__origin = raw_model["origin"]
+        forecast_model.__scale = raw_model["scale"]
+        forecast_model.__y_scale = raw_model["y_scale"]
+        forecast_model.__changepoints = array(raw_model["changepoints"])
+        forecast_model.__coefficients = array(raw_model["coefficients"])
+        forecast_model.__residual_quantiles = tuple(raw_model["residual_quantiles"])
+        return forecast_model
+
+    def __to_days(self, data: DataFrame) -> ndarray:
+        return data["ds"].to_numpy(dtype="datetime64[D]").astype(int64)
+
+    def __features(self, days: ndarray) -> ndarray:
+        t: ndarray = (days - self.__origin) / self.__scale
+        columns: List[ndarray] = [
+            ones(t.shape[0]),
+            t,
+            maximum(t[:, None] - self.__changepoints[None, :], 0),
+        ]
+        for period, order in [
+            (DAYS_PER_WEEK, self.__model_args.get("weekly_order", 3)),
+            (DAYS_PER_YEAR, self.__model_args.get("yearly_order", 10)),
+        ]:
+            angles: ndarray = (
+                2 * pi * (days[:, None] % period) / period * arange(1, order + 1)
+            )
+            columns += [sin(angles), cos(angles)]
+        return concatenate(
+            [column if column.ndim == 2 else column[:, None] for column in columns],
+            axis=1,
+        )
@@ -0,0 +1,224 @@
+from datetime import datetime
+from logging import info, warning
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+from numpy import concatenate, datetime64, empty, load, ndarray, save, searchsorted
+from pandas import DataFrame, Timestamp
+from settings import Settings
+from utils import DATETIME_FORMAT, brt_now
+
+import json
+import os
+import shutil
+
+FORECAST_STORE_COLUMNS: List[str] = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+
+class ForecastSnapshot(object):
+    # Published forecasts of all subsystems, whose columns are memory mapped
+    # and sorted by subsystem then 'ds', hence windows are sliced zero-copy.
+    __slots__ = (
+        "name",
+        "model_version",
+        "watermark",
+        "revision",
+        "revised_at",
+        "subsystems",
+        "__columns",
+    )
+
+    def __init__(
+        self, name: str, metadata: Dict[str, Any], columns: Dict[str, ndarray]
+    ) -> None:
+        self.name: str = name
+        self.model_version: str = metadata["model_version"]
+        self.watermark: datetime = datetime.strptime(
+            metadata["watermark"], DATETIME_FORMAT
+        )
+        # Versions published before reports were revisioned have neither.
+        self.revision: int = metadata.get("revision", 0)
+        self.revised_at: datetime = (
+            datetime.strptime(metadata["revised_at"], DATETIME_FORMAT)
+            if metadata.get("revised_at")
+            else datetime.min
+        )
+        self.subsystems: Dict[str, Dict[str, Any]] = metadata["subsystems"]
+        self.__columns: Dict[str, ndarray] = columns
+
+    def coverage(self, subsystem_id: str) -> Tuple[datetime, datetime] | None:
+        ds: ndarray = self.__slice(subsystem_id)["ds"]
+        if not ds.__len__():
+            return None
+        return Timestamp(ds[0]).to_pydatetime(), Timestamp(ds[-1]).to_pydatetime()
+
+    def window(
+        self, subsystem_id: str, start_period: datetime, final_period: datetime
+    ) -> DataFrame:
+        subsystem_columns: Dict[str, ndarray] = self.__slice(subsystem_id)
+        start_index: int = searchsorted(
+            subsystem_columns["ds"], datetime64(start_period, "s"), side="left"
+        )
+        final_index: int = searchsorted(
+            subsystem_columns["ds"], datetime64(final_period, "s"), side="right"
+        )
+        return DataFrame(
+            {
+                column: subsystem_columns[column][start_index:final_index]
+                for column in FORECAST_STORE_COLUMNS
+            },
+            copy=False,
+        )
+
+    def __slice(self, subsystem_id: str) -> Dict[str, ndarray]:
+        start_offset, final_offset = self.subsystems[subsystem_id]["offsets"]
+        return {
+            column: values[start_offset:final_offset]
+            for column, values in self.__columns.items()
+        }
+
+
+# Forecasts published as versioned directories of '.npy' files, one per
+# column, plus 'CURRENT' pointing to the latest one. Any number of API workers
+# map the very same files, while a single producer publishes new versions.
+class ForecastStore(object):
+    __SNAPSHOT: ForecastSnapshot | None = None
+    __POINTER: Tuple[int, int] | None = None
+    __LOCK: Lock = Lock()
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return ForecastStore.__settings().get("enabled", False)
+
+    @staticmethod
+    def publish(
+        model_version: str,
+        watermark: datetime,
+        revision: Tuple[int, datetime],
+        subsystems_forecasts: List[Tuple[str, str, DataFrame]],
+    ) -> str:
+        store_dir: str = ForecastStore.__store_dir()
+        name: str = f"{brt_now().strftime('%Y%m%d%H%M%S')}-{model_version[:12]}"
+        version_dir: str = os.path.join(store_dir, name)
+        # Leftovers of an interrupted publication would be published as well.
+        shutil.rmtree(f"{version_dir}.tmp", ignore_errors=True)
+        os.makedirs(f"{version_dir}.tmp")
+
+        columns: Dict[str, List[ndarray]] = {
+            column: [] for column in FORECAST_STORE_COLUMNS
+        }
+        subsystems: Dict[str, Dict[str, Any]] = {}
+        offset: int = 0
+        for subsystem_id, subsystem_name, forecast in subsystems_forecasts:
+            forecast = forecast.sort_values("ds")
+            columns["ds"].append(forecast["ds"].to_numpy(dtype="datetime64[s]"))
+            for column in FORECAST_STORE_COLUMNS[1:]:
+                columns[column].append(forecast[column].to_numpy(dtype="float64"))
+            subsystems[subsystem_id] = {
+                "name": subsystem_name,
+                "offsets": [offset, offset + forecast.__len__()],
+            }
+            offset += forecast.__len__()
+
+        for column, values in columns.items():
+            save(
+                os.path.join(f"{version_dir}.tmp", f"{column}.npy"),
+                concatenate(values) if values else empty(0),
+            )
+        metadata_path: str = os.path.join(f"{version_dir}.tmp", "metadata.json")
+        with open(metadata_path, "w") as metadata_file:
+            json.dump(
+                {
+                    "model_version": model_version,
+                    "watermark": watermark.strftime(DATETIME_FORMAT),
+                    "revision": revision[0],
+                    "revised_at": (
+                        revision[1].strftime(DATETIME_FORMAT) if revision[0] else None
+                    ),
+                    "published_at": brt_now().strftime(DATETIME_FORMAT),
+                    "subsystems": subsystems,
+                },
+                metadata_file,
+                indent=True,
+            )
+
+        # The version is fully written before 'CURRENT' points to it, so
+        # readers switch over atomically.
+        os.replace(f"{version_dir}.tmp", version_dir)
+        pointer_path: str = os.path.join(store_dir, "CURRENT")
+        with open(f"{pointer_path}.tmp", "w") as pointer_file:
+            pointer_file.write(name)
+        os.replace(f"{pointer_path}.tmp", pointer_path)
+        info(f'\t* Forecasts published as version "{name}".')
+
+        ForecastStore.__prune(name)
+        return name
+
+    @staticmethod
+    def current() -> ForecastSnapshot | None:
+        # Only 'CURRENT' is checked on every call, the snapshot is mapped
+        # again only once it points to another version.
+        pointer_path: str = os.path.join(ForecastStore.__store_dir(), "CURRENT")
+        try:
+            pointer_stat: os.stat_result = os.stat(pointer_path)
+        except FileNotFoundError:
+            return None
+
+        pointer: Tuple[int, int] = (pointer_stat.st_mtime_ns, pointer_stat.st_ino)
+        with ForecastStore.__LOCK:
+            if pointer == ForecastStore.__POINTER:
+                return ForecastStore.__SNAPSHOT
+
+            with open(pointer_path, "r") as pointer_file:
+                name: str = pointer_file.read().strip()
+            if not ForecastStore.__SNAPSHOT or ForecastStore.__SNAPSHOT.name != name:
+                try:
+                    ForecastStore.__SNAPSHOT = ForecastStore.__load(name)
+                except (OSError, ValueError, KeyError) as err:
+                    warning(f'Unable to load published forecasts "{name}": {err}')
+                    return ForecastStore.__SNAPSHOT
+            ForecastStore.__POINTER = pointer
+            return ForecastStore.__SNAPSHOT
+
+    @staticmethod
+    def __load(name: str) -> ForecastSnapshot:
+        version_dir: str = os.path.join(ForecastStore.__store_dir(), name)
+        with open(os.path.join(version_dir, "metadata.json"), "r") as metadata_file:
+            metadata: Dict[str, Any] = json.load(metadata_file)
+        return ForecastSnapshot(
+            name,
+            metadata,
+            {
+                column: load(os.path.join(version_dir, f"{column}.npy"), mmap_mode="r")
+                for column in FORECAST_STORE_COLUMNS
+            },
+        )
+
+    @staticmethod
+    def __prune(current_name: str) -> None:
+        # Mapped files stay readable once removed on POSIX, elsewhere versions
+        # still mapped by some worker are removed on upcoming publications.
+        store_dir: str = ForecastStore.__store_dir()
+        versions: List[str] = sorted(
+            name
+            for name in os.listdir(store_dir)
+            if os.path.isdir(os.path.join(store_dir, name))
+            and not name.endswith(".tmp")
+            and name != current_name
+        )
+        for name in versions[: max(versions.__len__() - ForecastStore.__keep(), 0)]:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+    @staticmethod
+    def __keep() -> int:
+        return ForecastStore.__settings().get("keep", 2)
+
+    @staticmethod
+    def __store_dir() -> str:
+        return ForecastStore.__settings().get("dir", "../.cache/forecasts")
+
+    @staticmethod
+    def __settings() -> Dict[str, Any]:
+        return Settings.CONFIG["forecast"].get("store", {})
@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+from pandas import DataFrame, Period, Timestamp
+from db.storage import Storage
+from utils import DATETIME_FORMAT
+
+GRANULARITY_WEEK: str = "week"
+GRANULARITY_MONTH: str = "month"
+GRANULARITY_YEAR: str = "year"
+
+# Pandas period frequency of every rollup granularity, weeks start on mondays.
+GRANULARITY_FREQUENCIES: Dict[str, str] = {
+    GRANULARITY_WEEK: "W-SUN",
+    GRANULARITY_MONTH: "M",
+    GRANULARITY_YEAR: "Y",
+}
+
+
+def bucket_period(
+    granularity: str, start_period: datetime, final_period: datetime
+) -> Tuple[datetime, datetime]:
+    # Widens the period to whole buckets of given granularity.
+    frequency: str = GRANULARITY_FREQUENCIES[granularity]
+    return (
+        Period(start_period, frequency).start_time.to_pydatetime(),
+        Period(final_period, frequency).end_time.floor("s").to_pydatetime(),
+    )
+
+
+def refresh_load_rollups(
+    affected_periods: Dict[str, Tuple[datetime, datetime]],
+) -> bool:
+    # Only buckets overlapping the affected period of each subsystem are
+    # recomputed, from all raw reports within them.
+    rollups: List[Tuple[str, str, datetime, float, float, float, float, int]] = []
+    for subsystem_id, (start_period, final_period) in affected_periods.items():
+        bucket_periods: Dict[str, Tuple[datetime, datetime]] = {
+            granularity: bucket_period(granularity, start_period, final_period)
+            for granularity in GRANULARITY_FREQUENCIES
+        }
+        history: DataFrame = Storage.get().fetch_load_series(
+            subsystem_id,
+            min(bucket_start for bucket_start, _ in bucket_periods.values()),
+            max(bucket_final for _, bucket_final in bucket_periods.values()),
+        )
+        for granularity, (bucket_start, bucket_final) in bucket_periods.items():
+            # Weeks may cross month and year boundaries, thus buckets of every
+            # granularity are aggregated from their own period only.
+            bucket_history: DataFrame = history[
+                (history["instant_record"] >= bucket_start)
+                & (history["instant_record"] <= bucket_final)
+            ]
+            aggregates: DataFrame = bucket_history.groupby(
+                bucket_history["instant_record"]
+                .dt.to_period(GRANULARITY_FREQUENCIES[granularity])
+                .dt.start_time
+            )["instant_load_following"].agg(["min", "max", "mean", "sum", "count"])
+            rollups += [
+                (
+                    subsystem_id,
+                    granularity,
+                    Timestamp(bucket).to_pydatetime(),
+                    float(load_min),
+                    float(load_max),
+                    float(load_mean),
+                    float(load_sum),
+                    int(load_count),
+                )
+                for bucket, load_min, load_max, load_mean, load_sum, load_count in (
+                    aggregates.itertuples()
+                )
+            ]
+
+    return Storage.get().replace_load_rollups(rollups)
+
+
+def fetch_load_history(
+    granularity: str,
+    start_period: datetime | None = None,
+    final_period: datetime | None = None,
+) -> Iterable[Dict[str, Any]]:
+    # Served from rollups only, so it doesn't scale with raw reports count.
+    if start_period and final_period:
+        start_period, final_period = bucket_period(
+            granularity, start_period, final_period
+        )
+    elif start_period:
+        start_period, _ = bucket_period(granularity, start_period, start_period)
+
+    subsystem_names: Dict[str, str] = {
+        subsystem.subsystem_id: subsystem.subsystem_name
+        for subsystem in Storage.get().fetch_subsystems()
+    }
+    load_history: Dict[str, List[Dict[str, str | float | int]]] = {}
+    for (
+        subsystem_id,
+        bucket_start,
+        load_min,
+        load_max,
+        load_mean,
+        load_sum,
+        load_count,
+    ) in Storage.get().fetch_load_rollups(granularity, start_period, final_period):
+        load_history.setdefault(subsystem_id, []).append(
+            {
+                "din_instante": bucket_start.strftime(DATETIME_FORMAT),
+                "val_cargaenergiamwmed_min": load_min,
+                "val_cargaenergiamwmed_max": load_max,
+                "val_cargaenergiamwmed_media": load_mean,
+                "val_cargaenergiamwmed_soma": load_sum,
+                "num_registros": load_count,
+            }
+        )
+
+    for subsystem_id, subsystem_load_history in load_history.items():
+        yield {
+            "id_subsistema": subsystem_id,
+            "nom_subsistema": subsystem_names.get(subsystem_id),
+            "granularidade": granularity,
+            "historico": subsystem_load_history,
+        }
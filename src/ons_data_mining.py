@@ -1,16 +1,20 @@
 from datetime import datetime, timedelta, timezone
 from traceback import format_exc
-from numpy import ndarray
-from typing import Any, Dict, List
-from db import MariaDbUtils, Report
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from urllib.parse import ParseResult, urljoin, urlparse
+from archive import OpenDataArchive
+from db import Report
+from db.storage import Storage
+from forecast import ForecastModelCache
+from downloader import OpenDataDownloader
+from history import refresh_load_rollups
 from logging import fatal, info, warning
-from selenium.webdriver import FirefoxOptions
-from splinter import Browser
-from http import HTTPStatus
-from http.client import responses
+from settings import Settings
+from time import perf_counter
 from utils import (
     NOT_SET,
-    REGEX_PATTERN_FILENAME,
+    REGEX_PATTERN_CSV_FILENAME,
     REGEX_PATTERN_FILENAME_YEAR,
     TIMEZONE_DIFFERENCE,
     format_stacktrace,
@@ -22,9 +26,14 @@ import os
 import pandas
 import re
 import requests
-import json
 import glob
 
+OPEN_DATA_COLUMNS: List[str] = [
+    "id_subsistema",
+    "din_instante",
+    "val_cargaenergiamwmed",
+]
+
 
 def cleanup_all_downloaded_resources(source_dir: str) -> None:
     info(f'Removing all temporarily resources from path "{source_dir}"...')
@@ -36,41 +45,172 @@ def cleanup_all_downloaded_resources(source_dir: str) -> None:
 def update_all_open_data_reports(source_dir: str) -> None:
     info(f"Synchronizing fetched reports and updating internal data...")
 
-    json_file_paths: List[str] = [
+    bulk_load_settings: Dict[str, Any] = Settings.CONFIG.get("ingestion", {}).get(
+        "bulk_load", {}
+    )
+    chunk_size: int = bulk_load_settings.get("chunk_size", 10000)
+    has_new_reports: bool = False
+
+    # Archived years missing from storage (e.g. a fresh database) are re-seeded
+    # from the local archive, without any network access.
+    if OpenDataArchive.is_enabled():
+        distinct_instant_record_years: List[int] = list(
+            Storage.get().fetch_distinct_instant_record_years()
+        )
+        for archived_year in OpenDataArchive.years():
+            if archived_year not in distinct_instant_record_years:
+                info(f'Re-seeding reports from archived year "{archived_year}"...')
+
+                has_new_reports |= __load_open_data_report(
+                    archived_year,
+                    OpenDataArchive.read_chunks(archived_year),
+                    bulk_load_settings,
+                )
+
+    csv_file_paths: List[str] = [
         os.path.join(source_dir, file)
         for file in os.listdir(source_dir)
-        if file.endswith(".json")
+        if file.endswith(".csv")
     ]
-    for json_file_path in json_file_paths:
-        with open(json_file_path, "r") as json_file:
-            json_raw_content: str = json_file.read()
-            filename_year: int = int(
-                re.search(REGEX_PATTERN_FILENAME_YEAR, json_file_path).group()
-            )
-            load_entries: List[Dict[str, str | str | List[Dict[str, str | float]]]] = (
-                json.loads(json_raw_content)
-            )
+    current_year: int = brt_now().year
+    for csv_file_path in csv_file_paths:
+        csv_filename: str = os.path.basename(csv_file_path)
+        filename_year: int = int(
+            re.search(REGEX_PATTERN_FILENAME_YEAR, csv_filename).group()
+        )
 
-            info(f'Updating reports from year "{filename_year}"...')
+        info(f'Updating reports from year "{filename_year}"...')
 
-            for load_entry in load_entries:
-                subsystem_id, subsystem_name, subsystem_load_records = (
-                    load_entry.values()
+        load_record_chunks: Iterable[pandas.DataFrame] = read_open_data_chunks(
+            csv_file_path, chunk_size
+        )
+        # Closed years won't change anymore, so they're archived once and
+        # loaded from the archive instead of parsing the CSV file twice.
+        if OpenDataArchive.is_enabled() and filename_year < current_year:
+            try:
+                archived_rows: int = OpenDataArchive.store(
+                    filename_year,
+                    OpenDataDownloader.source_url(csv_filename),
+                    load_record_chunks,
                 )
-                subsystem_reports: List[Report] = [
-                    Report(subsystem_id, *subsystem_load_record.values())
-                    for subsystem_load_record in subsystem_load_records
-                ]
-                count_entries: int = subsystem_reports.__len__()
-
-                info(
-                    f"\t* [{subsystem_name} - year: {filename_year}] Entries: {count_entries}"
+                info(f"\t* Successfully archived {archived_rows} reports.")
+                load_record_chunks = OpenDataArchive.read_chunks(filename_year)
+            except Exception:
+                warning(
+                    format_stacktrace(
+                        text="Unable to archive reports, loading them from CSV file.",
+                        args={"File": csv_file_path, "Stacktrace": format_exc()},
+                    )
                 )
+                load_record_chunks = read_open_data_chunks(csv_file_path, chunk_size)
+
+        if __load_open_data_report(
+            filename_year, load_record_chunks, bulk_load_settings
+        ):
+            has_new_reports = True
+        else:
+            OpenDataDownloader.discard(csv_filename)
+        os.remove(csv_file_path)
 
-                if MariaDbUtils.add_reports(subsystem_reports):
-                    info("\t* Successfully added all reports.")
-                else:
-                    fatal("\t* Unable to add data subsystem reports!")
+    if has_new_reports:
+        ForecastModelCache.invalidate()
+
+
+def __load_open_data_report(
+    year: int,
+    load_record_chunks: Iterable[pandas.DataFrame],
+    bulk_load_settings: Dict[str, Any],
+) -> bool:
+    # Reports are streamed straight into the loader, and every year is either
+    # fully committed or rolled back.
+    affected_periods: Dict[str, Tuple[datetime, datetime]] = {}
+    load_statistics: Dict[str, int] = {"entries": 0}
+    load_time: float = perf_counter()
+    try:
+        is_loaded: bool = Storage.get().bulk_add_reports(
+            read_open_data_report(
+                load_record_chunks, affected_periods, load_statistics
+            ),
+            batch_size=bulk_load_settings.get("batch_size", 1000),
+        )
+    except Exception:
+        is_loaded = False
+        fatal(
+            format_stacktrace(
+                text="Unexpected data processing behavior.",
+                args={"Year": year, "Stacktrace": format_exc()},
+            )
+        )
+
+    if not is_loaded:
+        fatal(
+            f'\t* Unable to add reports from year "{year}", '
+            + "all of them were rolled back!"
+        )
+        return False
+
+    load_time = perf_counter() - load_time
+    info(
+        f"\t* Successfully added {load_statistics['entries']} reports in "
+        + f"{load_time:.2f}s "
+        + f"({load_statistics['entries'] / max(load_time, 1e-9):,.0f} rows/s)."
+    )
+
+    if refresh_load_rollups(affected_periods):
+        info("\t* Successfully updated load rollups.")
+    else:
+        warning("\t* Unable to update load rollups!")
+    return True
+
+
+def read_open_data_chunks(
+    csv_file_path: str, chunk_size: int
+) -> Iterable[pandas.DataFrame]:
+    # Reads up to 'chunk_size' CSV rows at a time, so memory usage doesn't
+    # depend on file size.
+    with pandas.read_csv(
+        csv_file_path,
+        sep=";",
+        usecols=OPEN_DATA_COLUMNS,
+        dtype={"id_subsistema": str, "din_instante": str},
+        chunksize=chunk_size,
+    ) as csv_reader:
+        for load_dataframe in csv_reader:
+            yield normalize_open_data_report(load_dataframe)
+
+
+def read_open_data_report(
+    load_record_chunks: Iterable[pandas.DataFrame],
+    affected_periods: Dict[str, Tuple[datetime, datetime]],
+    load_statistics: Dict[str, int],
+) -> Iterable[Report]:
+    # Affected periods of every subsystem and entries count are updated as
+    # reports are consumed.
+    for load_records in load_record_chunks:
+        for subsystem_id, start_period, final_period in (
+            load_records.groupby("id_subsistema")["din_instante"]
+            .agg(["min", "max"])
+            .itertuples()
+        ):
+            start_period, final_period = (
+                start_period.to_pydatetime(),
+                final_period.to_pydatetime(),
+            )
+            if subsystem_id in affected_periods:
+                affected_start_period, affected_final_period = affected_periods[
+                    subsystem_id
+                ]
+                start_period = min(start_period, affected_start_period)
+                final_period = max(final_period, affected_final_period)
+            affected_periods[subsystem_id] = (start_period, final_period)
+
+        load_statistics["entries"] += load_records.__len__()
+        yield from map(
+            Report,
+            load_records["id_subsistema"].tolist(),
+            load_records["din_instante"].to_numpy(dtype="datetime64[us]").tolist(),
+            load_records["val_cargaenergiamwmed"].tolist(),
+        )
 
 
 def fetch_open_data_reports(
@@ -82,14 +222,14 @@ def fetch_open_data_reports(
         "fetch_period_threshold"
     ]
     current_date: datetime = brt_now()
-    latest_instant_record: datetime = MariaDbUtils.fetch_latest_instant_record()
-    if (
-        current_date.day
-        <= (latest_instant_record + timedelta(**fetch_period_threshold_settings)).day
-    ):
-        next_check_eta: timedelta = current_date - (
-            latest_instant_record + timedelta(**fetch_period_threshold_settings)
-        )
+    latest_instant_record: datetime = Storage.get().fetch_latest_instant_record()
+    # Whole datetimes are compared, so it holds across month and year
+    # boundaries.
+    next_check: datetime = latest_instant_record + timedelta(
+        **fetch_period_threshold_settings
+    )
+    if current_date < next_check:
+        next_check_eta: timedelta = next_check - current_date
         current_date = current_date.replace(tzinfo=timezone.utc)
         timezone_hours, timezone_minutes = TIMEZONE_DIFFERENCE.values()
         info(
@@ -102,121 +242,180 @@ def fetch_open_data_reports(
 
     info("Pending reports to update, fetching remote Open Data servers...")
 
-    geckodriver_options: FirefoxOptions = FirefoxOptions()
-    geckodriver_options.binary_location = web_scrapping_settings.get(
-        "binary_location", NOT_SET
+    csv_links: List[str] = resolve_open_data_links(
+        open_data_ons_settings, web_scrapping_settings
     )
-    bot_options: Dict[str, Any] = {
-        "driver_name": web_scrapping_settings.get("driver_name", NOT_SET),
-        "headless": web_scrapping_settings.get("headless", NOT_SET),
-        "options": geckodriver_options,
-    }
-    source_url: str = open_data_ons_settings.get("url", NOT_SET)
-    bot = Browser(**bot_options)
-    bot.visit(source_url)
-
-    csv_links: List[str] = [
-        link["href"] for link in bot.find_by_xpath('//a[contains(@href, ".csv")]')
-    ]
-
-    bot.quit()
+    if not csv_links:
+        warning("Unable to resolve any CSV file link, skipping synchronization.")
+        return
 
     info(f'Downloading CSV files to path "{source_dir}"...')
 
-    distinct_instant_record_years: List[int] = (
-        MariaDbUtils.fetch_distinct_instant_record_years()
+    distinct_instant_record_years: List[int] = list(
+        Storage.get().fetch_distinct_instant_record_years()
     )
-    if not distinct_instant_record_years:
-        distinct_instant_record_years = []
 
+    archived_years: List[int] = OpenDataArchive.years()
+
+    pending_csv_links: List[str] = []
     for csv_link in csv_links:
-        csv_filename: str = re.search(
-            f"{REGEX_PATTERN_FILENAME}(.csv)", csv_link
-        ).group()
+        csv_filename: str = re.search(REGEX_PATTERN_CSV_FILENAME, csv_link).group()
         csv_filename_year: int = int(
             re.search(REGEX_PATTERN_FILENAME_YEAR, csv_filename).group()
         )
-        if csv_filename_year in distinct_instant_record_years:
-            continue
+        if OpenDataArchive.is_enabled():
+            # Archived years are re-seeded locally, while closed years missing
+            # from the archive are fully downloaded once more to be archived.
+            if csv_filename_year in archived_years:
+                continue
+            if csv_filename_year < current_date.year:
+                OpenDataDownloader.discard(csv_filename)
+            pending_csv_links.append(csv_link)
+        elif csv_filename_year not in distinct_instant_record_years:
+            pending_csv_links.append(csv_link)
 
-        response: requests.Response = requests.get(csv_link)
-        if response.status_code == HTTPStatus.OK:
-            info(
-                f"\t* [{response.status_code}] - {responses[response.status_code]} "
-                + f'Successfully downloaded file: "{csv_filename}"'
-            )
-            with open(os.path.join(source_dir, csv_filename), "w") as csv_file:
-                csv_file.write(response.content.decode("utf8"))
-        else:
-            warning(
-                f"\t* [{response.status_code}] - {responses[response.status_code]} "
-                + f'Unable to download file: "{csv_filename}"'
-            )
+    OpenDataDownloader.download_all(pending_csv_links, source_dir)
 
-    csv_file_paths: List[str] = [
-        os.path.join(source_dir, file)
-        for file in os.listdir(source_dir)
-        if file.endswith(".csv")
-    ]
-    for csv_file_path in csv_file_paths:
-        load_dataframe: pandas.DataFrame = pandas.read_csv(csv_file_path, sep=";")
-        load_subsystem_ids: ndarray = load_dataframe["id_subsistema"].unique()
-        load_subsystem_names: ndarray = load_dataframe["nom_subsistema"].unique()
-        load_entries: List[Dict[str, str | str | List[str, float]]] = []
 
-        for load_subsystem_id, load_subsystem_name in zip(
-            load_subsystem_ids, load_subsystem_names
-        ):
-            load_entries.append(
-                {
-                    "id": load_subsystem_id,
-                    "nome": load_subsystem_name,
-                    "registros": [
-                        # "data": DATETIME -- 'din_instante'
-                        # "carga" FLOAT -- 'val_cargaenergiamwmed'
-                    ],
-                }
-            )
+class CsvLinkParser(HTMLParser):
+    def __init__(self, base_url: str) -> None:
+        super().__init__()
+        self.__base_url: str = base_url
+        self.csv_links: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, str | None]]) -> None:
+        href: str | None = dict(attrs).get("href")
+        if tag == "a" and href and ".csv" in href:
+            self.csv_links.append(urljoin(self.__base_url, href))
+
 
-        load_instant_records: ndarray = load_dataframe["din_instante"].unique()
-        json_filename: str = (
-            f"{re.search(REGEX_PATTERN_FILENAME, csv_file_path).group()}.json"
+def resolve_open_data_links(
+    open_data_ons_settings: Dict[str, Any], web_scrapping_settings: Dict[str, Any]
+) -> List[str]:
+    # Links are read from CKAN 'package_show' API first, then from the dataset
+    # HTML page. A headless browser is only started if opted in on settings.
+    source_url: str = open_data_ons_settings.get("url", NOT_SET)
+    link_resolvers: List[Tuple[str, Callable[[], List[str]]]] = [
+        (
+            "CKAN API",
+            lambda: __resolve_ckan_links(
+                source_url, open_data_ons_settings.get("ckan_api_url")
+            ),
+        ),
+        ("HTML page", lambda: __resolve_html_links(source_url)),
+    ]
+    if web_scrapping_settings.get("browser_fallback", False):
+        link_resolvers.append(
+            (
+                "browser",
+                lambda: __resolve_browser_links(source_url, web_scrapping_settings),
+            )
         )
 
-        for load_instant_record in load_instant_records:
-            instant_dataframe: pandas.DataFrame = load_dataframe.loc[
-                load_dataframe["din_instante"] == load_instant_record
+    for link_resolver_name, link_resolver in link_resolvers:
+        try:
+            csv_links: List[str] = [
+                csv_link
+                for csv_link in link_resolver()
+                if re.search(REGEX_PATTERN_CSV_FILENAME, csv_link)
             ]
-            for load_entry in load_entries:
-                load_subsystem_id, load_subsystem_name, load_records = load_entry
-                load_value_datafield: pandas.DataFrame = instant_dataframe.loc[
-                    instant_dataframe["id_subsistema"] == load_entry[load_subsystem_id]
-                ]["val_cargaenergiamwmed"]
-                load_value: float = 0
-                try:
-                    if len(load_value_datafield) > 0:
-                        load_value = float(load_value_datafield.iloc[0])
-                        if pandas.isna(load_value):
-                            continue
-
-                        load_entry[load_records].append(
-                            {"data": load_instant_record, "energia": load_value}
-                        )
-                    else:
-                        continue
-                except:
-                    fatal(
-                        format_stacktrace(
-                            text="Unexpected data processing behavior.",
-                            args={
-                                "File": json_filename,
-                                "Data": instant_dataframe.to_json(),
-                                "Data (type)": type(load_value_datafield),
-                                "Stacktrace": format_exc(),
-                            },
-                        )
-                    )
+        except Exception as err:
+            warning(f"\t* Unable to resolve links from {link_resolver_name}: {err}")
+            continue
+
+        if csv_links:
+            info(f"\t* Resolved {csv_links.__len__()} links from {link_resolver_name}.")
+            return csv_links
+
+        warning(f"\t* No links were resolved from {link_resolver_name}.")
+
+    return []
+
+
+def __resolve_ckan_links(source_url: str, ckan_api_url: str | None) -> List[str]:
+    # Dataset pages are '<portal>/dataset/<package id>', whose resources are
+    # listed by '<portal>/api/3/action/package_show?id=<package id>'.
+    parsed_source_url: ParseResult = urlparse(source_url)
+    response: requests.Response = OpenDataDownloader.session().get(
+        ckan_api_url
+        or f"{parsed_source_url.scheme}://{parsed_source_url.netloc}"
+        + "/api/3/action/package_show",
+        params={"id": parsed_source_url.path.rstrip("/").split("/")[-1]},
+        timeout=OpenDataDownloader.timeout(),
+    )
+    response.raise_for_status()
+    package: Dict[str, Any] = response.json()
+    if not package.get("success"):
+        raise ValueError(package.get("error"))
+
+    return [
+        resource["url"]
+        for resource in package["result"].get("resources", [])
+        if resource.get("url")
+    ]
+
+
+def __resolve_html_links(source_url: str) -> List[str]:
+    response: requests.Response = OpenDataDownloader.session().get(
+        source_url, timeout=OpenDataDownloader.timeout()
+    )
+    response.raise_for_status()
+    csv_link_parser: CsvLinkParser = CsvLinkParser(response.url)
+    csv_link_parser.feed(response.text)
+    return csv_link_parser.csv_links
+
+
+def __resolve_browser_links(
+    source_url: str, web_scrapping_settings: Dict[str, Any]
+) -> List[str]:
+    # Imported on demand, so neither geckodriver nor Firefox are required
+    # unless the browser fallback is enabled.
+    from selenium.webdriver import FirefoxOptions
+    from splinter import Browser
+
+    geckodriver_options: FirefoxOptions = FirefoxOptions()
+    geckodriver_options.binary_location = web_scrapping_settings.get(
+        "binary_location", NOT_SET
+    )
+    bot_options: Dict[str, Any] = {
+        "driver_name": web_scrapping_settings.get("driver_name", NOT_SET),
+        "headless": web_scrapping_settings.get("headless", NOT_SET),
+        "options": geckodriver_options,
+    }
+    bot = Browser(**bot_options)
+    try:
+        bot.visit(source_url)
+        return [
+            link["href"] for link in bot.find_by_xpath('//a[contains(@href, ".csv")]')
+        ]
+    finally:
+        bot.quit()
+
+
+def normalize_open_data_report(load_dataframe: pandas.DataFrame) -> pandas.DataFrame:
+    # Only the first entry of every ('id_subsistema', 'din_instante') is kept,
+    # and entries whose instant or load are either missing or invalid are
+    # dropped.
+    load_records: pandas.DataFrame = load_dataframe[
+        ["id_subsistema", "din_instante", "val_cargaenergiamwmed"]
+    ].drop_duplicates(["id_subsistema", "din_instante"], keep="first")
+    load_instant_records: pandas.Series = pandas.to_datetime(
+        load_records["din_instante"], format="ISO8601", errors="coerce"
+    )
+    load_values: pandas.Series = pandas.to_numeric(
+        load_records["val_cargaenergiamwmed"], errors="coerce"
+    )
+    invalid_entries: pandas.Series = (
+        load_instant_records.isna() & load_records["din_instante"].notna()
+    ) | (load_values.isna() & load_records["val_cargaenergiamwmed"].notna())
+    if invalid_entries.any():
+        warning(
+            format_stacktrace(
+                text="Unexpected data processing behavior, dropping invalid entries.",
+                args={"Data": load_records[invalid_entries].head().to_json()},
+            )
+        )
 
-        with open(os.path.join(source_dir, json_filename), "w") as json_file:
-            info(f"Successfully created file: {json_filename}")
-            json_file.write(json.dumps(load_entries, indent=True))
+    return load_records.assign(
+        din_instante=load_instant_records, val_cargaenergiamwmed=load_values
+    ).dropna()
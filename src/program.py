@@ -1,57 +1,37 @@
-from concurrent.futures import Future, ThreadPoolExecutor
-from datetime import timedelta
-from logging import INFO, Formatter, basicConfig, critical, info
-from threading import Event
-from time import sleep
+from logging import critical, info
+from multiprocessing import Event, Process
 from traceback import format_exc
-from typing import Any, Dict
 from fastapi import FastAPI
 from urllib3 import disable_warnings
 from uvicorn import run
 from settings import Settings
 from routers import root_router
-from utils import EX_OK, EX_SOFTWARE, format_stacktrace
-from ons_data_mining import (
-    cleanup_all_downloaded_resources,
-    fetch_open_data_reports,
-    update_all_open_data_reports,
-)
+from utils import EX_OK, EX_SOFTWARE, configure_logging, format_stacktrace
+from worker import IngestionWorker
 from warnings import simplefilter
 
 import os
 
+SETTINGS_PATH: str = "../settings.yaml"
 
-def __open_data_bot_dynamic_sync(event_flag: Event) -> None:
-    open_data_ons_settings: Dict[str, Any] = Settings.CONFIG["open_data_ons"]
-    source_dir: str = open_data_ons_settings["download_dir"]
-    source_dir = os.path.join(os.getcwd(), source_dir)
-    if not os.path.exists(source_dir):
-        os.mkdir(source_dir)
 
-    web_scrapping_settings: Dict[str, Any] = Settings.CONFIG["web_scrapping"]
-    fetch_wait_time_settings: Dict[str, Any] = web_scrapping_settings["fetch_wait_time"]
-    while not event_flag.is_set():
-        if os.listdir(source_dir) != []:
-            cleanup_all_downloaded_resources(source_dir)
+def create_app() -> FastAPI:
+    # Application factory, so every uvicorn worker process (see 'app.workers')
+    # builds its own app once it imports this module.
+    if not Settings.CONFIG:
+        configure_logging()
+        simplefilter("ignore", FutureWarning)
+        Settings.load(SETTINGS_PATH)
 
-        fetch_open_data_reports(
-            open_data_ons_settings, web_scrapping_settings, source_dir
-        )
-        update_all_open_data_reports(source_dir)
-        sleep(timedelta(**fetch_wait_time_settings).total_seconds())
+    root_router.responses = Settings.CONFIG["api_responses"]
+
+    app: FastAPI = FastAPI()
+    app.include_router(root_router)
+    return app
 
 
 if __name__ == "__main__":
-    log_fmt: Formatter = Formatter(
-        "%(asctime)s,%(msecs)-3d - %(levelname)-8s => " "%(message)s"
-    )
-    log_config: Dict[str, Any] = {
-        "format": vars(log_fmt).get("_fmt"),
-        "datefmt": "%Y-%m-%d %H:%M:%S",
-        "level": INFO,
-        "encoding": "utf8",
-    }
-    basicConfig(**log_config)
+    configure_logging()
     disable_warnings()
 
     # DatetimeProperties.to_pydatetime is deprecated:
@@ -62,33 +42,42 @@ if __name__ == "__main__":
 
     info("Loading application settings...")
 
-    Settings.load("../settings.yaml")
+    Settings.load(SETTINGS_PATH)
 
-    with ThreadPoolExecutor(max_workers=1) as thread_executor:
-        open_data_bot_event: Event = Event()
-        open_data_bot_thread: Future = thread_executor.submit(
-            __open_data_bot_dynamic_sync, open_data_bot_event
+    # Reports are synchronized by a worker process, unless it's run on its own
+    # by 'worker.py' (see 'ingestion.worker.mode').
+    ingestion_worker_event: Event = Event()
+    ingestion_worker_process: Process | None = None
+    if Settings.CONFIG["ingestion"].get("worker", {}).get("mode", "process") == (
+        "process"
+    ):
+        ingestion_worker_process = Process(
+            target=IngestionWorker.run,
+            args=(SETTINGS_PATH, ingestion_worker_event),
+            name="ingestion",
         )
+        ingestion_worker_process.start()
 
-        try:
-            root_router.responses = Settings.CONFIG["api_responses"]
-
-            app: FastAPI = FastAPI()
-            app.include_router(root_router)
-            run(app, **Settings.CONFIG["app"])
-        except KeyboardInterrupt:
-            pass
-        except:
-            exit_status_flag = EX_SOFTWARE
-            critical(
-                format_stacktrace(
-                    text="Unexpected process behaviour.",
-                    args={"Stacktrace": format_exc()},
-                )
+    try:
+        run("program:create_app", factory=True, **Settings.CONFIG["app"])
+    except KeyboardInterrupt:
+        pass
+    except:
+        exit_status_flag = EX_SOFTWARE
+        critical(
+            format_stacktrace(
+                text="Unexpected process behaviour.",
+                args={"Stacktrace": format_exc()},
+            )
+        )
+    finally:
+        if ingestion_worker_process:
+            ingestion_worker_event.set()
+            ingestion_worker_process.join(
+                Settings.CONFIG["ingestion"]["worker"].get("shutdown_timeout", 10)
             )
-        finally:
-            open_data_bot_thread.cancel()
-            open_data_bot_event.set()
+            if ingestion_worker_process.is_alive():
+                ingestion_worker_process.terminate()
 
-            info(f"Exit status: {exit_status_flag}")
-            os._exit(exit_status_flag)
\ No newline at end of file
+        info(f"Exit status: {exit_status_flag}")
+        os._exit(exit_status_flag)
@@ -1,8 +1,23 @@
 from datetime import datetime, timedelta
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from http import HTTPStatus
+from typing import Any, Dict, List, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from forecast import IncidentForesight
+from history import GRANULARITY_FREQUENCIES, GRANULARITY_MONTH, fetch_load_history
+from routers.export import EXPORT_COLUMNS, EXPORT_MEDIA_TYPES, export_rows
+from routers.executor import ExecutorCapacityError, SingleFlightExecutor
+from routers.responses import (
+    encode_json,
+    encoded_response,
+    entity_tag,
+    not_modified_response,
+)
 from settings import Settings
+from worker import IngestionWorker
+
+import json
 
 root_router: APIRouter = APIRouter()
 
@@ -18,19 +33,222 @@ root_router: APIRouter = APIRouter()
     description="""
         Retrives all incident foresight predictions between 'start_period (required)' and 'final_period'
         (default: if not set, then API will calculate next upcoming 7 days since 'start_period' as
-        reference).
+        reference). Several windows may be requested at once instead, each one as a 'window' formatted
+        as 'start_period/final_period', and predictions restricted to some 'subsystem_id' only.
+        Windows include both of their ends, so 'din_instante_periodo_dias' is one less than the
+        number of daily predictions.
         """,
     response_class=JSONResponse,
 )
-def get_incident_foresight_callback(
+async def get_incident_foresight_callback(
+    request: Request,
     start_period: datetime = datetime.today().date(),
     final_period: datetime | None = None,
+    window: List[str] | None = Query(None),
+    subsystem_id: List[str] | None = Query(None),
+) -> Response:
+    if window:
+        windows: List[Tuple[datetime, datetime]] = [
+            __parse_window(raw_window) for raw_window in window
+        ]
+    else:
+        if not final_period or final_period <= start_period:
+            final_period = start_period + timedelta(days=7)
+        windows = [(start_period, final_period)]
+
+    forecast_settings: Dict[str, Any] = Settings.CONFIG["forecast"]
+    max_windows: int = forecast_settings.get("requests", {}).get("max_windows", 12)
+    if windows.__len__() > max_windows:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Too many windows, up to {max_windows} are allowed per request.",
+        )
+    subsystem_ids: List[str] | None = (
+        sorted(set(subsystem_id)) if subsystem_id else None
+    )
+
+    # Validators only depend on the model version and the reports revision,
+    # so unchanged forecasts are answered with 304 before being computed.
+    incident_foresight: IncidentForesight = IncidentForesight(
+        *windows[0],
+        forecast_settings["engine"],
+        subsystem_ids=subsystem_ids,
+        windows=windows,
+        **forecast_settings[forecast_settings["engine"]],
+    )
+    unknown_subsystem_ids: List[str] = await run_in_threadpool(
+        incident_foresight.unknown_subsystem_ids
+    )
+    if unknown_subsystem_ids:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown subsystems: {', '.join(unknown_subsystem_ids)}",
+        )
+
+    model_version, last_modified = await run_in_threadpool(incident_foresight.version)
+    etag: str = entity_tag(model_version, windows, subsystem_ids)
+    not_modified: Response | None = not_modified_response(
+        request, etag, last_modified
+    )
+    if not_modified:
+        return not_modified
+
+    try:
+        incident_foresights: bytes = await SingleFlightExecutor.submit(
+            (
+                tuple(windows),
+                tuple(subsystem_ids or ()),
+                json.dumps(forecast_settings, sort_keys=True, default=str),
+            ),
+            __fetch_incident_foresights,
+            windows,
+            subsystem_ids,
+            forecast_settings,
+        )
+    except ExecutorCapacityError as err:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(err),
+            headers={"Retry-After": str(err.retry_after)},
+        )
+    return await run_in_threadpool(
+        encoded_response, request, incident_foresights, etag, last_modified
+    )
+
+
+@root_router.get(
+    "/load_history",
+    description="""
+        Retrieves min, max, mean and sum of load per subsystem, aggregated by 'granularity' (week,
+        month or year) between 'start_period' and 'final_period' (default: if not set, then API will
+        retrieve whole history).
+        """,
+    response_class=JSONResponse,
+)
+def get_load_history_callback(
+    granularity: str = GRANULARITY_MONTH,
+    start_period: datetime | None = None,
+    final_period: datetime | None = None,
 ) -> JSONResponse:
+    # Plain function, so FastAPI runs it on its thread pool instead of
+    # blocking the event loop while querying rollups.
+    if granularity not in GRANULARITY_FREQUENCIES:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown granularity \"{granularity}\", expected one of: "
+            + ", ".join(GRANULARITY_FREQUENCIES),
+        )
+
+    return JSONResponse(
+        list(fetch_load_history(granularity, start_period, final_period))
+    )
+
+
+@root_router.get(
+    "/export/{dataset}",
+    description="""
+        Streams either raw load history ('history') or materialized forecasts ('forecasts') as
+        NDJSON or CSV 'export_format', optionally filtered by 'subsystem_id' and between
+        'start_period' and 'final_period' (default: if not set, then API will export all of them).
+        """,
+    response_class=StreamingResponse,
+)
+def get_export_callback(
+    dataset: str,
+    export_format: str = "ndjson",
+    subsystem_id: str | None = None,
+    start_period: datetime | None = None,
+    final_period: datetime | None = None,
+) -> StreamingResponse:
+    if dataset not in EXPORT_COLUMNS:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Unknown dataset \"{dataset}\", expected one of: "
+            + ", ".join(EXPORT_COLUMNS),
+        )
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown export format \"{export_format}\", expected one of: "
+            + ", ".join(EXPORT_MEDIA_TYPES),
+        )
+
+    # Rows are read lazily by the thread pool, while chunks are being sent.
+    return StreamingResponse(
+        export_rows(dataset, export_format, subsystem_id, start_period, final_period),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{dataset}.{export_format}"'
+        },
+    )
+
+
+@root_router.get(
+    "/ingestion",
+    description="""
+        Retrieves status of reports synchronization: latest sync, its outcome, next scheduled sync,
+        consecutive failures and whether a manual sync is pending.
+        """,
+    response_class=JSONResponse,
+)
+def get_ingestion_status_callback() -> JSONResponse:
+    return JSONResponse(IngestionWorker.status())
+
+
+@root_router.post(
+    "/ingestion/sync",
+    description="""
+        Triggers a reports synchronization, which is run by the ingestion worker as soon as it's
+        idle.
+        """,
+    status_code=HTTPStatus.ACCEPTED,
+    response_class=JSONResponse,
+)
+def post_ingestion_sync_callback() -> JSONResponse:
+    IngestionWorker.trigger()
+    return JSONResponse(IngestionWorker.status(), status_code=HTTPStatus.ACCEPTED)
+
+
+def __parse_window(raw_window: str) -> Tuple[datetime, datetime]:
+    # Same defaults as 'start_period' and 'final_period'.
+    raw_start_period, _, raw_final_period = raw_window.partition("/")
+    try:
+        start_period: datetime = datetime.fromisoformat(raw_start_period)
+        final_period: datetime | None = (
+            datetime.fromisoformat(raw_final_period) if raw_final_period else None
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Invalid window \"{raw_window}\", expected "
+            + "\"start_period/final_period\".",
+        )
+
     if not final_period or final_period <= start_period:
         final_period = start_period + timedelta(days=7)
+    return start_period, final_period
+
 
+def __fetch_incident_foresights(
+    windows: List[Tuple[datetime, datetime]],
+    subsystem_ids: List[str] | None,
+    forecast_settings: Dict[str, Any],
+) -> bytes:
+    # Runs on the forecast executor, away from the event loop, and is encoded
+    # once for all callers sharing it.
     incident_foresight: IncidentForesight = IncidentForesight(
-        start_period, final_period, **Settings.CONFIG["forecast"]
+        *windows[0],
+        forecast_settings["engine"],
+        subsystem_ids=subsystem_ids,
+        windows=windows,
+        **forecast_settings[forecast_settings["engine"]],
     )
-    incident_foresight.predict()
-    return JSONResponse(list(incident_foresight.serialize_forecasts()))
\ No newline at end of file
+    if not incident_foresight.load_materialized():
+        # Workers which must not fit models answer uncovered windows only.
+        if not forecast_settings.get("store", {}).get("fallback", True):
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail="No published forecasts cover the requested period.",
+            )
+        incident_foresight.predict()
+    return encode_json(list(incident_foresight.serialize_forecasts()))
\ No newline at end of file
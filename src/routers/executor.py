@@ -0,0 +1,59 @@
+from asyncio import AbstractEventLoop, Future, get_running_loop, shield
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Tuple
+from settings import Settings
+
+
+class ExecutorCapacityError(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Executor is over capacity, retry after {retry_after}s.")
+        self.retry_after: int = retry_after
+
+
+class SingleFlightExecutor(object):
+    # Both attributes are only touched from the event loop thread, hence no
+    # locking is required.
+    __EXECUTOR: ThreadPoolExecutor | None = None
+    __IN_FLIGHT: Dict[Hashable, Future] = {}
+
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    async def submit(
+        key: Hashable, callback: Callable[..., Any], *args: Tuple[Any, ...]
+    ) -> Any:
+        # Concurrent calls sharing the same key await the very same in-flight
+        # computation, instead of running it once per caller.
+        executor_settings: Dict[str, Any] = Settings.CONFIG["forecast"].get(
+            "requests", {}
+        )
+        in_flight: Future | None = SingleFlightExecutor.__IN_FLIGHT.get(key)
+        if not in_flight:
+            if SingleFlightExecutor.__IN_FLIGHT.__len__() >= executor_settings.get(
+                "max_pending", 8
+            ):
+                raise ExecutorCapacityError(executor_settings.get("retry_after", 30))
+
+            loop: AbstractEventLoop = get_running_loop()
+            in_flight = loop.run_in_executor(
+                SingleFlightExecutor.__executor(executor_settings.get("max_workers")),
+                partial(callback, *args),
+            )
+            SingleFlightExecutor.__IN_FLIGHT[key] = in_flight
+            in_flight.add_done_callback(
+                lambda _: SingleFlightExecutor.__IN_FLIGHT.pop(key, None)
+            )
+
+        # Shielded, so a disconnected client doesn't cancel the computation
+        # other callers are still waiting for.
+        return await shield(in_flight)
+
+    @staticmethod
+    def __executor(max_workers: int | None) -> ThreadPoolExecutor:
+        if not SingleFlightExecutor.__EXECUTOR:
+            SingleFlightExecutor.__EXECUTOR = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="forecast"
+            )
+        return SingleFlightExecutor.__EXECUTOR
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from db.storage import Storage
+from settings import Settings
+
+import csv
+import io
+import orjson
+
+EXPORT_DATASET_HISTORY: str = "history"
+EXPORT_DATASET_FORECASTS: str = "forecasts"
+
+EXPORT_FORMAT_NDJSON: str = "ndjson"
+EXPORT_FORMAT_CSV: str = "csv"
+
+EXPORT_COLUMNS: Dict[str, List[str]] = {
+    EXPORT_DATASET_HISTORY: [
+        "id_subsistema",
+        "din_instante",
+        "val_cargaenergiamwmed",
+    ],
+    EXPORT_DATASET_FORECASTS: [
+        "id_subsistema",
+        "din_instante",
+        "val_cargaenergiamwmed_estimado",
+        "val_cargaenergiamwmed_min",
+        "val_cargaenergiamwmed_max",
+    ],
+}
+
+EXPORT_MEDIA_TYPES: Dict[str, str] = {
+    EXPORT_FORMAT_NDJSON: "application/x-ndjson",
+    EXPORT_FORMAT_CSV: "text/csv",
+}
+
+
+def export_rows(
+    dataset: str,
+    export_format: str,
+    subsystem_id: str | None = None,
+    start_period: datetime | None = None,
+    final_period: datetime | None = None,
+) -> Iterable[bytes]:
+    # Every batch read from the storage cursor is encoded and sent as a
+    # single chunk, so memory usage doesn't depend on export size and the
+    # first rows are sent before the last ones are read.
+    export_settings: Dict[str, Any] = Settings.CONFIG.get("export", {})
+    stream: Callable[..., Iterable[List[Tuple[Any, ...]]]] = (
+        Storage.get().stream_reports
+        if dataset == EXPORT_DATASET_HISTORY
+        else Storage.get().stream_forecasts
+    )
+    columns: List[str] = EXPORT_COLUMNS[dataset]
+    if export_format == EXPORT_FORMAT_CSV:
+        yield __encode_csv([columns])
+
+    for rows in stream(
+        subsystem_id,
+        start_period,
+        final_period,
+        export_settings.get("batch_size", 10000),
+    ):
+        # Same output as 'DATETIME_FORMAT', several times faster.
+        rows = [
+            (row_id, instant.isoformat(" ", "seconds"), *values)
+            for row_id, instant, *values in rows
+        ]
+        if export_format == EXPORT_FORMAT_CSV:
+            yield __encode_csv(rows)
+        else:
+            yield b"".join(
+                orjson.dumps(dict(zip(columns, row)), option=orjson.OPT_APPEND_NEWLINE)
+                for row in rows
+            )
+
+
+def __encode_csv(rows: List[Iterable[Any]]) -> bytes:
+    # Same separator as ONS open data CSV files.
+    csv_buffer: io.StringIO = io.StringIO()
+    csv.writer(csv_buffer, delimiter=";", lineterminator="\n").writerows(rows)
+    return csv_buffer.getvalue().encode("utf8")
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import sha1
+from http import HTTPStatus
+from typing import Any, Dict, List, Set
+from fastapi import Request, Response
+from settings import Settings
+from utils import TIMEZONE_DIFFERENCE
+
+import gzip
+import orjson
+
+# Brotli is optional, responses fall back to gzip whenever it's unavailable.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def encode_json(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+
+def entity_tag(*args: Any) -> str:
+    # Weak, so it holds across content codings of the very same payload.
+    return f'W/"{sha1(":".join(map(str, args)).encode("utf8")).hexdigest()}"'
+
+
+def not_modified_response(
+    request: Request, etag: str, last_modified: datetime
+) -> Response | None:
+    # Checked before computing the payload, whose validators only depend on
+    # the model version and the reports revision.
+    headers: Dict[str, str] = __cache_headers(etag, last_modified)
+    if_none_match: str | None = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags: List[str] = [
+            candidate.strip().removeprefix("W/")
+            for candidate in if_none_match.split(",")
+        ]
+        if "*" in etags or etag.removeprefix("W/") in etags:
+            return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+        return None
+
+    if_modified_since: str | None = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            if __http_datetime(last_modified) <= parsedate_to_datetime(
+                if_modified_since
+            ):
+                return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def encoded_response(
+    request: Request, content: bytes, etag: str, last_modified: datetime
+) -> Response:
+    # Compressed with the best coding accepted by the client, preferring
+    # brotli over gzip, as long as the payload is worth it.
+    compression_settings: Dict[str, Any] = (
+        Settings.CONFIG["forecast"].get("requests", {}).get("compression", {})
+    )
+    headers: Dict[str, str] = __cache_headers(etag, last_modified)
+    headers["Vary"] = "Accept-Encoding"
+    accepted_encodings: Set[str] = {
+        encoding.split(";")[0].strip().lower()
+        for encoding in request.headers.get("accept-encoding", "").split(",")
+    }
+    if content.__len__() >= compression_settings.get("minimum_size", 1024):
+        if brotli and "br" in accepted_encodings:
+            content = brotli.compress(
+                content, quality=compression_settings.get("brotli_quality", 4)
+            )
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted_encodings:
+            content = gzip.compress(
+                content, compresslevel=compression_settings.get("gzip_level", 6)
+            )
+            headers["Content-Encoding"] = "gzip"
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def __cache_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified != datetime.min:
+        headers["Last-Modified"] = format_datetime(
+            __http_datetime(last_modified), usegmt=True
+        )
+    return headers
+
+
+def __http_datetime(last_modified: datetime) -> datetime:
+    # Naive BRT datetimes, while HTTP dates are in GMT and have no fraction of
+    # seconds.
+    return (last_modified - timedelta(**TIMEZONE_DIFFERENCE)).replace(
+        microsecond=0, tzinfo=timezone.utc
+    )
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from numpy import arange, ndarray, pi, random, sin
+from yaml import safe_load
+
+import os
+import pytest
+import sys
+
+SOURCE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPOSITORY_DIR: str = os.path.dirname(SOURCE_DIR)
+
+# Modules are imported the same way as when running from 'src'.
+if SOURCE_DIR not in sys.path:
+    sys.path.insert(0, SOURCE_DIR)
+
+from db import Report  # noqa: E402
+from db.storage import STORAGE_SQLITE, Storage  # noqa: E402
+from settings import Settings  # noqa: E402
+
+# Synthetic daily history of every subsystem, see 'daily_history'.
+HISTORY_START: datetime = datetime(2021, 1, 1)
+HISTORY_DAYS: int = 730
+
+
+@pytest.fixture
+def settings(monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> Dict[str, Any]:
+    # Repository settings, with every cache and download directory moved to
+    # the test's own temporary directory. Restored once the test is done.
+    with open(os.path.join(REPOSITORY_DIR, "settings.yaml"), "r") as file:
+        config: Dict[str, Any] = safe_load(file)
+
+    config["storage"]["sqlite"] = {
+        "path": str(tmp_path / "sisbin.sqlite3"),
+        "schema": os.path.join(REPOSITORY_DIR, "schema.sqlite.sql"),
+        "timeout": 10,
+    }
+    config["open_data_ons"]["download_dir"] = str(tmp_path / "downloads")
+    config["open_data_ons"]["downloads"]["manifest"] = str(tmp_path / "downloads.json")
+    config["open_data_ons"]["archive"]["dir"] = str(tmp_path / "open_data")
+    config["forecast"]["cache"]["dir"] = str(tmp_path / "models")
+    config["forecast"]["store"]["dir"] = str(tmp_path / "forecasts")
+    monkeypatch.setattr(Settings, "CONFIG", config)
+    return config
+
+
+@pytest.fixture
+def daily_history(settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> Storage:
+    # Process-wide storage switched to an SQLite database of the test's own,
+    # holding a trend plus weekly and yearly seasonalities for every subsystem.
+    settings["storage"]["backend"] = STORAGE_SQLITE
+    monkeypatch.setattr(Storage, "_Storage__INSTANCE", None)
+
+    rng: random.Generator = random.default_rng(42)
+    days: ndarray = arange(HISTORY_DAYS)
+    for offset, subsystem in enumerate(Storage.get().fetch_subsystems()):
+        loads: ndarray = (
+            10000.0 * (offset + 1)
+            + 2.0 * days
+            + 500.0 * sin(2 * pi * days / 7)
+            + 1500.0 * sin(2 * pi * days / 365.25)
+            + rng.normal(0, 100.0, HISTORY_DAYS)
+        )
+        Storage.get().bulk_add_reports(
+            Report(subsystem.subsystem_id, HISTORY_START + timedelta(days=day), load)
+            for day, load in zip(days.tolist(), loads.tolist())
+        )
+    return Storage.get()
@@ -0,0 +1,113 @@
+from datetime import datetime
+from hashlib import sha256
+from typing import Any, Dict, List
+from pandas import DataFrame, concat, date_range
+
+import json
+import os
+import pytest
+
+# Archives are only read and written by pyarrow, which may be unusable (e.g.
+# built against another NumPy).
+pytest.importorskip("pyarrow", exc_type=ImportError)
+
+from archive import OpenDataArchive, OpenDataArchiveError  # noqa: E402
+
+SUBSYSTEM_IDS: List[str] = ["N", "NE", "S", "SE"]
+
+
+@pytest.fixture
+def archive_dir(settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> str:
+    monkeypatch.setattr(OpenDataArchive, "_OpenDataArchive__MANIFEST", None)
+    monkeypatch.setattr(OpenDataArchive, "_OpenDataArchive__VERIFIED", {})
+    return settings["open_data_ons"]["archive"]["dir"]
+
+
+def __load_record_chunks(year: int) -> List[DataFrame]:
+    # Daily records of every subsystem, split into monthly chunks.
+    instants: Any = date_range(datetime(year, 1, 1), datetime(year, 12, 31))
+    load_records: DataFrame = DataFrame(
+        {
+            "id_subsistema": [
+                subsystem_id for _ in instants for subsystem_id in SUBSYSTEM_IDS
+            ],
+            "din_instante": [instant for instant in instants for _ in SUBSYSTEM_IDS],
+            "val_cargaenergiamwmed": [
+                float(year * 1000 + index)
+                for index in range(instants.__len__() * SUBSYSTEM_IDS.__len__())
+            ],
+        }
+    )
+    return [
+        month_records
+        for _, month_records in load_records.groupby(
+            load_records["din_instante"].dt.month
+        )
+    ]
+
+
+def test_store(archive_dir: str) -> None:
+    load_record_chunks: List[DataFrame] = __load_record_chunks(2020)
+    assert OpenDataArchive.store(2020, "https://ons/2020.csv", load_record_chunks) == (
+        366 * SUBSYSTEM_IDS.__len__()
+    )
+    assert OpenDataArchive.years() == [2020]
+
+    with open(os.path.join(archive_dir, "manifest.json"), "r") as manifest_file:
+        archive_entry: Dict[str, Any] = json.load(manifest_file)["2020"]
+    with open(os.path.join(archive_dir, archive_entry["file"]), "rb") as archive_file:
+        assert archive_entry["sha256"] == sha256(archive_file.read()).hexdigest()
+    assert archive_entry["url"] == "https://ons/2020.csv"
+    assert archive_entry["rows"] == 366 * SUBSYSTEM_IDS.__len__()
+
+    # Read back batch by batch, as they were written.
+    read_chunks: List[DataFrame] = list(OpenDataArchive.read_chunks(2020))
+    assert [chunk.__len__() for chunk in read_chunks] == [
+        chunk.__len__() for chunk in load_record_chunks
+    ]
+    read_records: DataFrame = concat(read_chunks)
+    load_records: DataFrame = concat(load_record_chunks)
+    for column in load_records.columns:
+        assert read_records[column].tolist() == load_records[column].tolist()
+
+
+def test_fetch_load_series(archive_dir: str) -> None:
+    for year in [2019, 2020, 2021]:
+        OpenDataArchive.store(year, None, __load_record_chunks(year))
+
+    load_series: DataFrame = OpenDataArchive.fetch_load_series(
+        "SE", datetime(2019, 12, 30), datetime(2020, 1, 2)
+    )
+    assert list(load_series.columns) == ["instant_record", "instant_load_following"]
+    assert list(load_series["instant_record"]) == list(
+        date_range(datetime(2019, 12, 30), datetime(2020, 1, 2))
+    )
+    assert OpenDataArchive.fetch_load_series("SE").__len__() == 365 + 366 + 365
+    assert OpenDataArchive.fetch_load_series("XX").empty
+    assert OpenDataArchive.fetch_subsystem_ids() == SUBSYSTEM_IDS
+
+
+def test_missing_archive(archive_dir: str) -> None:
+    OpenDataArchive.store(2020, None, __load_record_chunks(2020))
+    os.remove(os.path.join(archive_dir, "2020.arrow"))
+    assert OpenDataArchive.years() == []
+    assert OpenDataArchive.fetch_subsystem_ids() == []
+
+
+def test_corrupted_archive(archive_dir: str) -> None:
+    for year in [2019, 2020]:
+        OpenDataArchive.store(year, None, __load_record_chunks(year))
+    # Verified once, then hashed again only once its file changes.
+    assert list(OpenDataArchive.read_chunks(2020))
+
+    archive_path: str = os.path.join(archive_dir, "2020.arrow")
+    with open(archive_path, "r+b") as archive_file:
+        archive_file.truncate(os.path.getsize(archive_path) - 16)
+
+    with pytest.raises(OpenDataArchiveError):
+        list(OpenDataArchive.read_chunks(2020))
+    # Discarded, so it's downloaded again by upcoming syncs.
+    assert not os.path.exists(archive_path)
+    assert OpenDataArchive.years() == [2019]
+    with open(os.path.join(archive_dir, "manifest.json"), "r") as manifest_file:
+        assert list(json.load(manifest_file)) == ["2019"]
@@ -0,0 +1,174 @@
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from typing import Any, Dict, Iterable, List, Tuple
+from downloader import OpenDataDownloader
+
+import json
+import os
+import pytest
+
+# Files served by the stand-in server, as (body, ETag, Last-Modified).
+SERVED_FILES: Dict[str, Tuple[bytes, str, str]] = {
+    f"/CARGA_ENERGIA_{year}.csv": (
+        b"id_subsistema;din_instante;val_cargaenergiamwmed\n"
+        + f"SE;{year}-01-01;1.0\n".encode("utf8"),
+        f'"etag-{year}"',
+        "Wed, 01 Jan 2020 00:00:00 GMT",
+    )
+    for year in range(2016, 2024)
+}
+# Announces more bytes than it sends, then drops the connection.
+BROKEN_FILE: str = "/CARGA_ENERGIA_2000.csv"
+RESPONSE_DELAY: float = 0.2
+
+
+class OpenDataRequestHandler(BaseHTTPRequestHandler):
+    requests: List[Tuple[str, Dict[str, str]]] = []
+    active_requests: int = 0
+    max_active_requests: int = 0
+    lock: Lock = Lock()
+
+    def do_GET(self) -> None:
+        with OpenDataRequestHandler.lock:
+            OpenDataRequestHandler.requests.append((self.path, dict(self.headers)))
+            OpenDataRequestHandler.active_requests += 1
+            OpenDataRequestHandler.max_active_requests = max(
+                OpenDataRequestHandler.max_active_requests,
+                OpenDataRequestHandler.active_requests,
+            )
+        try:
+            sleep(RESPONSE_DELAY)
+            self.__respond()
+        finally:
+            with OpenDataRequestHandler.lock:
+                OpenDataRequestHandler.active_requests -= 1
+
+    def log_message(self, *args: Tuple[Any, ...]) -> None:
+        pass
+
+    def __respond(self) -> None:
+        if self.path == BROKEN_FILE:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Length", "1000")
+            self.end_headers()
+            self.wfile.write(b"id_subsistema;din_instante")
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        if self.path not in SERVED_FILES:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        body, etag, last_modified = SERVED_FILES[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Length", str(body.__len__()))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server_url() -> Iterable[str]:
+    OpenDataRequestHandler.requests = []
+    OpenDataRequestHandler.max_active_requests = 0
+    server: ThreadingHTTPServer = ThreadingHTTPServer(
+        ("127.0.0.1", 0), OpenDataRequestHandler
+    )
+    server_thread: Thread = Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def target_dir(
+    settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+) -> str:
+    # Neither the session nor the manifest of previous tests are reused.
+    settings["open_data_ons"]["downloads"].update({"retries": 0, "max_workers": 4})
+    monkeypatch.setattr(OpenDataDownloader, "_OpenDataDownloader__SESSION", None)
+    monkeypatch.setattr(OpenDataDownloader, "_OpenDataDownloader__MANIFEST", None)
+    os.makedirs(tmp_path / "downloads")
+    return str(tmp_path / "downloads")
+
+
+def test_download_and_not_modified(
+    server_url: str, target_dir: str, settings: Dict[str, Any]
+) -> None:
+    url: str = f"{server_url}/CARGA_ENERGIA_2020.csv"
+    file_paths: List[str] = OpenDataDownloader.download_all([url], target_dir)
+    assert file_paths == [os.path.join(target_dir, "CARGA_ENERGIA_2020.csv")]
+    with open(file_paths[0], "rb") as downloaded_file:
+        assert downloaded_file.read() == SERVED_FILES["/CARGA_ENERGIA_2020.csv"][0]
+
+    with open(settings["open_data_ons"]["downloads"]["manifest"], "r") as manifest:
+        assert json.load(manifest)["CARGA_ENERGIA_2020.csv"] == {
+            "url": url,
+            "etag": '"etag-2020"',
+            "last_modified": "Wed, 01 Jan 2020 00:00:00 GMT",
+        }
+
+    # Unchanged since, so answered with 304 and left out.
+    assert OpenDataDownloader.download_all([url], target_dir) == []
+    _, headers = OpenDataRequestHandler.requests[-1]
+    assert headers["If-None-Match"] == '"etag-2020"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Jan 2020 00:00:00 GMT"
+    assert OpenDataDownloader.source_url("CARGA_ENERGIA_2020.csv") == url
+
+
+def test_concurrent_downloads(server_url: str, target_dir: str) -> None:
+    urls: List[str] = [f"{server_url}{path}" for path in SERVED_FILES]
+    elapsed_time: float = perf_counter()
+    file_paths: List[str] = OpenDataDownloader.download_all(urls, target_dir)
+    elapsed_time = perf_counter() - elapsed_time
+
+    assert sorted(os.path.basename(file_path) for file_path in file_paths) == sorted(
+        path.lstrip("/") for path in SERVED_FILES
+    )
+    assert OpenDataRequestHandler.max_active_requests > 1
+    assert elapsed_time < RESPONSE_DELAY * SERVED_FILES.__len__()
+
+
+def test_failed_download_leaves_no_partial_file(
+    server_url: str, target_dir: str
+) -> None:
+    file_paths: List[str] = OpenDataDownloader.download_all(
+        [
+            f"{server_url}{BROKEN_FILE}",
+            f"{server_url}/missing.csv",
+            f"{server_url}/CARGA_ENERGIA_2021.csv",
+        ],
+        target_dir,
+    )
+    assert [os.path.basename(file_path) for file_path in file_paths] == [
+        "CARGA_ENERGIA_2021.csv"
+    ]
+    assert os.listdir(target_dir) == ["CARGA_ENERGIA_2021.csv"]
+    assert OpenDataDownloader.source_url(BROKEN_FILE.lstrip("/")) is None
+
+
+def test_discard(server_url: str, target_dir: str, settings: Dict[str, Any]) -> None:
+    url: str = f"{server_url}/CARGA_ENERGIA_2022.csv"
+    OpenDataDownloader.download_all([url], target_dir)
+    OpenDataDownloader.discard("CARGA_ENERGIA_2022.csv")
+    with open(settings["open_data_ons"]["downloads"]["manifest"], "r") as manifest:
+        assert "CARGA_ENERGIA_2022.csv" not in json.load(manifest)
+
+    # Downloaded in full again, without any validator.
+    assert OpenDataDownloader.download_all([url], target_dir) == [
+        os.path.join(target_dir, "CARGA_ENERGIA_2022.csv")
+    ]
+    _, headers = OpenDataRequestHandler.requests[-1]
+    assert "If-None-Match" not in headers
+    assert "If-Modified-Since" not in headers
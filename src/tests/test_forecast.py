@@ -0,0 +1,311 @@
+from datetime import datetime, timedelta
+from logging import info
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Tuple
+from types import SimpleNamespace
+from numpy import arange
+from numpy.testing import assert_allclose
+from pandas import DataFrame, Timestamp, concat, date_range
+from db import Report
+from db.storage import Storage
+from forecast import (
+    IncidentForesight,
+    fit_subsystem_forecast,
+    refresh_materialized_forecasts,
+)
+from forecast.cache import ForecastWarmStart
+from forecast.model import ENGINE_PROPHET, INTERVAL_STRATEGY_RESIDUAL_QUANTILE
+from forecast.store import FORECAST_STORE_COLUMNS, ForecastSnapshot, ForecastStore
+
+import forecast
+import forecast.store
+import os
+import pytest
+
+
+@pytest.fixture
+def forecast_settings(
+    settings: Dict[str, Any], daily_history: Storage
+) -> Iterable[Dict[str, Any]]:
+    # Every forecast is fitted from scratch, with deterministic intervals.
+    settings["forecast"]["engine"] = ENGINE_PROPHET
+    settings["forecast"]["cache"].update({"enabled": False, "warm_start": False})
+    settings["forecast"]["intervals"]["strategy"] = INTERVAL_STRATEGY_RESIDUAL_QUANTILE
+    settings["forecast"]["materialized"]["enabled"] = False
+    settings["forecast"]["store"]["enabled"] = False
+
+    yield settings["forecast"]
+    IncidentForesight._IncidentForesight__shutdown_process_pool()
+
+
+def __predict(forecast_settings: Dict[str, Any], mode: str) -> List[Dict[str, Any]]:
+    forecast_settings["execution"]["mode"] = mode
+    incident_foresight: IncidentForesight = IncidentForesight(
+        datetime(2023, 1, 1),
+        datetime(2023, 3, 31),
+        forecast_settings["engine"],
+        **forecast_settings[forecast_settings["engine"]],
+    )
+    incident_foresight.predict()
+    return list(incident_foresight.serialize_forecasts())
+
+
+def test_process_and_sequential_fits_match(forecast_settings: Dict[str, Any]) -> None:
+    elapsed_times: Dict[str, float] = {}
+    forecasts: Dict[str, List[Dict[str, Any]]] = {}
+    for mode in ["sequential", "process"]:
+        elapsed_time: float = perf_counter()
+        forecasts[mode] = __predict(forecast_settings, mode)
+        elapsed_times[mode] = perf_counter() - elapsed_time
+
+    # Speedup depends on available cores, thus it's only logged.
+    info(
+        f"Fitted {forecasts['sequential'].__len__()} subsystems, "
+        + f"sequential: {elapsed_times['sequential']:.2f}s, "
+        + f"process: {elapsed_times['process']:.2f}s "
+        + f"({elapsed_times['sequential'] / elapsed_times['process']:.2f}x)"
+    )
+
+    assert [forecast["id_subsistema"] for forecast in forecasts["process"]] == [
+        forecast["id_subsistema"] for forecast in forecasts["sequential"]
+    ]
+    assert forecasts["sequential"].__len__() == 4
+    for process_forecast, sequential_forecast in zip(
+        forecasts["process"], forecasts["sequential"]
+    ):
+        assert process_forecast.keys() == sequential_forecast.keys()
+        assert process_forecast["previsoes"].__len__() == 90
+        assert [
+            estimate["din_instante"] for estimate in process_forecast["previsoes"]
+        ] == [estimate["din_instante"] for estimate in sequential_forecast["previsoes"]]
+        for column in [
+            "val_cargaenergiamwmed_estimado",
+            "val_cargaenergiamwmed_min",
+            "val_cargaenergiamwmed_max",
+        ]:
+            assert_allclose(
+                [estimate[column] for estimate in process_forecast["previsoes"]],
+                [estimate[column] for estimate in sequential_forecast["previsoes"]],
+            )
+
+
+def test_store_is_published_without_materialized_forecasts(
+    forecast_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    forecast_settings["store"]["enabled"] = True
+    forecast_settings["materialized"]["horizon"] = {"days": 30}
+    monkeypatch.setattr(ForecastStore, "_ForecastStore__SNAPSHOT", None)
+    monkeypatch.setattr(ForecastStore, "_ForecastStore__POINTER", None)
+    refresh_materialized_forecasts(forecast_settings)
+
+    snapshot: ForecastSnapshot | None = ForecastStore.current()
+    assert snapshot
+    assert snapshot.watermark == Storage.get().fetch_latest_instant_record()
+    assert snapshot.subsystems.keys() == {
+        subsystem.subsystem_id for subsystem in Storage.get().fetch_subsystems()
+    }
+    assert snapshot.coverage(next(iter(snapshot.subsystems))) == (
+        datetime(2022, 12, 31),
+        datetime(2023, 1, 30),
+    )
+    # Only published, thus never stored on the database.
+    assert Storage.get().fetch_forecasts_coverage() == {}
+
+
+def test_revised_history_is_not_served_by_cached_models(
+    forecast_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    forecast_settings["cache"]["enabled"] = True
+    forecast_settings["execution"]["mode"] = "sequential"
+    fits: List[Tuple[Any, ...]] = []
+
+    def counted_fit_subsystem_forecast(*args: Any) -> Any:
+        fits.append(args)
+        return fit_subsystem_forecast(*args)
+
+    monkeypatch.setattr(
+        forecast, "fit_subsystem_forecast", counted_fit_subsystem_forecast
+    )
+
+    def predict() -> str:
+        incident_foresight: IncidentForesight = IncidentForesight(
+            datetime(2023, 1, 1),
+            datetime(2023, 1, 7),
+            forecast_settings["engine"],
+            subsystem_ids=["SE"],
+            **forecast_settings[forecast_settings["engine"]],
+        )
+        incident_foresight.predict()
+        model_version, _ = incident_foresight.version()
+        return model_version
+
+    model_version: str = predict()
+    assert predict() == model_version
+    assert fits.__len__() == 1
+
+    # A corrected report within the history, thus the watermark stays put.
+    watermark: datetime = Storage.get().fetch_latest_instant_record()
+    Storage.get().add_reports([Report("SE", datetime(2022, 6, 1), 1.0)])
+    assert Storage.get().fetch_latest_instant_record() == watermark
+    assert predict() != model_version
+    assert fits.__len__() == 2
+
+
+def test_revised_history_refreshes_materialized_forecasts(
+    forecast_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    forecast_settings["materialized"].update({"enabled": True, "horizon": {"days": 7}})
+    forecast_settings["store"]["enabled"] = True
+    monkeypatch.setattr(ForecastStore, "_ForecastStore__SNAPSHOT", None)
+    monkeypatch.setattr(ForecastStore, "_ForecastStore__POINTER", None)
+    refresh_materialized_forecasts(forecast_settings)
+    snapshot: ForecastSnapshot | None = ForecastStore.current()
+    assert snapshot
+
+    # Up to date, thus neither refitted nor published again.
+    refresh_materialized_forecasts(forecast_settings)
+    assert ForecastStore.current().name == snapshot.name
+
+    # Corrected reports leave the watermark as is, yet outdate both forecasts.
+    Storage.get().add_reports([Report("SE", datetime(2022, 6, 1), 1.0)])
+    refresh_materialized_forecasts(forecast_settings)
+    revised_snapshot: ForecastSnapshot | None = ForecastStore.current()
+    assert revised_snapshot.watermark == snapshot.watermark
+    assert revised_snapshot.model_version != snapshot.model_version
+    assert revised_snapshot.revision == snapshot.revision + 1
+    assert {
+        model_version
+        for model_version, _, _ in Storage.get().fetch_forecasts_coverage().values()
+    } == {revised_snapshot.model_version}
+
+
+def test_warm_start_reuses_history_prefix(
+    settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ForecastWarmStart, "_ForecastWarmStart__STATES", {})
+    history: DataFrame = DataFrame(
+        {"ds": date_range("2023-01-01", periods=10), "y": arange(10, dtype=float)}
+    )
+    key: str = ForecastWarmStart.key("SE", {"engine": ENGINE_PROPHET})
+    assert ForecastWarmStart.initial_params(key, history) is None
+
+    ForecastWarmStart.put(key, SimpleNamespace(params={"k": [0.5]}), history)
+    appended_history: DataFrame = concat(
+        [
+            history,
+            DataFrame({"ds": date_range("2023-01-11", periods=3), "y": [1.0] * 3}),
+        ],
+        ignore_index=True,
+    )
+    assert ForecastWarmStart.initial_params(key, history) == {"k": [0.5]}
+    assert ForecastWarmStart.initial_params(key, appended_history) == {"k": [0.5]}
+    # Other subsystems and engine arguments have states of their own.
+    assert (
+        ForecastWarmStart.initial_params(
+            ForecastWarmStart.key("S", {"engine": ENGINE_PROPHET}), appended_history
+        )
+        is None
+    )
+
+    # States are kept on disk as well, so other processes reuse them.
+    monkeypatch.setattr(ForecastWarmStart, "_ForecastWarmStart__STATES", {})
+    assert ForecastWarmStart.initial_params(key, appended_history) == {"k": [0.5]}
+
+    revised_history: DataFrame = appended_history.copy()
+    revised_history.loc[3, "y"] += 1.0
+    backfilled_history: DataFrame = concat(
+        [DataFrame({"ds": [Timestamp("2022-12-31")], "y": [0.0]}), appended_history],
+        ignore_index=True,
+    )
+    for changed_history in [
+        revised_history,
+        backfilled_history,
+        appended_history.iloc[1:],
+        appended_history.drop(index=5),
+        appended_history.iloc[0:0],
+    ]:
+        assert ForecastWarmStart.initial_params(key, changed_history) is None
+
+
+def test_warm_start_is_disabled_once_history_is_revised(
+    forecast_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    forecast_settings["cache"]["warm_start"] = True
+    forecast_settings["execution"]["mode"] = "sequential"
+    monkeypatch.setattr(ForecastWarmStart, "_ForecastWarmStart__STATES", {})
+    initial_params: List[Dict[str, Any] | None] = []
+
+    def recorded_fit_subsystem_forecast(*args: Any) -> Any:
+        initial_params.append(args[-1])
+        return fit_subsystem_forecast(*args)
+
+    monkeypatch.setattr(
+        forecast, "fit_subsystem_forecast", recorded_fit_subsystem_forecast
+    )
+
+    def predict() -> None:
+        IncidentForesight(
+            datetime(2023, 1, 1),
+            datetime(2023, 1, 7),
+            forecast_settings["engine"],
+            subsystem_ids=["SE"],
+            **forecast_settings[forecast_settings["engine"]],
+        ).predict()
+
+    predict()
+    # A new day, thus the previous fit initializes the next one.
+    watermark: datetime = Storage.get().fetch_latest_instant_record()
+    Storage.get().add_reports([Report("SE", watermark + timedelta(days=1), 40000.0)])
+    predict()
+    # A corrected report within the history, thus it's fitted from scratch.
+    Storage.get().add_reports([Report("SE", datetime(2022, 6, 1), 1.0)])
+    predict()
+
+    assert initial_params[0] is None
+    assert initial_params[1]
+    assert initial_params[2] is None
+
+
+def test_store_discards_interrupted_publications(
+    settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ForecastStore, "_ForecastStore__SNAPSHOT", None)
+    monkeypatch.setattr(ForecastStore, "_ForecastStore__POINTER", None)
+    monkeypatch.setattr(forecast.store, "brt_now", lambda: datetime(2023, 1, 1))
+
+    # Left over by a publication of the same version, interrupted midway.
+    store_dir: str = settings["forecast"]["store"]["dir"]
+    os.makedirs(os.path.join(store_dir, "20230101000000-0123456789ab.tmp"))
+    with open(
+        os.path.join(store_dir, "20230101000000-0123456789ab.tmp", "stale.npy"), "w"
+    ) as stale_file:
+        stale_file.write("stale")
+
+    name: str = ForecastStore.publish(
+        "0123456789abcdef",
+        datetime(2022, 12, 31),
+        (1, datetime(2022, 12, 31)),
+        [
+            (
+                "SE",
+                "Sudeste/Centro-Oeste",
+                DataFrame(
+                    {
+                        "ds": date_range("2023-01-01", periods=3),
+                        "yhat": [1.0, 2.0, 3.0],
+                        "yhat_lower": [0.0, 1.0, 2.0],
+                        "yhat_upper": [2.0, 3.0, 4.0],
+                    }
+                ),
+            )
+        ],
+    )
+    assert name == "20230101000000-0123456789ab"
+    assert sorted(os.listdir(os.path.join(store_dir, name))) == sorted(
+        [f"{column}.npy" for column in FORECAST_STORE_COLUMNS] + ["metadata.json"]
+    )
+    assert sorted(os.listdir(store_dir)) == sorted(["CURRENT", name])
+
+    snapshot: ForecastSnapshot | None = ForecastStore.current()
+    assert snapshot and snapshot.name == name
+    assert snapshot.coverage("SE") == (datetime(2023, 1, 1), datetime(2023, 1, 3))
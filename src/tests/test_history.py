@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from typing import Any, Dict, Tuple
+from fastapi.testclient import TestClient
+from db import Report
+from db.storage import STORAGE_SQLITE, Storage
+from history import (
+    GRANULARITY_MONTH,
+    GRANULARITY_WEEK,
+    GRANULARITY_YEAR,
+    bucket_period,
+    fetch_load_history,
+    refresh_load_rollups,
+)
+from program import create_app
+
+import pytest
+
+# Daily reports crossing a year boundary, loaded 1.0, 2.0, 3.0 and so on.
+REPORTS_START: datetime = datetime(2022, 12, 25)
+REPORTS_FINAL: datetime = datetime(2023, 1, 10)
+
+
+@pytest.fixture
+def storage(settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> Storage:
+    settings["storage"]["backend"] = STORAGE_SQLITE
+    monkeypatch.setattr(Storage, "_Storage__INSTANCE", None)
+
+    Storage.get().add_reports(
+        [
+            Report("SE", REPORTS_START + timedelta(days=day), float(day + 1))
+            for day in range((REPORTS_FINAL - REPORTS_START).days + 1)
+        ]
+    )
+    assert refresh_load_rollups({"SE": (REPORTS_START, REPORTS_FINAL)})
+    return Storage.get()
+
+
+def __load_history(granularity: str) -> Dict[str, Dict[str, Any]]:
+    # Buckets of 'SE' by their start.
+    (subsystem_load_history,) = list(fetch_load_history(granularity))
+    assert subsystem_load_history["id_subsistema"] == "SE"
+    return {
+        bucket["din_instante"][:10]: bucket
+        for bucket in subsystem_load_history["historico"]
+    }
+
+
+@pytest.mark.parametrize(
+    "granularity,instant,expected_bucket",
+    [
+        # Weeks start on mondays, even across years.
+        (GRANULARITY_WEEK, datetime(2023, 1, 4, 12), ("2023-01-02", "2023-01-08")),
+        (GRANULARITY_WEEK, datetime(2022, 12, 31), ("2022-12-26", "2023-01-01")),
+        (GRANULARITY_WEEK, datetime(2023, 1, 2), ("2023-01-02", "2023-01-08")),
+        (GRANULARITY_MONTH, datetime(2024, 2, 15), ("2024-02-01", "2024-02-29")),
+        (GRANULARITY_YEAR, datetime(2023, 12, 31, 23), ("2023-01-01", "2023-12-31")),
+    ],
+)
+def test_bucket_period(
+    granularity: str, instant: datetime, expected_bucket: Tuple[str, str]
+) -> None:
+    bucket_start, bucket_final = bucket_period(granularity, instant, instant)
+    assert bucket_start == datetime.fromisoformat(expected_bucket[0])
+    assert bucket_final == datetime.fromisoformat(expected_bucket[1]).replace(
+        hour=23, minute=59, second=59
+    )
+
+
+def test_rollups(storage: Storage) -> None:
+    # Loads are 1 to 17, from 2022-12-25 (sunday) to 2023-01-10 (tuesday).
+    weeks: Dict[str, Dict[str, Any]] = __load_history(GRANULARITY_WEEK)
+    assert list(weeks) == ["2022-12-19", "2022-12-26", "2023-01-02", "2023-01-09"]
+    assert [week["num_registros"] for week in weeks.values()] == [1, 7, 7, 2]
+    assert weeks["2022-12-26"]["val_cargaenergiamwmed_min"] == 2.0
+    assert weeks["2022-12-26"]["val_cargaenergiamwmed_max"] == 8.0
+    assert weeks["2022-12-26"]["val_cargaenergiamwmed_soma"] == sum(range(2, 9))
+    assert weeks["2022-12-26"]["val_cargaenergiamwmed_media"] == 5.0
+
+    months: Dict[str, Dict[str, Any]] = __load_history(GRANULARITY_MONTH)
+    assert {month: bucket["num_registros"] for month, bucket in months.items()} == {
+        "2022-12-01": 7,
+        "2023-01-01": 10,
+    }
+    years: Dict[str, Dict[str, Any]] = __load_history(GRANULARITY_YEAR)
+    assert {
+        year: bucket["val_cargaenergiamwmed_soma"] for year, bucket in years.items()
+    } == {
+        "2022-01-01": sum(range(1, 8)),
+        "2023-01-01": sum(range(8, 18)),
+    }
+
+
+def test_only_touched_buckets_are_refreshed(storage: Storage) -> None:
+    # Both revised, though only the latter is within the affected period.
+    storage.add_reports(
+        [
+            Report("SE", datetime(2022, 12, 25), 100.0),
+            Report("SE", REPORTS_FINAL, 100.0),
+        ]
+    )
+    assert refresh_load_rollups({"SE": (REPORTS_FINAL, REPORTS_FINAL)})
+
+    weeks: Dict[str, Dict[str, Any]] = __load_history(GRANULARITY_WEEK)
+    assert weeks["2023-01-09"]["val_cargaenergiamwmed_max"] == 100.0
+    assert weeks["2022-12-19"]["val_cargaenergiamwmed_max"] == 1.0
+    assert weeks["2022-12-26"]["num_registros"] == 7
+
+    # Whole buckets are recomputed, not only their affected reports.
+    months: Dict[str, Dict[str, Any]] = __load_history(GRANULARITY_MONTH)
+    assert months["2023-01-01"]["val_cargaenergiamwmed_soma"] == (
+        sum(range(8, 17)) + 100.0
+    )
+    assert months["2023-01-01"]["num_registros"] == 10
+    assert months["2022-12-01"]["val_cargaenergiamwmed_soma"] == sum(range(1, 8))
+
+
+def test_load_history_endpoint(storage: Storage) -> None:
+    client: TestClient = TestClient(create_app())
+    response: Any = client.get(
+        "/load_history",
+        params={
+            "granularity": GRANULARITY_WEEK,
+            "start_period": "2022-12-28",
+            "final_period": "2023-01-03",
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+    # Widened to whole weeks.
+    assert [bucket["din_instante"] for bucket in response.json()[0]["historico"]] == [
+        "2022-12-26 00:00:00",
+        "2023-01-02 00:00:00",
+    ]
+
+    for granularity in ["hour", "day", "quarter"]:
+        response = client.get("/load_history", params={"granularity": granularity})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert granularity in response.json()["detail"]
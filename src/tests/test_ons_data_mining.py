@@ -0,0 +1,159 @@
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import parse_qs, urlparse
+from downloader import OpenDataDownloader
+from ons_data_mining import resolve_open_data_links
+
+import json
+import pytest
+
+CKAN_API_PATH: str = "/api/3/action/package_show"
+DATASET_PATH: str = "/dataset/carga-energia"
+
+
+class OpenDataPortalHandler(BaseHTTPRequestHandler):
+    # Responses as (status, content type, body) by path, anything else is 404.
+    routes: Dict[str, Tuple[int, str, bytes]] = {}
+    requests: List[Tuple[str, Dict[str, List[str]]]] = []
+
+    def do_GET(self) -> None:
+        url: Any = urlparse(self.path)
+        OpenDataPortalHandler.requests.append((url.path, parse_qs(url.query)))
+        status, content_type, body = OpenDataPortalHandler.routes.get(
+            url.path, (HTTPStatus.NOT_FOUND, "text/plain", b"Not found!")
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(body.__len__()))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Tuple[Any, ...]) -> None:
+        pass
+
+
+@pytest.fixture
+def portal_url(
+    settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> Iterable[str]:
+    OpenDataPortalHandler.routes = {}
+    OpenDataPortalHandler.requests = []
+    settings["open_data_ons"]["downloads"]["retries"] = 0
+    monkeypatch.setattr(OpenDataDownloader, "_OpenDataDownloader__SESSION", None)
+
+    server: ThreadingHTTPServer = ThreadingHTTPServer(
+        ("127.0.0.1", 0), OpenDataPortalHandler
+    )
+    Thread(target=server.serve_forever, daemon=True).start()
+    portal_url: str = f"http://127.0.0.1:{server.server_address[1]}"
+    settings["open_data_ons"]["url"] = f"{portal_url}{DATASET_PATH}"
+    yield portal_url
+    server.shutdown()
+    server.server_close()
+
+
+def __ckan_package(resource_urls: List[str]) -> Tuple[int, str, bytes]:
+    return (
+        HTTPStatus.OK,
+        "application/json",
+        json.dumps(
+            {
+                "success": True,
+                "result": {"resources": [{"url": url} for url in resource_urls]},
+            }
+        ).encode("utf8"),
+    )
+
+
+def test_resolve_links_from_ckan_api(portal_url: str, settings: Dict[str, Any]) -> None:
+    OpenDataPortalHandler.routes[CKAN_API_PATH] = __ckan_package(
+        [
+            f"{portal_url}/files/CARGA_ENERGIA_2022.csv",
+            f"{portal_url}/files/CARGA_ENERGIA_2023.csv",
+            f"{portal_url}/files/CARGA_ENERGIA_2023.parquet",
+            f"{portal_url}/files/CARGA_ENERGIA_2023_csv.zip",
+            f"{portal_url}/files/dicionario_dados.csv",
+        ]
+    )
+    assert resolve_open_data_links(
+        settings["open_data_ons"], settings["web_scrapping"]
+    ) == [
+        f"{portal_url}/files/CARGA_ENERGIA_2022.csv",
+        f"{portal_url}/files/CARGA_ENERGIA_2023.csv",
+    ]
+    # Package id is taken from the dataset page URL.
+    assert OpenDataPortalHandler.requests == [
+        (CKAN_API_PATH, {"id": ["carga-energia"]})
+    ]
+
+
+def test_resolve_links_from_html_page(
+    portal_url: str, settings: Dict[str, Any]
+) -> None:
+    OpenDataPortalHandler.routes[CKAN_API_PATH] = (
+        HTTPStatus.OK,
+        "application/json",
+        b'{"success": false, "error": {"message": "Not found"}}',
+    )
+    OpenDataPortalHandler.routes[DATASET_PATH] = (
+        HTTPStatus.OK,
+        "text/html",
+        b"""
+        <html><body>
+            <a href="/files/CARGA_ENERGIA_2021.csv">2021</a>
+            <a href="https://mirror.example/CARGA_ENERGIA_2022.csv">2022</a>
+            <a href="/files/CARGA_ENERGIA_2022.xlsx">2022 (xlsx)</a>
+            <a href="/files/dicionario_dados.csv">Dictionary</a>
+            <a name="no-href">Anchor</a>
+        </body></html>
+        """,
+    )
+    assert resolve_open_data_links(
+        settings["open_data_ons"], settings["web_scrapping"]
+    ) == [
+        f"{portal_url}/files/CARGA_ENERGIA_2021.csv",
+        "https://mirror.example/CARGA_ENERGIA_2022.csv",
+    ]
+    assert [path for path, _ in OpenDataPortalHandler.requests] == [
+        CKAN_API_PATH,
+        DATASET_PATH,
+    ]
+
+
+def test_resolve_links_from_explicit_ckan_api_url(
+    portal_url: str, settings: Dict[str, Any]
+) -> None:
+    OpenDataPortalHandler.routes["/ckan/package_show"] = __ckan_package(
+        [f"{portal_url}/files/CARGA_ENERGIA_2020.csv"]
+    )
+    settings["open_data_ons"]["ckan_api_url"] = f"{portal_url}/ckan/package_show"
+    assert resolve_open_data_links(
+        settings["open_data_ons"], settings["web_scrapping"]
+    ) == [f"{portal_url}/files/CARGA_ENERGIA_2020.csv"]
+
+
+def test_resolve_links_when_every_source_fails(
+    portal_url: str, settings: Dict[str, Any]
+) -> None:
+    OpenDataPortalHandler.routes[CKAN_API_PATH] = (
+        HTTPStatus.OK,
+        "application/json",
+        b"<html>Not JSON</html>",
+    )
+    OpenDataPortalHandler.routes[DATASET_PATH] = (
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        "text/plain",
+        b"Maintenance",
+    )
+    # Browser fallback is opted out, thus never started.
+    assert not settings["web_scrapping"]["browser_fallback"]
+    assert (
+        resolve_open_data_links(settings["open_data_ons"], settings["web_scrapping"])
+        == []
+    )
+    assert [path for path, _ in OpenDataPortalHandler.requests] == [
+        CKAN_API_PATH,
+        DATASET_PATH,
+    ]
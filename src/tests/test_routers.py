@@ -0,0 +1,365 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+from threading import Event
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from db import Report
+from db.storage import Storage
+from forecast.model import ENGINE_SEASONAL
+from program import create_app
+from routers import responses
+from routers.executor import SingleFlightExecutor
+from routers.export import EXPORT_COLUMNS
+from utils import TIMEZONE_DIFFERENCE, brt_now
+
+import anyio
+import db.sqlite_storage
+import gzip
+import orjson
+import pytest
+import routers
+
+FORECAST_URL: str = (
+    "/incident_foresight?start_period=2023-01-01&final_period=2023-01-31"
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    # Computations are futures of the running asyncio loop.
+    return "asyncio"
+
+
+@pytest.fixture
+def client(settings: Dict[str, Any], daily_history: Storage) -> TestClient:
+    # Forecasts are fitted on request by the NumPy engine, within milliseconds.
+    settings["forecast"]["engine"] = ENGINE_SEASONAL
+    settings["forecast"]["cache"].update({"enabled": False, "warm_start": False})
+    settings["forecast"]["materialized"]["enabled"] = False
+    settings["forecast"]["store"]["enabled"] = False
+    return TestClient(create_app())
+
+
+def __http_date(value: datetime) -> str:
+    return format_datetime(
+        (value - timedelta(**TIMEZONE_DIFFERENCE)).replace(
+            microsecond=0, tzinfo=timezone.utc
+        ),
+        usegmt=True,
+    )
+
+
+def test_validators(client: TestClient, daily_history: Storage) -> None:
+    response: Any = client.get(FORECAST_URL)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["etag"].startswith('W/"')
+    assert response.headers["cache-control"] == "no-cache"
+    # Last modified once reports were last revised, not at the watermark.
+    _, revised_at = daily_history.fetch_reports_revision()
+    assert response.headers["last-modified"] == __http_date(revised_at)
+
+
+def test_if_none_match(client: TestClient) -> None:
+    etag: str = client.get(FORECAST_URL).headers["etag"]
+    # Weak comparison, against any of the listed tags.
+    for if_none_match in [etag, etag.removeprefix("W/"), f'"other", {etag}', "*"]:
+        response: Any = client.get(
+            FORECAST_URL, headers={"If-None-Match": if_none_match}
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert (
+        client.get(FORECAST_URL, headers={"If-None-Match": '"other"'}).status_code
+        == HTTPStatus.OK
+    )
+    # Tags depend on requested windows as well.
+    assert (
+        client.get(
+            FORECAST_URL.replace("2023-01-31", "2023-02-28"),
+            headers={"If-None-Match": etag},
+        ).status_code
+        == HTTPStatus.OK
+    )
+
+
+def test_if_modified_since(client: TestClient) -> None:
+    last_modified: str = client.get(FORECAST_URL).headers["last-modified"]
+    assert (
+        client.get(
+            FORECAST_URL, headers={"If-Modified-Since": last_modified}
+        ).status_code
+        == HTTPStatus.NOT_MODIFIED
+    )
+
+    earlier: str = format_datetime(
+        parsedate_to_datetime(last_modified) - timedelta(seconds=1), usegmt=True
+    )
+    for headers in [
+        {"If-Modified-Since": earlier},
+        {"If-Modified-Since": "not a date"},
+        # Ignored along 'If-None-Match', which takes precedence.
+        {"If-Modified-Since": last_modified, "If-None-Match": '"other"'},
+    ]:
+        assert client.get(FORECAST_URL, headers=headers).status_code == HTTPStatus.OK
+
+
+def test_revised_reports_change_validators(
+    client: TestClient, daily_history: Storage, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    response: Any = client.get(FORECAST_URL)
+
+    # Corrected a minute later, without moving the watermark.
+    watermark: datetime = daily_history.fetch_latest_instant_record()
+    monkeypatch.setattr(
+        db.sqlite_storage, "brt_now", lambda: brt_now() + timedelta(minutes=1)
+    )
+    daily_history.add_reports([Report("SE", datetime(2022, 6, 1), 1.0)])
+    assert daily_history.fetch_latest_instant_record() == watermark
+
+    for headers in [
+        {"If-None-Match": response.headers["etag"]},
+        {"If-Modified-Since": response.headers["last-modified"]},
+    ]:
+        revised_response: Any = client.get(FORECAST_URL, headers=headers)
+        assert revised_response.status_code == HTTPStatus.OK
+        assert revised_response.headers["etag"] != response.headers["etag"]
+        assert parsedate_to_datetime(
+            revised_response.headers["last-modified"]
+        ) > parsedate_to_datetime(response.headers["last-modified"])
+
+
+def test_compression(
+    client: TestClient, settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Raw bodies are read, so they're never decoded by the client.
+    def fetch(accept_encoding: str) -> Any:
+        with client.stream(
+            "GET", FORECAST_URL, headers={"Accept-Encoding": accept_encoding}
+        ) as response:
+            return response.headers, b"".join(response.iter_raw())
+
+    monkeypatch.setattr(responses, "brotli", None)
+    headers, content = fetch("identity")
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+
+    # Falls back to gzip while brotli isn't installed.
+    gzip_headers, gzip_content = fetch("br, gzip;q=0.8")
+    assert gzip_headers["content-encoding"] == "gzip"
+    assert gzip_headers["etag"] == headers["etag"]
+    assert gzip.decompress(gzip_content) == content
+
+    monkeypatch.setattr(
+        responses,
+        "brotli",
+        SimpleNamespace(compress=lambda content, quality: b"br:" + content),
+    )
+    brotli_headers, brotli_content = fetch("gzip, br")
+    assert brotli_headers["content-encoding"] == "br"
+    assert brotli_content == b"br:" + content
+    assert fetch("gzip")[0]["content-encoding"] == "gzip"
+
+    # Payloads under 'minimum_size' aren't worth it.
+    settings["forecast"]["requests"]["compression"]["minimum_size"] = content.__len__()
+    assert fetch("gzip")[0]["content-encoding"] == "gzip"
+    settings["forecast"]["requests"]["compression"]["minimum_size"] += 1
+    assert "content-encoding" not in fetch("gzip")[0]
+
+
+def test_export_csv(client: TestClient, settings: Dict[str, Any]) -> None:
+    # Several chunks, each one of up to 'batch_size' rows.
+    settings["export"]["batch_size"] = 2
+    response: Any = client.get(
+        "/export/history",
+        params={
+            "export_format": "csv",
+            "subsystem_id": "SE",
+            "start_period": "2021-01-01",
+            "final_period": "2021-01-05",
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert (
+        response.headers["content-disposition"] == 'attachment; filename="history.csv"'
+    )
+
+    csv_lines: List[List[str]] = [
+        line.split(";") for line in response.text.splitlines()
+    ]
+    assert csv_lines[0] == EXPORT_COLUMNS["history"]
+    assert [csv_line[:2] for csv_line in csv_lines[1:]] == [
+        ["SE", f"2021-01-0{day} 00:00:00"] for day in range(1, 6)
+    ]
+    assert all(float(csv_line[2]) > 0 for csv_line in csv_lines[1:])
+
+
+def test_export_ndjson(client: TestClient, daily_history: Storage) -> None:
+    response: Any = client.get("/export/history", params={"final_period": "2021-01-02"})
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records: List[Dict[str, Any]] = [
+        orjson.loads(line) for line in response.text.splitlines()
+    ]
+    # Sorted by subsystem, then instant.
+    assert [
+        (record["id_subsistema"], record["din_instante"]) for record in records
+    ] == [
+        (subsystem_id, f"2021-01-0{day} 00:00:00")
+        for subsystem_id in ["N", "NE", "S", "SE"]
+        for day in [1, 2]
+    ]
+    assert records[-1]["val_cargaenergiamwmed"] == (
+        daily_history.fetch_load_series("SE", final_period=datetime(2021, 1, 2))[
+            "instant_load_following"
+        ].iloc[-1]
+    )
+
+
+def test_export_empty_dataset(client: TestClient) -> None:
+    # Nothing was materialized, so only CSV headers are sent.
+    csv_response: Any = client.get("/export/forecasts", params={"export_format": "csv"})
+    assert csv_response.status_code == HTTPStatus.OK
+    assert csv_response.text == ";".join(EXPORT_COLUMNS["forecasts"]) + "\n"
+
+    ndjson_response: Any = client.get("/export/forecasts")
+    assert ndjson_response.status_code == HTTPStatus.OK
+    assert ndjson_response.content == b""
+
+
+def test_export_unknown_dataset_or_format(client: TestClient) -> None:
+    assert client.get("/export/unknown").status_code == HTTPStatus.NOT_FOUND
+    assert (
+        client.get("/export/history", params={"export_format": "xlsx"}).status_code
+        == HTTPStatus.BAD_REQUEST
+    )
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests(
+    client: TestClient, settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    settings["forecast"]["requests"].update({"max_pending": 2, "retry_after": 30})
+    monkeypatch.setattr(SingleFlightExecutor, "_SingleFlightExecutor__IN_FLIGHT", {})
+
+    # Computations are held until every request is in flight.
+    released: Event = Event()
+    computations: List[Any] = []
+    fetch_incident_foresights: Any = getattr(routers, "__fetch_incident_foresights")
+
+    def held_fetch_incident_foresights(*args: Any) -> bytes:
+        computations.append(args)
+        released.wait(10)
+        return fetch_incident_foresights(*args)
+
+    monkeypatch.setattr(
+        routers, "__fetch_incident_foresights", held_fetch_incident_foresights
+    )
+
+    other_url: str = FORECAST_URL.replace("2023-01-31", "2023-02-28")
+    async with AsyncClient(
+        transport=ASGITransport(app=client.app), base_url="http://testserver"
+    ) as async_client:
+        responses_by_url: Dict[str, List[Any]] = {FORECAST_URL: [], other_url: []}
+
+        async def fetch(url: str) -> None:
+            responses_by_url[url].append(await async_client.get(url))
+
+        async with anyio.create_task_group() as task_group:
+            for url in [FORECAST_URL] * 10 + [other_url]:
+                task_group.start_soon(fetch, url)
+            with anyio.fail_after(10):
+                while computations.__len__() < 2:
+                    await anyio.sleep(0.01)
+
+            # Neither window is computed yet, so a third one is over capacity.
+            over_capacity: Any = await async_client.get(
+                FORECAST_URL.replace("2023-01-31", "2023-03-31")
+            )
+            assert over_capacity.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+            assert over_capacity.headers["retry-after"] == "30"
+            released.set()
+
+        assert computations.__len__() == 2
+        for url_responses in responses_by_url.values():
+            assert {response.status_code for response in url_responses} == {
+                HTTPStatus.OK
+            }
+            assert {response.content for response in url_responses}.__len__() == 1
+
+        # Once done, upcoming requests compute it again.
+        assert (await async_client.get(FORECAST_URL)).status_code == HTTPStatus.OK
+        assert computations.__len__() == 3
+
+
+def test_windows(client: TestClient) -> None:
+    response: Any = client.get(
+        "/incident_foresight",
+        params=[
+            ("window", "2023-01-01/2023-01-06"),
+            ("window", "2023-03-01/2023-03-03"),
+            ("subsystem_id", "SE"),
+            ("subsystem_id", "N"),
+        ],
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    # One entry per window and subsystem, in order of windows then subsystems.
+    incident_foresights: List[Dict[str, Any]] = response.json()
+    assert [
+        (
+            incident_foresight["din_instante_inicio"][:10],
+            incident_foresight["id_subsistema"],
+            incident_foresight["din_instante_periodo_dias"],
+        )
+        for incident_foresight in incident_foresights
+    ] == [
+        ("2023-01-01", "N", 5),
+        ("2023-01-01", "SE", 5),
+        ("2023-03-01", "N", 2),
+        ("2023-03-01", "SE", 2),
+    ]
+    # Windows include both of their ends.
+    for incident_foresight in incident_foresights:
+        forecasts: List[Dict[str, Any]] = incident_foresight["previsoes"]
+        assert (
+            forecasts.__len__() == incident_foresight["din_instante_periodo_dias"] + 1
+        )
+        assert forecasts[0]["din_instante"] == incident_foresight["din_instante_inicio"]
+        assert forecasts[-1]["din_instante"] == incident_foresight["din_instante_final"]
+
+
+def test_windows_default_to_every_subsystem(client: TestClient) -> None:
+    incident_foresights: List[Dict[str, Any]] = client.get(FORECAST_URL).json()
+    assert [
+        incident_foresight["id_subsistema"]
+        for incident_foresight in incident_foresights
+    ] == ["N", "NE", "S", "SE"]
+
+
+def test_invalid_windows(client: TestClient, settings: Dict[str, Any]) -> None:
+    settings["forecast"]["requests"]["max_windows"] = 2
+    for params in [
+        [("window", f"2023-0{month}-01/2023-0{month}-05") for month in range(1, 4)],
+        [("window", "2023-01-01/tomorrow")],
+        [("start_period", "2023-01-01"), ("subsystem_id", "XX")],
+    ]:
+        response: Any = client.get("/incident_foresight", params=params)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    assert "XX" in response.json()["detail"]
+    assert (
+        client.get(
+            "/incident_foresight",
+            params=[
+                ("window", f"2023-0{month}-01/2023-0{month}-05") for month in [1, 2]
+            ],
+        ).status_code
+        == HTTPStatus.OK
+    )
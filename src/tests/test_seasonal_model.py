@@ -0,0 +1,97 @@
+from typing import Any, Dict
+from numpy import absolute, arange, ndarray, pi, random, sin
+from numpy.testing import assert_allclose
+from pandas import DataFrame, date_range
+from forecast.model import ENGINE_SEASONAL, ForecastModel
+
+import pytest
+
+MODEL_ARGS: Dict[str, Any] = {
+    "n_changepoints": 25,
+    "changepoint_range": 0.8,
+    "regularization": 1.0,
+    "weekly_order": 3,
+    "yearly_order": 10,
+}
+
+
+@pytest.fixture
+def history() -> DataFrame:
+    # Trend plus weekly and yearly seasonalities, over three years.
+    rng: random.Generator = random.default_rng(7)
+    days: ndarray = arange(3 * 365)
+    return DataFrame(
+        {
+            "ds": date_range("2020-01-01", periods=days.shape[0]),
+            "y": 30000.0
+            + 3.0 * days
+            + 800.0 * sin(2 * pi * days / 7)
+            + 2000.0 * sin(2 * pi * days / 365.25)
+            + rng.normal(0, 150.0, days.shape[0]),
+        }
+    )
+
+
+def __fit(history: DataFrame, **model_args: Any) -> ForecastModel:
+    model: ForecastModel = ForecastModel.create(
+        ENGINE_SEASONAL, {**MODEL_ARGS, **model_args}, {}
+    )
+    model.fit(history)
+    return model
+
+
+def test_fit_predict(history: DataFrame) -> None:
+    model: ForecastModel = __fit(history.iloc[:-30], interval_width=0.95)
+    forecast: DataFrame = model.predict(history.iloc[-30:][["ds"]])
+
+    assert list(forecast.columns) == ["ds", "yhat", "yhat_lower", "yhat_upper"]
+    assert forecast.__len__() == 30
+    assert (forecast["ds"].to_numpy() == history["ds"].iloc[-30:].to_numpy()).all()
+    # Out of sample, within a couple percent of actual loads.
+    y: ndarray = history["y"].iloc[-30:].to_numpy()
+    assert (absolute(y - forecast["yhat"].to_numpy()) / y).mean() < 0.02
+
+
+def test_interval_ordering(history: DataFrame) -> None:
+    for interval_width in [0.5, 0.8, 0.95]:
+        forecast: DataFrame = __fit(history, interval_width=interval_width).predict(
+            history[["ds"]]
+        )
+        assert (forecast["yhat_lower"] <= forecast["yhat"]).all()
+        assert (forecast["yhat"] <= forecast["yhat_upper"]).all()
+
+
+def test_interval_width(history: DataFrame) -> None:
+    widths: Dict[float, float] = {}
+    for interval_width in [0.5, 0.8, 0.95]:
+        forecast: DataFrame = __fit(history, interval_width=interval_width).predict(
+            history[["ds"]]
+        )
+        widths[interval_width] = float(
+            (forecast["yhat_upper"] - forecast["yhat_lower"]).mean()
+        )
+        # Residual quantiles, so in-sample coverage matches the width.
+        coverage: float = float(
+            (
+                (history["y"] >= forecast["yhat_lower"])
+                & (history["y"] <= forecast["yhat_upper"])
+            ).mean()
+        )
+        assert coverage == pytest.approx(interval_width, abs=0.01)
+    assert widths[0.5] < widths[0.8] < widths[0.95]
+
+    # Same default as Prophet once unset.
+    assert_allclose(
+        __fit(history).predict(history[["ds"]])["yhat_upper"],
+        __fit(history, interval_width=0.8).predict(history[["ds"]])["yhat_upper"],
+    )
+
+
+def test_serialization(history: DataFrame) -> None:
+    model: ForecastModel = __fit(history)
+    restored_model: ForecastModel = ForecastModel.from_json(model.to_json())
+    assert restored_model.engine == ENGINE_SEASONAL
+    assert_allclose(
+        restored_model.predict(history[["ds"]]).drop(columns="ds"),
+        model.predict(history[["ds"]]).drop(columns="ds"),
+    )
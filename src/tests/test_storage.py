@@ -0,0 +1,282 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+from pandas import DataFrame
+from db import Report
+from db.sqlite_storage import SqliteStorage
+from db.storage import STORAGE_MARIADB, STORAGE_SQLITE, Storage
+
+import os
+import pytest
+import sqlite3
+
+# Contract every 'Storage' backend must honour. MariaDB runs against the
+# database named by 'SISBIN_TEST_DATABASE' (created from 'schema.sql', using
+# that name instead of 'sisbin'), all of its tables are emptied beforehand.
+STORAGE_TEST_TABLES: List[str] = [
+    "sin_subsystems_reports_revision",
+    "sin_subsystems_reports_rollups",
+    "sin_subsystems_forecasts",
+    "sin_subsystems_reports",
+]
+
+
+@pytest.fixture(params=[STORAGE_SQLITE, STORAGE_MARIADB])
+def storage(request: pytest.FixtureRequest, settings: Dict[str, Any]) -> Storage:
+    if request.param == STORAGE_MARIADB:
+        __prepare_mariadb(settings)
+    return Storage.create(request.param)
+
+
+def __prepare_mariadb(settings: Dict[str, Any]) -> None:
+    database: str | None = os.environ.get("SISBIN_TEST_DATABASE")
+    if not database:
+        pytest.skip("'SISBIN_TEST_DATABASE' isn't set.")
+
+    mariadb = pytest.importorskip("mariadb")
+    settings["database"]["database"] = database
+    try:
+        mariadb.connect(
+            **{
+                key: value
+                for key, value in settings["database"].items()
+                if key != "pool"
+            }
+        ).close()
+    except mariadb.Error as err:
+        pytest.skip(f"MariaDB server is unavailable: {err}")
+
+    from db.mariadb_storage import MariaDb
+
+    with MariaDb() as mariadb_connection:
+        for table in STORAGE_TEST_TABLES:
+            mariadb_connection.execute(query=f"DELETE FROM `{table}`")
+
+
+def __hourly_reports(
+    subsystem_id: str, start: datetime, hours: int, load: float = 100.0
+) -> Iterable[Report]:
+    # Loads are exactly representable on MariaDB's single precision 'FLOAT'.
+    for hour in range(hours):
+        yield Report(subsystem_id, start + timedelta(hours=hour), load + hour)
+
+
+def test_empty_storage(storage: Storage) -> None:
+    assert storage.is_empty_reports()
+    assert storage.fetch_latest_instant_record() == datetime.min
+    assert list(storage.fetch_distinct_instant_record_years()) == []
+    assert storage.fetch_forecasts_coverage() == {}
+    assert storage.fetch_load_series("SE").columns.tolist() == [
+        "instant_record",
+        "instant_load_following",
+    ]
+
+
+def test_subsystems(storage: Storage) -> None:
+    assert {
+        subsystem.subsystem_id: subsystem.subsystem_name
+        for subsystem in storage.fetch_subsystems()
+    } == {"N": "Norte", "NE": "Nordeste", "S": "Sul", "SE": "Sudeste/Centro-Oeste"}
+    assert storage.fetch_subsystem_name_by_id("S") == "Sul"
+    assert storage.fetch_subsystem_name_by_id("XX") is None
+
+
+def test_bulk_add_reports_is_lazy_and_idempotent(storage: Storage) -> None:
+    consumed: List[Report] = []
+
+    def reports() -> Iterable[Report]:
+        for report in __hourly_reports("SE", datetime(2020, 1, 1), 48):
+            consumed.append(report)
+            yield report
+
+    assert storage.bulk_add_reports(reports(), batch_size=10)
+    assert consumed.__len__() == 48
+    assert not storage.is_empty_reports()
+
+    # Same keys again, with new loads: updated in place instead of duplicated.
+    assert storage.bulk_add_reports(
+        __hourly_reports("SE", datetime(2020, 1, 1), 24, load=500.0), batch_size=7
+    )
+    reports_by_instant: Dict[datetime, float] = {
+        report.instant_record: report.instant_load_following
+        for report in storage.fetch_reports_by_subsystem_id("SE")
+    }
+    assert reports_by_instant.__len__() == 48
+    assert reports_by_instant[datetime(2020, 1, 1, 0)] == 500.0
+    assert reports_by_instant[datetime(2020, 1, 1, 23)] == 523.0
+    assert reports_by_instant[datetime(2020, 1, 2, 0)] == 124.0
+
+
+def test_add_reports(storage: Storage) -> None:
+    assert storage.add_reports(list(__hourly_reports("N", datetime(2020, 1, 1), 3)))
+    assert storage.fetch_latest_instant_record() == datetime(2020, 1, 1, 2)
+
+
+def test_reports_revision(storage: Storage) -> None:
+    assert storage.fetch_reports_revision() == (0, datetime.min)
+
+    assert storage.bulk_add_reports(__hourly_reports("SE", datetime(2020, 1, 1), 3))
+    revision, revised_at = storage.fetch_reports_revision()
+    assert revision == 1
+    assert revised_at > datetime(2020, 1, 1)
+
+    # Corrected reports don't move the watermark, but still bump the revision.
+    assert storage.bulk_add_reports(
+        __hourly_reports("SE", datetime(2020, 1, 1), 1, load=500.0)
+    )
+    assert storage.fetch_latest_instant_record() == datetime(2020, 1, 1, 2)
+    assert storage.fetch_reports_revision()[0] == 2
+    assert storage.add_reports(list(__hourly_reports("N", datetime(2020, 1, 1), 1)))
+    assert storage.fetch_reports_revision()[0] == 3
+
+    # Nothing loaded, nothing revised.
+    assert storage.bulk_add_reports(iter([]))
+    assert storage.fetch_reports_revision()[0] == 3
+
+
+def test_fetch_load_series(storage: Storage) -> None:
+    # Inserted out of order, over two subsystems.
+    storage.bulk_add_reports(__hourly_reports("SE", datetime(2020, 1, 2), 24))
+    storage.bulk_add_reports(__hourly_reports("SE", datetime(2020, 1, 1), 24))
+    storage.bulk_add_reports(__hourly_reports("S", datetime(2020, 1, 1), 24))
+
+    load_series: DataFrame = storage.fetch_load_series("SE", batch_size=5)
+    assert load_series.__len__() == 48
+    assert load_series["instant_record"].dtype.kind == "M"
+    assert load_series["instant_load_following"].dtype.kind == "f"
+    assert load_series["instant_record"].is_monotonic_increasing
+
+    load_series = storage.fetch_load_series(
+        "SE", datetime(2020, 1, 1, 12), datetime(2020, 1, 2, 11)
+    )
+    assert load_series.__len__() == 24
+    assert load_series["instant_record"].iloc[0] == datetime(2020, 1, 1, 12)
+    assert load_series["instant_record"].iloc[-1] == datetime(2020, 1, 2, 11)
+
+
+def test_fetch_latest_instant_record_and_years(storage: Storage) -> None:
+    storage.bulk_add_reports(__hourly_reports("SE", datetime(2019, 12, 31, 22), 4))
+    storage.bulk_add_reports(__hourly_reports("N", datetime.now(), 1))
+    assert storage.fetch_latest_instant_record() > datetime(2020, 1, 1, 1)
+    # Closed years only.
+    assert sorted(storage.fetch_distinct_instant_record_years()) == [2019, 2020]
+
+
+def test_stream_reports(storage: Storage) -> None:
+    storage.bulk_add_reports(__hourly_reports("SE", datetime(2020, 1, 1), 10))
+    storage.bulk_add_reports(__hourly_reports("N", datetime(2020, 1, 1), 10))
+
+    batches: List[List[Tuple[Any, ...]]] = list(storage.stream_reports(batch_size=4))
+    assert [batch.__len__() for batch in batches] == [4, 4, 4, 4, 4]
+    rows: List[Tuple[Any, ...]] = [row for batch in batches for row in batch]
+    assert [row[:2] for row in rows] == sorted(row[:2] for row in rows)
+    assert rows[0] == ("N", datetime(2020, 1, 1), 100.0)
+
+    rows = [
+        row
+        for batch in storage.stream_reports(
+            "SE", datetime(2020, 1, 1, 2), datetime(2020, 1, 1, 4)
+        )
+        for row in batch
+    ]
+    assert rows == [
+        ("SE", datetime(2020, 1, 1, 2), 102.0),
+        ("SE", datetime(2020, 1, 1, 3), 103.0),
+        ("SE", datetime(2020, 1, 1, 4), 104.0),
+    ]
+
+
+def test_replace_forecasts(storage: Storage) -> None:
+    generated_at: datetime = datetime(2020, 1, 1)
+    assert storage.replace_forecasts(
+        "SE",
+        [(datetime(2020, 1, day), 10.0, 5.0, 15.0) for day in range(1, 11)],
+        "v1",
+        generated_at,
+    )
+    assert storage.replace_forecasts(
+        "N", [(datetime(2020, 1, 1), 1.0, 0.5, 1.5)], "v1", generated_at
+    )
+    # Overlapping and shorter: stale days of the previous version are dropped.
+    assert storage.replace_forecasts(
+        "SE",
+        [(datetime(2020, 1, day), 20.0, 10.0, 30.0) for day in range(5, 8)],
+        "v2",
+        generated_at,
+    )
+
+    assert storage.fetch_forecasts_coverage() == {
+        "N": ("v1", datetime(2020, 1, 1), datetime(2020, 1, 1)),
+        "SE": ("v2", datetime(2020, 1, 5), datetime(2020, 1, 7)),
+    }
+    assert list(
+        storage.fetch_forecasts_by_period(
+            "SE", datetime(2020, 1, 1), datetime(2020, 1, 6)
+        )
+    ) == [
+        (datetime(2020, 1, 5), 20.0, 10.0, 30.0),
+        (datetime(2020, 1, 6), 20.0, 10.0, 30.0),
+    ]
+    assert [
+        row[:2] for batch in storage.stream_forecasts(batch_size=2) for row in batch
+    ] == [
+        ("N", datetime(2020, 1, 1)),
+        ("SE", datetime(2020, 1, 5)),
+        ("SE", datetime(2020, 1, 6)),
+        ("SE", datetime(2020, 1, 7)),
+    ]
+
+
+def test_load_rollups(storage: Storage) -> None:
+    assert storage.replace_load_rollups(
+        [
+            ("SE", "day", datetime(2020, 1, 2), 1.0, 3.0, 2.0, 6.0, 3),
+            ("SE", "day", datetime(2020, 1, 1), 1.0, 1.0, 1.0, 1.0, 1),
+            ("N", "day", datetime(2020, 1, 1), 2.0, 2.0, 2.0, 2.0, 1),
+            ("SE", "month", datetime(2020, 1, 1), 1.0, 3.0, 1.75, 7.0, 4),
+        ]
+    )
+    # Upserted on (subsystem, granularity, bucket).
+    assert storage.replace_load_rollups(
+        [("SE", "day", datetime(2020, 1, 1), 1.0, 5.0, 3.0, 6.0, 2)]
+    )
+
+    assert list(storage.fetch_load_rollups("day")) == [
+        ("N", datetime(2020, 1, 1), 2.0, 2.0, 2.0, 2.0, 1),
+        ("SE", datetime(2020, 1, 1), 1.0, 5.0, 3.0, 6.0, 2),
+        ("SE", datetime(2020, 1, 2), 1.0, 3.0, 2.0, 6.0, 3),
+    ]
+    assert list(
+        storage.fetch_load_rollups("day", datetime(2020, 1, 2), datetime(2020, 1, 2))
+    ) == [("SE", datetime(2020, 1, 2), 1.0, 3.0, 2.0, 6.0, 3)]
+
+
+def test_mixed_forecast_versions_are_not_covered(
+    storage: Storage, settings: Dict[str, Any]
+) -> None:
+    storage.replace_forecasts(
+        "SE", [(datetime(2020, 1, 1), 1.0, 0.5, 1.5)], "v2", datetime(2020, 1, 1)
+    )
+    storage.replace_forecasts(
+        "N", [(datetime(2020, 1, 1), 1.0, 0.5, 1.5)], "v2", datetime(2020, 1, 1)
+    )
+    # Stale entry of a previous model version, as left by a replace that was
+    # interrupted halfway before it became transactional.
+    stale_forecast: Tuple[Any, ...] = ("SE", "2020-01-02 00:00:00", 1.0, 0.5, 1.5, "v1")
+    query: str = """
+        INSERT INTO `sin_subsystems_forecasts` (
+            `subsystem_id`, `ds`, `yhat`, `yhat_lower`, `yhat_upper`,
+            `model_version`, `generated_at`
+        ) VALUES (?, ?, ?, ?, ?, ?, '2020-01-01 00:00:00')
+        """
+    if isinstance(storage, SqliteStorage):
+        with sqlite3.connect(settings["storage"]["sqlite"]["path"]) as connection:
+            connection.execute(query, stale_forecast)
+    else:
+        from db.mariadb_storage import MariaDb
+
+        with MariaDb() as mariadb_connection:
+            mariadb_connection.execute(query=query, data=stale_forecast)
+
+    assert storage.fetch_forecasts_coverage() == {
+        "N": ("v2", datetime(2020, 1, 1), datetime(2020, 1, 1))
+    }
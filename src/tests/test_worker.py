@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+from threading import Event
+from time import sleep
+from typing import Any, Callable, Dict, List
+from settings import Settings
+from utils import DATETIME_FORMAT
+from worker import IngestionLock, IngestionLockError, IngestionWorker
+
+import os
+import pytest
+import worker
+
+LOCK_TIMEOUT: timedelta = timedelta(seconds=0.4)
+
+
+@pytest.fixture
+def worker_settings(
+    settings: Dict[str, Any], tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> Dict[str, Any]:
+    # Polled often, retried within milliseconds, and otherwise synced daily.
+    settings["ingestion"]["worker"].update(
+        {
+            "poll_interval": 0.01,
+            "lock": str(tmp_path / "ingestion.lock"),
+            "trigger": str(tmp_path / "ingestion.trigger"),
+            "status": str(tmp_path / "ingestion.json"),
+            "backoff": {
+                "initial": {"milliseconds": 1},
+                "maximum": {"milliseconds": 4},
+            },
+        }
+    )
+    settings["web_scrapping"]["fetch_wait_time"] = {"days": 1}
+    # Settings and logging are those of the test already.
+    monkeypatch.setattr(Settings, "load", lambda settings_path: None)
+    monkeypatch.setattr(worker, "configure_logging", lambda: None)
+    return settings["ingestion"]["worker"]
+
+
+def __run_worker(
+    monkeypatch: pytest.MonkeyPatch, sync: Callable[[Event, int], None]
+) -> List[Dict[str, Any]]:
+    # Runs the worker with a stand-in sync until it sets the stop event, and
+    # returns the status seen by every sync.
+    stop_event: Event = Event()
+    statuses: List[Dict[str, Any]] = []
+
+    def stand_in_sync(is_startup: bool = False) -> None:
+        statuses.append(IngestionWorker.status())
+        sync(stop_event, statuses.__len__())
+
+    monkeypatch.setattr(IngestionWorker, "sync", stand_in_sync)
+    IngestionWorker.run("settings.yaml", stop_event)
+    return statuses
+
+
+def test_lock_is_exclusive(worker_settings: Dict[str, Any]) -> None:
+    lock_path: str = worker_settings["lock"]
+    with IngestionLock(lock_path, LOCK_TIMEOUT):
+        with open(lock_path, "r") as lock_file:
+            assert lock_file.read() == str(os.getpid())
+        with pytest.raises(IngestionLockError):
+            with IngestionLock(lock_path, LOCK_TIMEOUT):
+                pass
+    assert not os.path.exists(lock_path)
+
+
+def test_lock_heartbeat(worker_settings: Dict[str, Any]) -> None:
+    lock_path: str = worker_settings["lock"]
+    with IngestionLock(lock_path, LOCK_TIMEOUT):
+        locked_at: float = os.path.getmtime(lock_path)
+        # Held for longer than its timeout, though never left stale.
+        sleep(LOCK_TIMEOUT.total_seconds() * 2)
+        assert os.path.getmtime(lock_path) > locked_at
+        with pytest.raises(IngestionLockError):
+            with IngestionLock(lock_path, LOCK_TIMEOUT):
+                pass
+
+
+def test_stale_lock_is_taken_over(worker_settings: Dict[str, Any]) -> None:
+    # Left over by a crashed worker.
+    lock_path: str = worker_settings["lock"]
+    with open(lock_path, "w") as lock_file:
+        lock_file.write("-1")
+    stale_time: float = (datetime.now() - LOCK_TIMEOUT * 2).timestamp()
+    os.utime(lock_path, (stale_time, stale_time))
+
+    with IngestionLock(lock_path, LOCK_TIMEOUT):
+        with open(lock_path, "r") as lock_file:
+            assert lock_file.read() == str(os.getpid())
+
+        # Taken over meanwhile, so it's neither touched nor removed anymore.
+        with open(lock_path, "w") as lock_file:
+            lock_file.write("-1")
+        sleep(LOCK_TIMEOUT.total_seconds() / 2)
+        taken_over_at: float = os.path.getmtime(lock_path)
+        sleep(LOCK_TIMEOUT.total_seconds())
+        assert os.path.getmtime(lock_path) == taken_over_at
+    assert os.path.exists(lock_path)
+
+
+def test_backoff(worker_settings: Dict[str, Any]) -> None:
+    worker_settings["backoff"] = {
+        "initial": {"minutes": 1},
+        "maximum": {"minutes": 5},
+    }
+    assert [IngestionWorker.backoff(failures) for failures in range(1, 6)] == [
+        timedelta(minutes=minutes) for minutes in [1, 2, 4, 5, 5]
+    ]
+
+
+def test_backoff_is_reset_once_synced(
+    worker_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Syncs skipped by a running one are neither failures nor successes.
+    outcomes: List[Exception | None] = [
+        RuntimeError(),
+        RuntimeError(),
+        IngestionLockError(worker_settings["lock"]),
+        RuntimeError(),
+        None,
+        RuntimeError(),
+    ]
+
+    def sync(stop_event: Event, calls: int) -> None:
+        if calls == outcomes.__len__():
+            stop_event.set()
+        # Otherwise, the next sync would only be due a day later.
+        if not isinstance(outcomes[calls - 1], RuntimeError):
+            IngestionWorker.trigger()
+        if outcomes[calls - 1]:
+            raise outcomes[calls - 1]
+
+    statuses: List[Dict[str, Any]] = __run_worker(monkeypatch, sync)
+    assert [status.get("failures") for status in statuses] == [
+        None,
+        1,
+        2,
+        2,
+        3,
+        0,
+    ]
+    assert [status.get("last_status") for status in statuses[1:]] == [
+        "failed",
+        "failed",
+        "skipped",
+        "failed",
+        "succeeded",
+    ]
+    assert IngestionWorker.status()["failures"] == 1
+
+
+def test_trigger_is_consumed(
+    worker_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # The second sync is only due to the trigger, a day ahead of schedule.
+    def sync(stop_event: Event, calls: int) -> None:
+        if calls == 1:
+            IngestionWorker.trigger()
+        else:
+            stop_event.set()
+
+    statuses: List[Dict[str, Any]] = __run_worker(monkeypatch, sync)
+    assert statuses.__len__() == 2
+    assert statuses[1]["pending_trigger"] is False
+    assert not os.path.exists(worker_settings["trigger"])
+
+
+def test_status(worker_settings: Dict[str, Any]) -> None:
+    assert IngestionWorker.status() == {"pending_trigger": False}
+
+    IngestionWorker.trigger()
+    assert IngestionWorker.status() == {"pending_trigger": True}
+
+
+def test_status_once_synced(
+    worker_settings: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    __run_worker(monkeypatch, lambda stop_event, calls: stop_event.set())
+
+    status: Dict[str, Any] = IngestionWorker.status()
+    assert status["last_status"] == "succeeded"
+    assert status["failures"] == 0
+    assert status["pending_trigger"] is False
+    assert datetime.strptime(status["next_sync"], DATETIME_FORMAT) - datetime.strptime(
+        status["last_sync"], DATETIME_FORMAT
+    ) in [
+        timedelta(days=1),
+        timedelta(days=1, seconds=-1),
+    ]
@@ -1,4 +1,7 @@
 from datetime import datetime, timedelta
+from logging import INFO
+from logging import Formatter as LogFormatter
+from logging import basicConfig
 from string import Formatter
 from typing import Any, Dict
 
@@ -8,6 +11,7 @@ TIMEZONE_DIFFERENCE: Dict[str, int] = {"hours": -3, "minutes": 0}
 NOT_SET: str = "<ARGUMENT NOT SET>"
 
 REGEX_PATTERN_FILENAME: str = r"(CARGA_ENERGIA_)[0-9]{4,}"
+REGEX_PATTERN_CSV_FILENAME: str = rf"{REGEX_PATTERN_FILENAME}(\.csv)"
 REGEX_PATTERN_FILENAME_YEAR: str = r"[0-9]{4,}"
 
 # `os._exit(n)` exit codes:
@@ -25,6 +29,19 @@ def format_stacktrace(text: str, **kwargs: Dict[str, Any]) -> str:
     return message
 
 
+def configure_logging() -> None:
+    log_fmt: LogFormatter = LogFormatter(
+        "%(asctime)s,%(msecs)-3d - %(levelname)-8s => " "%(message)s"
+    )
+    log_config: Dict[str, Any] = {
+        "format": vars(log_fmt).get("_fmt"),
+        "datefmt": "%Y-%m-%d %H:%M:%S",
+        "level": INFO,
+        "encoding": "utf8",
+    }
+    basicConfig(**log_config)
+
+
 def brt_now() -> datetime:
     return datetime.utcnow() + timedelta(**TIMEZONE_DIFFERENCE)
 
@@ -0,0 +1,289 @@
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timedelta
+from logging import fatal, info, warning
+from multiprocessing.synchronize import Event
+from threading import Event as ThreadEvent
+from threading import Thread
+from time import sleep
+from traceback import format_exc
+from typing import Any, Dict, Tuple
+from urllib3 import disable_warnings
+from forecast import refresh_materialized_forecasts
+from settings import Settings
+from utils import DATETIME_FORMAT, brt_now, configure_logging, format_stacktrace
+from ons_data_mining import (
+    cleanup_all_downloaded_resources,
+    fetch_open_data_reports,
+    update_all_open_data_reports,
+)
+from warnings import simplefilter
+
+import json
+import os
+
+SYNC_STATUS_SUCCEEDED: str = "succeeded"
+SYNC_STATUS_SKIPPED: str = "skipped"
+SYNC_STATUS_FAILED: str = "failed"
+
+
+class IngestionLockError(Exception):
+    def __init__(self, lock_path: str) -> None:
+        super().__init__(f'Another sync is already running, see "{lock_path}".')
+
+
+class IngestionLock(object):
+    # Lock file created exclusively, so it works across processes and
+    # platforms. It's touched periodically while held, hence lock files left
+    # untouched for longer than 'timeout' are left over by a crashed worker
+    # and taken over, while long running syncs keep theirs.
+    def __init__(self, lock_path: str, timeout: timedelta) -> None:
+        self.__lock_path: str = lock_path
+        self.__timeout: timedelta = timeout
+        self.__released: ThreadEvent = ThreadEvent()
+        self.__heartbeat: Thread | None = None
+
+    def __enter__(self) -> "IngestionLock":
+        os.makedirs(os.path.dirname(self.__lock_path) or ".", exist_ok=True)
+        for _ in range(2):
+            try:
+                lock_fd: int = os.open(
+                    self.__lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+                )
+            except FileExistsError:
+                if not self.__is_stale():
+                    raise IngestionLockError(self.__lock_path)
+
+                warning(f'Taking over stale lock file "{self.__lock_path}".')
+                os.remove(self.__lock_path)
+                continue
+
+            with os.fdopen(lock_fd, "w") as lock_file:
+                lock_file.write(str(os.getpid()))
+
+            self.__released.clear()
+            self.__heartbeat = Thread(
+                target=self.__touch, name="ingestion-lock-heartbeat", daemon=True
+            )
+            self.__heartbeat.start()
+            return self
+
+        raise IngestionLockError(self.__lock_path)
+
+    def __exit__(self, *args: Tuple[Any, ...]) -> None:
+        self.__released.set()
+        if self.__heartbeat:
+            self.__heartbeat.join()
+
+        # Unless it was taken over meanwhile, then it's someone else's.
+        if self.__is_owned():
+            os.remove(self.__lock_path)
+
+    def __touch(self) -> None:
+        # Several times within 'timeout', so a late heartbeat doesn't make the
+        # lock look stale.
+        while not self.__released.wait(self.__timeout.total_seconds() / 4):
+            if not self.__is_owned():
+                warning(f'Lock file "{self.__lock_path}" was taken over.')
+                return
+
+            os.utime(self.__lock_path)
+
+    def __is_owned(self) -> bool:
+        try:
+            with open(self.__lock_path, "r") as lock_file:
+                return lock_file.read().strip() == str(os.getpid())
+        except FileNotFoundError:
+            return False
+
+    def __is_stale(self) -> bool:
+        try:
+            lock_age: float = datetime.now().timestamp() - os.path.getmtime(
+                self.__lock_path
+            )
+        except FileNotFoundError:
+            return True
+        return lock_age > self.__timeout.total_seconds()
+
+
+# Reports synchronization, run by a worker process apart from the API, so
+# neither its CPU bound work nor its failures affect requests being served.
+class IngestionWorker(object):
+    def __init__(self, *args: Tuple[Any, ...]):
+        raise SyntaxError("This is an utility class.")
+
+    @staticmethod
+    def run(settings_path: str, stop_event: Event | None = None) -> None:
+        # Entry point of the worker process, thus it loads its own settings
+        # and logging configuration.
+        configure_logging()
+        disable_warnings()
+        simplefilter("ignore", FutureWarning)
+        Settings.load(settings_path)
+
+        worker_settings: Dict[str, Any] = IngestionWorker.__settings()
+        fetch_wait_time: timedelta = timedelta(
+            **Settings.CONFIG["web_scrapping"]["fetch_wait_time"]
+        )
+        next_sync: datetime = brt_now()
+        failures: int = 0
+        is_startup: bool = True
+        info("Ingestion worker started.")
+
+        while not (stop_event and stop_event.is_set()):
+            is_triggered: bool = IngestionWorker.__consume_trigger()
+            if is_triggered or brt_now() >= next_sync:
+                if is_triggered:
+                    info("Manual sync triggered.")
+
+                try:
+                    IngestionWorker.sync(is_startup)
+                    sync_status: str = SYNC_STATUS_SUCCEEDED
+                    is_startup = False
+                    failures = 0
+                    next_sync = brt_now() + fetch_wait_time
+                except IngestionLockError as err:
+                    warning(str(err))
+                    sync_status = SYNC_STATUS_SKIPPED
+                    next_sync = brt_now() + fetch_wait_time
+                except Exception:
+                    # Retried with exponential backoff, instead of either
+                    # stopping the worker or waiting a whole period.
+                    sync_status = SYNC_STATUS_FAILED
+                    failures += 1
+                    next_sync = brt_now() + IngestionWorker.backoff(failures)
+                    fatal(
+                        format_stacktrace(
+                            text="Unexpected sync behavior.",
+                            args={
+                                "Failures": failures,
+                                "Next sync": next_sync.strftime(DATETIME_FORMAT),
+                                "Stacktrace": format_exc(),
+                            },
+                        )
+                    )
+                IngestionWorker.__save_status(sync_status, next_sync, failures)
+
+            remaining_time: float = (next_sync - brt_now()).total_seconds()
+            timeout: float = max(
+                min(remaining_time, worker_settings.get("poll_interval", 5)), 0
+            )
+            if stop_event:
+                stop_event.wait(timeout)
+            else:
+                sleep(timeout)
+
+        info("Ingestion worker stopped.")
+
+    @staticmethod
+    def sync(is_startup: bool = False) -> None:
+        # Guarded by a lock file, so neither overlapping manual triggers nor
+        # further workers run concurrent syncs.
+        with IngestionWorker.__lock():
+            open_data_ons_settings: Dict[str, Any] = Settings.CONFIG["open_data_ons"]
+            source_dir: str = os.path.join(
+                os.getcwd(), open_data_ons_settings["download_dir"]
+            )
+            if not os.path.exists(source_dir):
+                os.mkdir(source_dir)
+            elif is_startup and os.listdir(source_dir) != []:
+                # Leftovers of an interrupted sync only, processed CSV files
+                # are removed as soon as they're loaded.
+                cleanup_all_downloaded_resources(source_dir)
+
+            fetch_open_data_reports(
+                open_data_ons_settings, Settings.CONFIG["web_scrapping"], source_dir
+            )
+            update_all_open_data_reports(source_dir)
+            refresh_materialized_forecasts(Settings.CONFIG["forecast"])
+
+    @staticmethod
+    def backoff(failures: int) -> timedelta:
+        backoff_settings: Dict[str, Any] = IngestionWorker.__settings().get(
+            "backoff", {}
+        )
+        return min(
+            timedelta(**backoff_settings.get("initial", {"minutes": 1}))
+            * 2 ** (failures - 1),
+            timedelta(**backoff_settings.get("maximum", {"hours": 1})),
+        )
+
+    @staticmethod
+    def trigger() -> None:
+        # Requests a sync as soon as the worker polls for it, from any process.
+        trigger_path: str = IngestionWorker.__settings().get(
+            "trigger", "../.cache/ingestion.trigger"
+        )
+        os.makedirs(os.path.dirname(trigger_path) or ".", exist_ok=True)
+        with open(trigger_path, "w") as trigger_file:
+            trigger_file.write(brt_now().strftime(DATETIME_FORMAT))
+
+    @staticmethod
+    def status() -> Dict[str, Any]:
+        status_path: str = IngestionWorker.__settings().get(
+            "status", "../.cache/ingestion.json"
+        )
+        status: Dict[str, Any] = {}
+        if os.path.exists(status_path):
+            with open(status_path, "r") as status_file:
+                status = json.load(status_file)
+        status["pending_trigger"] = os.path.exists(
+            IngestionWorker.__settings().get("trigger", "../.cache/ingestion.trigger")
+        )
+        return status
+
+    @staticmethod
+    def __settings() -> Dict[str, Any]:
+        return Settings.CONFIG.get("ingestion", {}).get("worker", {})
+
+    @staticmethod
+    def __consume_trigger() -> bool:
+        trigger_path: str = IngestionWorker.__settings().get(
+            "trigger", "../.cache/ingestion.trigger"
+        )
+        try:
+            os.remove(trigger_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def __lock() -> IngestionLock:
+        return IngestionLock(
+            IngestionWorker.__settings().get("lock", "../.cache/ingestion.lock"),
+            timedelta(
+                **IngestionWorker.__settings().get("lock_timeout", {"hours": 6})
+            ),
+        )
+
+    @staticmethod
+    def __save_status(sync_status: str, next_sync: datetime, failures: int) -> None:
+        status_path: str = IngestionWorker.__settings().get(
+            "status", "../.cache/ingestion.json"
+        )
+        os.makedirs(os.path.dirname(status_path) or ".", exist_ok=True)
+        with open(f"{status_path}.tmp", "w") as status_file:
+            json.dump(
+                {
+                    "last_sync": brt_now().strftime(DATETIME_FORMAT),
+                    "last_status": sync_status,
+                    "next_sync": next_sync.strftime(DATETIME_FORMAT),
+                    "failures": failures,
+                },
+                status_file,
+                indent=True,
+            )
+        os.replace(f"{status_path}.tmp", status_path)
+
+
+if __name__ == "__main__":
+    # Standalone worker, for 'ingestion.worker.mode' set to 'external'.
+    parser: ArgumentParser = ArgumentParser(
+        description="Synchronizes ONS reports periodically, apart from the API."
+    )
+    parser.add_argument("--settings", default="../settings.yaml")
+
+    args: Namespace = parser.parse_args()
+    try:
+        IngestionWorker.run(args.settings)
+    except KeyboardInterrupt:
+        pass